@@ -118,7 +118,7 @@ class DatabaseManager:
             return []
 
     def update_icon_vector(self, icon_name: str, vector_features: np.ndarray) -> bool:
-        """아이콘의 벡터 특징 업데이트"""
+        """아이콘의 벡터 특징 업데이트 (단건용, 카탈로그 전체 적재는 python -m model.vector_db load)"""
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cur:
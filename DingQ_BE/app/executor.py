@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """실행기 슬롯과 대기열이 모두 찬 경우 (클라이언트는 Retry-After 후 재시도)"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} 실행기가 포화 상태입니다")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    CPU/블로킹 작업 전용 실행기
+
+    고정된 수의 워커 스레드와 제한된 대기열을 가지며, 대기열까지 가득 차면
+    작업을 쌓아두지 않고 즉시 ExecutorSaturated를 발생시킨다(백프레셔).
+    이벤트 루프는 결과를 await 하기만 하므로 헬스체크 등 다른 요청이 막히지 않는다.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 1):
+        """
+        Args:
+            name: 실행기 이름 (로그/메트릭/스레드 이름)
+            max_workers: 동시에 실행되는 작업 수
+            max_queue: 실행 대기 가능한 작업 수
+            retry_after: 포화 시 클라이언트에게 안내할 재시도 대기 시간 (초)
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+        self._lock = threading.Lock()
+        self._pending = 0  # 실행 중 + 대기 중
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=1000)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        fn(*args, **kwargs)를 워커 스레드에서 실행하고 결과를 반환
+
+        Raises:
+            ExecutorSaturated: 실행 슬롯과 대기열이 모두 찬 경우
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(self.name, self.retry_after)
+            self._pending += 1
+
+        enqueued = time.perf_counter()
+
+        def task():
+            with self._lock:
+                self._running += 1
+                self._wait_times.append(time.perf_counter() - enqueued)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        def on_done(future):
+            # 요청이 취소되어도 스레드 작업이 끝나야 슬롯이 반환됨
+            with self._lock:
+                self._pending -= 1
+                if not future.cancelled() and future.exception() is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+        future = self._pool.submit(task)
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """슬롯 사용량, 대기열 길이, 거절 수, 대기 시간 메트릭 반환"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            p99 = waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0,
+                "p99_wait_ms": round(p99 * 1000, 2),
+            }
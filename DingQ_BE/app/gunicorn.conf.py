@@ -0,0 +1,41 @@
+# gunicorn 설정 - 멀티 워커 서빙 (모델/레퍼런스 인덱스 1회 로드 후 fork 공유)
+#
+# 실행: cd app && gunicorn -c gunicorn.conf.py main:app
+#
+# 워커 수 vs torch 스레드 수
+#   WEB_CONCURRENCY    : 워커 프로세스 수 (기본 1)
+#   TORCH_NUM_THREADS  : 워커당 torch intra-op 스레드 수
+#                        (기본: vCPU 수 // 워커 수, 최소 1)
+#   워커 수 x 워커당 스레드 수 <= vCPU 수 가 되도록 맞춰야 코어 과다 구독이 없다.
+#   예) vCPU 4개: 워커 1 x 스레드 4 (지연 시간 우선) / 워커 2 x 스레드 2 / 워커 4 x 스레드 1 (처리량 우선)
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+
+# 마스터에서 앱을 import 한 뒤 fork (모델 가중치를 copy-on-write로 공유)
+preload_app = True
+
+cpu_count = multiprocessing.cpu_count()
+torch_num_threads = int(os.getenv("TORCH_NUM_THREADS", str(max(1, cpu_count // workers))))
+
+
+def on_starting(server):
+    """워커 fork 전 마스터에서 CLIP 모델과 레퍼런스 인덱스를 한 번만 로드"""
+    import main
+
+    main.preload_models()
+    server.log.info(
+        f"workers={workers}, torch_num_threads={torch_num_threads}, vCPU={cpu_count}"
+    )
+
+
+def post_fork(server, worker):
+    """워커별 torch intra-op 스레드 수 제한 (워커 x 스레드 <= vCPU)"""
+    import torch
+
+    torch.set_num_threads(torch_num_threads)
@@ -0,0 +1,430 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from executor import ExecutorSaturated
+
+# Postgres 작업 저장소 전용 의존성 (memory 저장소만 쓰면 필요 없음)
+try:
+    from psycopg.types.json import Jsonb
+    from psycopg_pool import AsyncConnectionPool
+    PSYCOPG_AVAILABLE = True
+except ImportError:
+    PSYCOPG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+JOB_STORES = ("memory", "postgres")
+FINISHED_STATUSES = ("succeeded", "failed")
+# 작업 문서에 기록하지 않는 이벤트 필드 (이미지 본문은 업로드에 실패한 결과에만 남김)
+EVENT_ONLY_FIELDS = ("event", "elapsed", "image_base64")
+STALE_ERROR = "작업을 실행하던 워커가 응답하지 않아 실패 처리되었습니다"
+
+JOBS_DDL = """
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    job JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    heartbeat_at TIMESTAMPTZ DEFAULT now()
+);
+ALTER TABLE generation_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ DEFAULT now();
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_updated_at ON generation_jobs(updated_at);
+"""
+
+
+class JobStore:
+    """생성 작업 상태 저장소 인터페이스 (작업 문서 = JSON 직렬화 가능한 dict)"""
+
+    name = "base"
+
+    async def save(self, job: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def heartbeat(self, job_ids):
+        """실행 워커가 살아 있음을 기록 (대기/실행 중인 작업)"""
+
+    async def purge(self, ttl: float, stale_after: float):
+        """끝난 지 ttl초가 지난 작업 삭제, stale_after초 동안 heartbeat가 없는 미완료 작업은 실패 처리"""
+
+    async def close(self):
+        pass
+
+
+class InMemoryJobStore(JobStore):
+    """프로세스 내 작업 저장소 (워커가 1개이거나 상태 조회가 같은 워커로 오는 경우)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._heartbeats: Dict[str, float] = {}
+
+    async def save(self, job):
+        # 조회 측이 진행 중인 작업 문서를 직접 건드리지 않도록 복사본 저장
+        self._jobs[job["id"]] = json.loads(json.dumps(job))
+        self._heartbeats[job["id"]] = time.time()
+
+    async def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    async def heartbeat(self, job_ids):
+        now = time.time()
+        for job_id in job_ids:
+            if job_id in self._jobs:
+                self._heartbeats[job_id] = now
+
+    async def purge(self, ttl, stale_after):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] in FINISHED_STATUSES:
+                if job["updated_at"] < now - ttl:
+                    del self._jobs[job_id]
+                    self._heartbeats.pop(job_id, None)
+            elif self._heartbeats.get(job_id, 0) < now - stale_after:
+                job.update(status="failed", error=STALE_ERROR, finished_at=now, updated_at=now)
+
+
+class PostgresJobStore(JobStore):
+    """
+    PostgreSQL generation_jobs 테이블 작업 저장소
+
+    모든 워커(프로세스/인스턴스)가 같은 테이블을 보므로 작업을 실행하지 않은 워커도
+    상태 조회와 구독 요청을 처리할 수 있다. 풀은 첫 사용 시 워커의 이벤트 루프에서 연다.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 4):
+        if not PSYCOPG_AVAILABLE:
+            raise ImportError("postgres 작업 저장소를 사용하려면 psycopg[binary], psycopg_pool을 설치하세요")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        if self.pool is None:
+            async with self._pool_lock:
+                if self.pool is None:
+                    pool = AsyncConnectionPool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        kwargs={"autocommit": True},
+                        open=False,
+                        name="generation-jobs",
+                    )
+                    await pool.open()
+                    async with pool.connection() as conn:
+                        await conn.execute(JOBS_DDL)
+                    self.pool = pool
+        return self.pool
+
+    async def save(self, job):
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "INSERT INTO generation_jobs (id, status, job) VALUES (%s, %s, %s) "
+                "ON CONFLICT (id) DO UPDATE SET status = EXCLUDED.status, job = EXCLUDED.job, "
+                "updated_at = now(), heartbeat_at = now()",
+                (job["id"], job["status"], Jsonb(job)),
+            )
+
+    async def get(self, job_id):
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute("SELECT job FROM generation_jobs WHERE id = %s", (job_id,))
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def heartbeat(self, job_ids):
+        if not job_ids:
+            return
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "UPDATE generation_jobs SET heartbeat_at = now() WHERE id = ANY(%s)", (list(job_ids),)
+            )
+
+    async def purge(self, ttl, stale_after):
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "DELETE FROM generation_jobs WHERE status = ANY(%s) AND updated_at < now() - make_interval(secs => %s)",
+                (list(FINISHED_STATUSES), ttl),
+            )
+            # 워커 프로세스가 죽어 heartbeat가 끊긴 작업은 실패로 기록 (조회/구독이 영원히 대기하지 않도록)
+            now = time.time()
+            await conn.execute(
+                "UPDATE generation_jobs SET status = 'failed', updated_at = now(), "
+                "job = job || jsonb_build_object('status', 'failed', 'error', %s::text, "
+                "'finished_at', %s::float8, 'updated_at', %s::float8) "
+                "WHERE status <> ALL(%s) AND heartbeat_at < now() - make_interval(secs => %s)",
+                (STALE_ERROR, now, now, list(FINISHED_STATUSES), stale_after),
+            )
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+def create_job_store(backend: str, dsn: Optional[str] = None, **options) -> JobStore:
+    """
+    Args:
+        backend: "memory" | "postgres"
+        dsn: postgres 저장소 연결 문자열
+        **options: PostgresJobStore 옵션 (min_size, max_size)
+    """
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "postgres":
+        return PostgresJobStore(dsn, **options)
+    raise ValueError(f"알 수 없는 작업 저장소입니다: {backend} (선택: {', '.join(JOB_STORES)})")
+
+
+def apply_event(job: Dict[str, Any], event: Dict[str, Any], images: Optional[Dict[Any, str]] = None):
+    """
+    생성 이벤트(icon/upload/done/error)를 작업 문서에 반영
+
+    이미지 본문(image_base64)은 업로드가 끝날 때까지 images(결과 ID -> base64)에만 보관하고
+    작업 문서에는 기록하지 않는다. 결과는 업로드 후 gcs_url로 제공되므로 이벤트마다 다시 쓰는
+    작업 문서가 이미지 수만큼 커지지 않는다. 업로드에 실패한 결과(GCS 미설정 포함)에만
+    클라이언트가 이미지를 받을 수 있도록 image_base64를 남긴다.
+    """
+    images = {} if images is None else images
+    kind = event["event"]
+    if kind == "icon":
+        result = {key: value for key, value in event.items() if key not in EVENT_ONLY_FIELDS}
+        result.update(gcs_url=None, gcs_uploaded=False)
+        job["results"].append(result)
+        job["generated_count"] = len(job["results"])
+        images[event["id"]] = event.get("image_base64")
+    elif kind == "upload":
+        image_base64 = images.pop(event["id"], None)
+        for result in job["results"]:
+            if result["id"] == event["id"]:
+                result.update(gcs_url=event["gcs_url"], gcs_uploaded=event["gcs_uploaded"])
+                if not event["gcs_uploaded"] and image_base64:
+                    result["image_base64"] = image_base64
+    elif kind == "done":
+        job.update({
+            key: event[key]
+            for key in ("time_to_first_icon", "processing_time", "session_id", "gcs_uploaded_count")
+            if key in event
+        })
+        job["status"] = "succeeded" if event.get("generated_count") else "failed"
+        if job["status"] == "failed" and not job.get("error"):
+            job["error"] = "아이콘을 생성하지 못했습니다"
+    elif kind == "error":
+        job["error"] = event.get("detail")
+
+
+class GenerationJobs:
+    """
+    비동기 아이콘 생성 작업 큐
+
+    제출된 작업은 대기열에 넣고 즉시 작업 ID를 반환하며, 고정된 수의 백그라운드 워커
+    (이벤트 루프 태스크)가 꺼내 실행한다. 동시에 실행되는 생성 작업 수는 워커 수로 제한되고
+    (워커 프로세스당 제한, 실제 Gemini 호출 수는 GeminiLimiter가 전체 워커에 걸쳐 제한),
+    대기열까지 가득 차면 ExecutorSaturated(503)로 거절한다. 진행 상태는 이벤트마다 저장소에
+    기록하므로 폴링/구독은 저장소만 보면 된다.
+
+    대기/실행 중인 작업은 heartbeat_interval마다 heartbeat를 기록하고, 같은 주기로 저장소를
+    정리하면서 stale_after초 동안 heartbeat가 없는 작업(워커 프로세스 종료)을 실패 처리한다.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        run_job: Callable[[Dict[str, Any], Any], AsyncIterator[Dict[str, Any]]],
+        workers: int = 2,
+        max_queue: int = 32,
+        retry_after: int = 10,
+        ttl: float = 3600.0,
+        heartbeat_interval: float = 10.0,
+        stale_after: float = 60.0,
+    ):
+        """
+        Args:
+            store: 작업 상태 저장소
+            run_job: (작업 문서, 입력 데이터) -> 생성 이벤트 비동기 이터레이터
+            workers: 동시에 실행하는 작업 수 (워커 프로세스당)
+            max_queue: 실행 대기 가능한 작업 수
+            retry_after: 포화 시 클라이언트에게 안내할 재시도 대기 시간 (초)
+            ttl: 끝난 작업을 저장소에 보관하는 시간 (초)
+            heartbeat_interval: heartbeat 기록 및 저장소 정리 주기 (초)
+            stale_after: heartbeat가 끊긴 미완료 작업을 실패 처리하기까지의 시간 (초)
+        """
+        self.store = store
+        self.run_job = run_job
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.worker_id = None
+        self._owned = set()  # 이 워커의 대기/실행 중인 작업 ID
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._updated: Optional[asyncio.Condition] = None
+        self._running = 0
+        self._submitted = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def start(self):
+        """워커 태스크 시작 (워커 프로세스의 이벤트 루프 안에서 호출)"""
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._updated = asyncio.Condition()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._heartbeat()))
+
+    async def stop(self):
+        """워커 중지 (대기 중인 작업은 실패로 기록)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            job, _ = self._queue.get_nowait()
+            job.update(status="failed", error="서버 종료로 작업이 취소되었습니다", finished_at=time.time())
+            await self._save(job)
+        await self.store.close()
+
+    async def submit(self, params: Dict[str, Any], payload: Any) -> Dict[str, Any]:
+        """
+        작업 제출
+
+        Args:
+            params: 작업 문서에 기록할 요청 값 (description, temperature, target_count 등)
+            payload: 작업 실행에만 쓰는 입력 데이터 (저장소에 기록하지 않음)
+
+        Raises:
+            ExecutorSaturated: 대기열이 가득 찬 경우
+        """
+        if self._queue is None:
+            raise RuntimeError("작업 큐가 시작되지 않았습니다")
+        if self._queue.full():
+            self._rejected += 1
+            raise ExecutorSaturated("generate-jobs", self.retry_after)
+
+        now = time.time()
+        job = {
+            **params,
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "worker": self.worker_id,
+            "generated_count": 0,
+            "results": [],
+            "error": None,
+        }
+        await self._save(job)
+        self._queue.put_nowait((job, payload))
+        self._owned.add(job["id"])
+        self._submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get(job_id)
+
+    async def watch(self, job_id: str, interval: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """
+        작업 문서가 바뀔 때마다 반환 (끝난 작업이면 마지막 상태를 반환하고 종료)
+
+        이 워커에서 실행 중인 작업은 저장 즉시 깨어나고, 다른 워커의 작업은 interval마다 저장소를 확인한다.
+        """
+        last_update = None
+        while True:
+            job = await self.store.get(job_id)
+            if job is None:
+                return
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+            async with self._updated:
+                try:
+                    await asyncio.wait_for(self._updated.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _save(self, job: Dict[str, Any]):
+        job["updated_at"] = time.time()
+        await self.store.save(job)
+        if self._updated is not None:
+            async with self._updated:
+                self._updated.notify_all()
+
+    async def _worker(self):
+        while True:
+            job, payload = await self._queue.get()
+            self._running += 1
+            job.update(status="running", started_at=time.time())
+            images = {}  # 업로드 전 이미지 본문 (결과 ID -> base64)
+            try:
+                await self._save(job)
+                async for event in self.run_job(job, payload):
+                    apply_event(job, event, images)
+                    await self._save(job)
+                if job["status"] not in FINISHED_STATUSES:
+                    job["status"] = "failed"
+            except asyncio.CancelledError:
+                job.update(status="failed", error="서버 종료로 작업이 취소되었습니다")
+                raise
+            except Exception as e:
+                logger.error(f"생성 작업 실패 ({job['id']}): {e}")
+                job.update(status="failed", error=str(e))
+            finally:
+                self._running -= 1
+                self._owned.discard(job["id"])
+                job["finished_at"] = time.time()
+                if job["status"] == "succeeded":
+                    self._succeeded += 1
+                else:
+                    self._failed += 1
+                try:
+                    await asyncio.shield(self._save(job))
+                except Exception as e:
+                    logger.error(f"생성 작업 상태 저장 실패 ({job['id']}): {e}")
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.store.heartbeat(list(self._owned))
+                await self.store.purge(self.ttl, self.stale_after)
+            except Exception as e:
+                logger.error(f"생성 작업 heartbeat 실패: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "store": self.store.name,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "submitted": self._submitted,
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
@@ -1,18 +1,21 @@
+import asyncio
+import base64
+import gc
 import io
 import json
 import logging
 import os
-import tempfile
 import time
 import uuid
+from contextlib import aclosing
 from datetime import datetime
 from typing import Any, Dict, List
 
 import uvicorn
-from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile, Security
+from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, Query, Request, UploadFile, Security, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from PIL import Image
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from google.cloud import storage
 try:
     from google.cloud import secretmanager
@@ -27,7 +30,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from model.clip_search import CLIPImageSearcher
-from model.generate_icon import generate_with_retries
+from model.delta_index import compact as compact_reference_index
+from model.vector_store import create_vector_store
+from model.generate_icon import IconGenerator
+from model.rate_limiter import GeminiLimiter
+from executor import BoundedExecutor, ExecutorSaturated
+from jobs import GenerationJobs, create_job_store
 
 # Import database and models (simplified for deployment)
 try:
@@ -59,6 +67,86 @@ app.add_middleware(
 # 전역 CLIP 검색기 (서버 시작시 한 번만 로드)
 clip_searcher = None
 
+# CLIP 임베딩 마이크로 배치 설정 (SEARCH_BATCH_MAX_SIZE=1 이면 비활성화)
+SEARCH_BATCH_MAX_SIZE = int(os.getenv("SEARCH_BATCH_MAX_SIZE", "8"))
+SEARCH_BATCH_WINDOW_MS = float(os.getenv("SEARCH_BATCH_WINDOW_MS", "10"))
+
+# 반복 스케치 검색 결과 캐시 설정 (SEARCH_CACHE_SIZE=0 이면 비활성화)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_PERCEPTUAL = os.getenv("SEARCH_CACHE_PERCEPTUAL", "false").lower() == "true"
+SEARCH_CACHE_PHASH_DISTANCE = int(os.getenv("SEARCH_CACHE_PHASH_DISTANCE", "0"))
+
+# 레퍼런스 인덱스 파일 변경 감시 주기 (초, 0 이면 비활성화)
+INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "0"))
+
+# 관리자 API 토큰 (설정하지 않으면 관리자 API 비활성화)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# 추론 전용 실행기 (이벤트 루프를 막지 않도록 CPU/블로킹 작업을 분리)
+# 슬롯과 대기열이 모두 차면 즉시 503 + Retry-After 로 응답
+search_executor = BoundedExecutor(
+    "search",
+    max_workers=int(os.getenv("SEARCH_EXECUTOR_WORKERS", "8")),
+    max_queue=int(os.getenv("SEARCH_EXECUTOR_QUEUE", "32")),
+    retry_after=int(os.getenv("SEARCH_RETRY_AFTER", "1")),
+)
+generate_executor = BoundedExecutor(
+    "generate",
+    max_workers=int(os.getenv("GENERATE_EXECUTOR_WORKERS", "4")),
+    max_queue=int(os.getenv("GENERATE_EXECUTOR_QUEUE", "8")),
+    retry_after=int(os.getenv("GENERATE_RETRY_AFTER", "10")),
+)
+
+# 요청 간 Gemini 호출 제한 (토큰 버킷 + 동시 호출 수, GEMINI_LIMITER_DIR이 있으면 워커 간 공유)
+gemini_limiter = GeminiLimiter(
+    rate=float(os.getenv("GEMINI_RATE_LIMIT", "0")),
+    burst=int(os.getenv("GEMINI_BURST", "10")),
+    max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", "0")),
+    lock_dir=os.getenv("GEMINI_LIMITER_DIR") or None,
+    cooldown=float(os.getenv("GEMINI_429_COOLDOWN", "2")),
+)
+# Gemini 아이콘 생성기 (워커당 클라이언트 1개를 공유, 생성 요청은 이벤트 루프에서 동시 실행)
+icon_generator = IconGenerator(
+    model=os.getenv("GEMINI_IMAGE_MODEL", "gemini-2.0-flash-preview-image-generation"),
+    timeout=float(os.getenv("GEMINI_TIMEOUT", "60")),
+    limiter=gemini_limiter,
+)
+# 슬롯별 재시도 스케줄러 설정 (제한 시간, 헤지 요청 수, 재시도 백오프)
+GENERATE_OPTIONS = {
+    "deadline": float(os.getenv("GENERATE_DEADLINE", "90")) or None,
+    "hedges": int(os.getenv("GENERATE_HEDGES", "0")),
+    "backoff": float(os.getenv("GENERATE_BACKOFF", "0.5")),
+}
+
+# 비동기 생성 작업 설정 (작업 상태 저장소, 워커 수, 대기열 크기, 보관 시간, 구독 폴링 주기)
+JOB_STORE = os.getenv("JOB_STORE", "memory")
+GENERATE_JOB_WORKERS = int(os.getenv("GENERATE_JOB_WORKERS", "2"))
+GENERATE_JOB_QUEUE = int(os.getenv("GENERATE_JOB_QUEUE", "32"))
+GENERATE_JOB_TTL = float(os.getenv("GENERATE_JOB_TTL", "3600"))
+GENERATE_JOB_POLL_INTERVAL = float(os.getenv("GENERATE_JOB_POLL_INTERVAL", "0.5"))
+GENERATE_JOB_STALE_AFTER = float(os.getenv("GENERATE_JOB_STALE_AFTER", "60"))
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    """추론 실행기 포화 시 대기열에 쌓지 않고 빠르게 거절"""
+    logger.warning(f"⏳ {exc.name} 실행기 포화로 요청 거절: {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    """관리자 API 인증 (X-Admin-Token 헤더)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="관리자 API가 비활성화되어 있습니다 (ADMIN_TOKEN 미설정)")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="관리자 토큰이 올바르지 않습니다")
+
 # Google Cloud Storage 설정
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME", "dingq-generated-icons")
 GCS_CREDENTIALS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -223,6 +311,77 @@ def list_gcs_images(prefix: str = "", limit: int = 100) -> List[Dict]:
         return []
 
 
+def load_clip_searcher(lazy_engine: bool = False) -> CLIPImageSearcher:
+    """
+    CLIP 모델과 레퍼런스 인덱스 로드
+
+    Args:
+        lazy_engine: 추론 엔진 런타임(onnx 세션) 생성을 engine.load()까지 미룸 (fork 전 사전 로드용)
+    """
+    # 벡터 가중치 경로 (환경변수로 재정의 가능)
+    # 변환된 인덱스 디렉토리가 있으면 우선 사용 (mmap 로드), 없으면 기존 npz
+    reference_data_path = os.getenv("VECTOR_WEIGHT_PATH") or (
+        "model/vectorweight.index" if os.path.isdir("model/vectorweight.index") else "model/vectorweight.npz"
+    )
+
+    if not os.path.exists(reference_data_path):
+        raise FileNotFoundError(f"벡터 파일을 찾을 수 없습니다: {reference_data_path}")
+
+    # 검색 벡터 저장소 (memory: 레퍼런스 인덱스, pgvector: svg_icons 테이블)
+    vector_store = None
+    backend = os.getenv("VECTOR_STORE", "memory")
+    if backend != "memory":
+        vector_store = create_vector_store(
+            backend,
+            dsn=os.getenv("VECTOR_STORE_DSN") or os.getenv("DATABASE_URL"),
+            min_size=int(os.getenv("VECTOR_STORE_POOL_MIN", "1")),
+            max_size=int(os.getenv("VECTOR_STORE_POOL_MAX", "4")),
+            index_kind=os.getenv("VECTOR_STORE_INDEX") or None,
+            probe=int(os.getenv("VECTOR_STORE_PROBE", "0")) or None,
+            version_interval=float(os.getenv("VECTOR_STORE_VERSION_INTERVAL", "5")),
+        )
+        logger.info(f"🗄️ 벡터 저장소: {backend}")
+
+    return CLIPImageSearcher(
+        reference_data_path,
+        engine=os.getenv("CLIP_ENGINE", "fp32"),
+        onnx_path=os.getenv("CLIP_ONNX_PATH") or None,
+        num_threads=int(os.getenv("TORCH_NUM_THREADS", "0")) or None,
+        lazy_engine=lazy_engine,
+        vision_only=os.getenv("CLIP_VISION_ONLY", "true").lower() == "true",
+        fused_preprocess=os.getenv("CLIP_FUSED_PREPROCESS", "true").lower() == "true",
+        shortlist_size=int(os.getenv("SEARCH_SHORTLIST", "0")),
+        ann_index=os.getenv("ANN_INDEX") or None,
+        ann_probe=int(os.getenv("ANN_PROBE", "0")) or None,
+        precision=os.getenv("SEARCH_PRECISION", "float32"),
+        rerank_factor=int(os.getenv("SEARCH_RERANK_FACTOR", "2")),
+        vector_store=vector_store,
+        metadata_path=os.getenv("ICON_METADATA_PATH") or (
+            "model/icon_metadata.csv" if os.path.exists("model/icon_metadata.csv") else None
+        ),
+    )
+
+
+def preload_models():
+    """
+    멀티 워커 서빙용 사전 로드 (gunicorn 마스터 프로세스에서 fork 전에 호출)
+
+    모델 가중치는 fork 후 copy-on-write로 워커들이 공유하고, 레퍼런스 행렬은
+    공유 메모리 파일로 옮겨 모든 워커가 같은 물리 페이지를 매핑한다.
+    마스터에서는 forward를 실행하지 않는다 (fork 전 OpenMP 스레드 생성 방지).
+    onnx 엔진은 마스터에서 그래프 내보내기만 하고 InferenceSession은 fork 후 워커마다 만든다.
+    """
+    global clip_searcher
+    logger.info(f"📦 워커 fork 전 CLIP 모델 사전 로드 중 (master pid={os.getpid()})...")
+    clip_searcher = load_clip_searcher(lazy_engine=True)
+    clip_searcher.index.share_memory()
+
+    # 이후 GC가 사전 로드된 객체를 건드려 공유 페이지가 복사되는 것을 방지
+    gc.collect()
+    gc.freeze()
+    logger.info("✅ CLIP 모델 사전 로드 완료")
+
+
 @app.on_event("startup")
 async def startup_event():
     """서버 시작시 CLIP 모델 초기화 및 데이터베이스 테이블 생성"""
@@ -232,6 +391,10 @@ async def startup_event():
     # 1️⃣ 시크릿 초기화 (Secret Manager 또는 환경변수)
     initialize_secrets()
 
+    # 생성 작업 워커 시작 (워커 프로세스마다)
+    generation_jobs.start()
+    logger.info(f"🧵 생성 작업 워커 {GENERATE_JOB_WORKERS}개 시작 (저장소: {JOB_STORE})")
+
     # 데이터베이스 초기화 (선택적)
     try:
         create_tables()
@@ -242,14 +405,39 @@ async def startup_event():
 
     # CLIP 모델 초기화 (필수)
     try:
-        # 벡터 가중치 파일 경로 (환경변수로 재정의 가능)
-        reference_data_path = os.getenv("VECTOR_WEIGHT_PATH", "model/vectorweight.npz")
+        if clip_searcher is None:
+            # CLIP 검색기 초기화 (1분 정도 소요)
+            clip_searcher = load_clip_searcher()
+        else:
+            # gunicorn 마스터에서 fork 전에 미리 로드된 모델/인덱스를 공유 (copy-on-write)
+            logger.info(f"♻️ 사전 로드된 CLIP 모델 사용 (worker pid={os.getpid()})")
+            # 엔진 런타임은 워커에서 생성 (onnx 세션 스레드 풀이 워커의 스레드 수를 따르도록)
+            await run_in_threadpool(clip_searcher.engine.load)
+
+        # 동시 검색 요청을 묶어서 한 번의 forward로 처리
+        # (배치 스레드는 fork 후 워커마다 새로 시작해야 함)
+        if SEARCH_BATCH_MAX_SIZE > 1:
+            clip_searcher.enable_batching(
+                max_batch_size=SEARCH_BATCH_MAX_SIZE, max_wait_ms=SEARCH_BATCH_WINDOW_MS
+            )
+            logger.info(
+                f"🧺 검색 마이크로 배치 활성화: 최대 {SEARCH_BATCH_MAX_SIZE}개, {SEARCH_BATCH_WINDOW_MS}ms"
+            )
 
-        if not os.path.exists(reference_data_path):
-            raise FileNotFoundError(f"벡터 파일을 찾을 수 없습니다: {reference_data_path}")
+        # 같은 스케치 재요청(재시도, 더블클릭 등)은 캐시에서 응답
+        if SEARCH_CACHE_SIZE > 0:
+            clip_searcher.enable_cache(
+                max_size=SEARCH_CACHE_SIZE,
+                ttl_seconds=SEARCH_CACHE_TTL,
+                perceptual=SEARCH_CACHE_PERCEPTUAL,
+                max_distance=SEARCH_CACHE_PHASH_DISTANCE,
+            )
+            logger.info(f"🗂️ 검색 결과 캐시 활성화: 최대 {SEARCH_CACHE_SIZE}개, TTL {SEARCH_CACHE_TTL}초")
 
-        # CLIP 검색기 초기화 (1분 정도 소요)
-        clip_searcher = CLIPImageSearcher(reference_data_path)
+        # 레퍼런스 파일이 교체되면 모델 재로드 없이 인덱스만 교체 (워커마다 감시)
+        if INDEX_WATCH_INTERVAL > 0:
+            clip_searcher.enable_index_watch(interval=INDEX_WATCH_INTERVAL)
+            logger.info(f"👀 레퍼런스 인덱스 변경 감시: {clip_searcher.reference_data_path}, {INDEX_WATCH_INTERVAL}초 주기")
         logger.info("✅ CLIP 모델 로딩 완료! 서버 준비됨")
 
     except Exception as e:
@@ -257,6 +445,15 @@ async def startup_event():
         clip_searcher = None
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """생성 작업 워커, 공유 Gemini 클라이언트, 실행기 스레드 정리"""
+    await generation_jobs.stop()
+    await icon_generator.aclose()
+    search_executor.shutdown()
+    generate_executor.shutdown()
+
+
 @app.get("/")
 def read_root():
     """서버 상태 확인"""
@@ -281,6 +478,8 @@ def read_root():
         "endpoints": {
             "search": "POST /search - 이미지 유사도 검색",
             "generate": "POST /generate - 아이콘 생성 (GCS 자동 저장)",
+            "generate_stream": "POST /generate/stream - 아이콘 생성 스트리밍 (NDJSON/SSE)",
+            "generate_jobs": "POST /generate/jobs - 아이콘 생성 작업 제출, GET /generate/jobs/{job_id} - 상태 조회",
             "images": "GET /images - GCS 이미지 목록 조회",
             "recent_images": "GET /images/recent - 최근 생성 이미지"
         }
@@ -299,22 +498,138 @@ def health_check():
         "status": "healthy" if model_ready else "model_not_ready",
         "model_loaded": model_ready,
         "database": db_status,
+        "index": clip_searcher.index_info() if model_ready else None,
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    """검색/생성 파이프라인 런타임 메트릭 (튜닝용)"""
+    batcher = clip_searcher.batcher if clip_searcher is not None else None
+    cache = clip_searcher.query_cache if clip_searcher is not None else None
+    watcher = clip_searcher.index_watcher if clip_searcher is not None else None
+    return {
+        "search_executor": search_executor.get_metrics(),
+        "generate_executor": generate_executor.get_metrics(),
+        "icon_generator": icon_generator.get_metrics(),
+        "generation_jobs": generation_jobs.get_metrics(),
+        "search_batching": batcher.get_metrics() if batcher else {"status": "disabled"},
+        "search_cache": cache.get_metrics() if cache else {"status": "disabled"},
+        "index_watch": watcher.get_metrics() if watcher else {"status": "disabled"},
+        "vector_store": clip_searcher.vector_store.get_metrics() if clip_searcher is not None else None,
     }
 
 
+@app.post("/admin/reload-index", dependencies=[Depends(require_admin)])
+async def reload_reference_index(path: str = Form(None)):
+    """
+    레퍼런스 인덱스 재로드 (CLIP 모델은 유지)
+
+    새 인덱스는 스레드에서 만들고 완성된 뒤 교체하므로 진행 중인 검색은 계속된다.
+    이 요청을 받은 워커만 재로드되므로, 멀티 워커에서는 INDEX_WATCH_INTERVAL로
+    파일 감시를 켜고 파일을 교체하는 방식을 사용한다.
+
+    Args:
+        path: 새 레퍼런스 경로 (기본: 현재 경로)
+    """
+    if clip_searcher is None:
+        raise HTTPException(status_code=503, detail="CLIP 모델이 로드되지 않았습니다.")
+    try:
+        result = await run_in_threadpool(clip_searcher.reload_index, path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 레퍼런스 인덱스 재로드 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"인덱스 재로드 실패: {str(e)}")
+    if clip_searcher.query_cache is not None:
+        # 같은 버전 재로드나 pgvector 저장소(버전이 테이블 기준)에서도 명시적 재로드는 캐시를 비움
+        clip_searcher.query_cache.clear()
+    logger.info(f"🔄 레퍼런스 인덱스 교체: {result['previous_version']} -> {result['version']}")
+    return {"success": True, "worker_pid": os.getpid(), **result}
+
+
+@app.post("/admin/icons", dependencies=[Depends(require_admin)])
+async def add_reference_icons(
+    names: List[str] = Form(...),
+    files: List[UploadFile] = File(...),
+    augmentations: int = Form(6),
+):
+    """
+    새 아이콘을 서버 재시작/인덱스 재빌드 없이 검색 대상에 추가
+
+    원본 + 증강 이미지를 한 번에 임베딩해 레퍼런스 옆 delta 파일에 기록한다.
+    다른 워커는 INDEX_WATCH_INTERVAL 주기로 delta 파일을 동기화한다.
+
+    Args:
+        names: 아이콘명 목록 (files와 같은 순서)
+        files: 아이콘 이미지 목록
+        augmentations: 아이콘당 증강 이미지 수
+    """
+    if clip_searcher is None:
+        raise HTTPException(status_code=503, detail="CLIP 모델이 로드되지 않았습니다.")
+    if len(names) != len(files):
+        raise HTTPException(status_code=400, detail="names와 files의 개수가 다릅니다.")
+    if not 0 <= augmentations <= 32:
+        raise HTTPException(status_code=400, detail="augmentations는 0~32 사이여야 합니다.")
+
+    icons = [(name, await upload.read()) for name, upload in zip(names, files)]
+    try:
+        result = await run_in_threadpool(clip_searcher.add_icons, icons, augmentations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        # delta가 다른 인덱스 버전 기준 (compaction 직후 등) -> 재로드 후 재시도 필요
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 아이콘 추가 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"아이콘 추가 실패: {str(e)}")
+    logger.info(f"➕ 아이콘 {result['icons']}개 추가 ({result['vectors']}개 벡터, 버전 {result['version']})")
+    return {"success": True, "worker_pid": os.getpid(), **result}
+
+
+@app.post("/admin/compact-index", dependencies=[Depends(require_admin)])
+async def compact_reference_delta():
+    """
+    delta에 쌓인 아이콘을 기준 인덱스 디렉토리에 합친 뒤 재로드
+
+    npz 레퍼런스는 다른 워커가 계속 npz를 서빙하므로 거절한다 (409, 먼저 인덱스 디렉토리로 변환).
+    """
+    if clip_searcher is None:
+        raise HTTPException(status_code=503, detail="CLIP 모델이 로드되지 않았습니다.")
+    source = clip_searcher.reference_data_path
+    try:
+        header = await run_in_threadpool(compact_reference_index, source)
+        if header is None:
+            return {"success": True, "compacted": False, **clip_searcher.index_info()}
+        result = await run_in_threadpool(clip_searcher.reload_index, source)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ 인덱스 compaction 실패: {e}")
+        raise HTTPException(status_code=500, detail=f"인덱스 compaction 실패: {str(e)}")
+    if clip_searcher.query_cache is not None:
+        clip_searcher.query_cache.clear()
+    logger.info(f"🗜️ 인덱스 compaction: {result['previous_version']} -> {result['version']}")
+    return {"success": True, "compacted": True, "worker_pid": os.getpid(), **result}
+
+
 # Auth status endpoint removed for simplicity
 
 
 @app.post("/search")
 async def search_similar_images(
     request: Request, 
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    category: str = Form(None),
+    tags: str = Form(None),
 ):
     """
     이미지 유사도 검색 API with PostgreSQL 스케치 저장
 
     Args:
         image: 업로드할 이미지 파일
+        category: 카테고리 필터 (쉼표로 여러 개 지정 시 OR)
+        tags: 태그 필터 (쉼표로 여러 개 지정 시 모든 태그를 가진 아이콘)
         db: 데이터베이스 세션
 
     Returns:
@@ -333,9 +648,8 @@ async def search_similar_images(
         raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
 
     try:
-        # 이미지 읽기 및 PIL 변환
+        # 이미지 읽기 (디코딩은 검색기 내부에서 메모리로 처리)
         image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
 
         # 사용자 IP 추출
         user_ip = request.client.host if request.client else "unknown"
@@ -344,28 +658,15 @@ async def search_similar_images(
             f"이미지 수신: {image.filename}, 크기: {len(image_data)} bytes, IP: {user_ip}"
         )
 
-        # 임시 파일로 저장 (CLIP 검색기가 파일 경로를 요구)
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_file:
-            pil_image.save(temp_file.name, "PNG")
-            temp_image_path = temp_file.name
-
-        # CLIP 모델로 유사도 검색 (Top-100)
-        result_json = clip_searcher.search_similarity(temp_image_path, top_k=100)
-        result_data = json.loads(result_json)
-
-        # 임시 파일 삭제
-        os.unlink(temp_image_path)
-
-        # 에러 체크
-        if "error" in result_data:
-            logger.error(f"CLIP 검색 에러: {result_data['error']}")
-            raise HTTPException(
-                status_code=500, detail=f"검색 중 오류 발생: {result_data['error']}"
-            )
+        # CLIP 모델로 유사도 검색 (Top-100, 임시 파일/JSON 직렬화 없이)
+        # 추론 실행기 스레드에서 디코딩/전처리/forward 수행 (동시 요청은 마이크로 배치로 묶임)
+        result_data = await search_executor.run(
+            clip_searcher.search, image_data, top_k=100, categories=category, tags=tags
+        )
 
         # 응답 포맷 변환
         top100_results = []
-        for result in result_data.get("results", []):
+        for result in result_data["results"]:
             top100_results.append(
                 {
                     "label": result["reference_name"],
@@ -378,8 +679,10 @@ async def search_similar_images(
         search_results = {
             "top100": top100_results,
             "processing_time": time.time() - start_time,
-            "total_results": len(result_data.get("results", [])),
+            "total_results": result_data["total_results"],
         }
+        if category or tags:
+            search_results["filters"] = {"category": category, "tags": tags}
 
         # 데이터베이스 저장 기능 임시 비활성화
         logger.info(f"검색 요청 처리 완료 - IP: {user_ip}, 파일: {image.filename}")
@@ -390,8 +693,11 @@ async def search_similar_images(
 
         return search_results
 
-    except HTTPException:
+    except (HTTPException, ExecutorSaturated):
         raise
+    except ValueError as e:
+        # 메타데이터 없이 필터 검색 요청 등
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"검색 중 예상치 못한 오류: {e}")
         raise HTTPException(status_code=500, detail=f"서버 오류: {str(e)}")
@@ -426,6 +732,65 @@ async def get_stats():
     }
 
 
+def _validate_generate_request(description: str, image: UploadFile, temperature: float, target_count: int):
+    """아이콘 생성 요청 입력 검증 (/generate, /generate/stream 공통)"""
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
+    
+    if not (0.0 <= temperature <= 1.0):
+        raise HTTPException(status_code=400, detail="temperature는 0.0과 1.0 사이의 값이어야 합니다.")
+    
+    if not (1 <= target_count <= 10):
+        raise HTTPException(status_code=400, detail="target_count는 1과 10 사이의 값이어야 합니다.")
+    
+    if len(description.strip()) == 0:
+        raise HTTPException(status_code=400, detail="설명 텍스트를 입력해주세요.")
+
+
+def _generated_filename(timestamp: str, session_id: str, description: str, index: int) -> str:
+    """GCS 업로드용 생성 아이콘 파일명"""
+    safe_description = "".join(c if c.isalnum() or c in '-_' else '_' for c in description[:20])
+    return f"generated/{timestamp}_{session_id}_{safe_description}_{index}.png"
+
+
+def _upload_generated_icons(description: str, generated_images: List[io.BytesIO]):
+    """
+    생성된 아이콘 base64 인코딩 및 GCS 업로드 (블로킹 - 생성 실행기 스레드에서 실행)
+    
+    Returns:
+        tuple: (결과 리스트, 세션 ID)
+    """
+    # 생성된 이미지들을 base64로 인코딩 및 GCS에 업로드
+    results = []
+    session_id = str(uuid.uuid4())[:8]  # 세션 고유 ID
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    for i, img_bytes in enumerate(generated_images):
+        img_bytes.seek(0)  # BytesIO 포인터를 처음으로 이동
+        png_data = img_bytes.read()
+        
+        # Base64 인코딩 (사용자 응답용)
+        base64_data = base64.b64encode(png_data).decode('utf-8')
+        
+        # GCS 업로드용 파일명 생성
+        filename = _generated_filename(timestamp, session_id, description, i + 1)
+        
+        # Google Cloud Storage에 업로드
+        gcs_url = upload_to_gcs(png_data, filename, "image/png")
+        
+        result_item = {
+            "id": i + 1,
+            "image_base64": base64_data,
+            "format": "PNG",
+            "filename": filename,
+            "gcs_url": gcs_url if gcs_url else None,
+            "gcs_uploaded": bool(gcs_url)
+        }
+        results.append(result_item)
+    
+    return results, session_id
+
+
 @app.post("/generate")
 async def generate_icon_api(
     request: Request,
@@ -446,27 +811,14 @@ async def generate_icon_api(
     Returns:
         JSON: 생성된 아이콘들의 base64 인코딩 결과
     """
-    import base64
-    
     start_time = time.time()
     
     # 입력 검증
-    if not image.content_type or not image.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
-    
-    if not (0.0 <= temperature <= 1.0):
-        raise HTTPException(status_code=400, detail="temperature는 0.0과 1.0 사이의 값이어야 합니다.")
-    
-    if not (1 <= target_count <= 10):
-        raise HTTPException(status_code=400, detail="target_count는 1과 10 사이의 값이어야 합니다.")
-    
-    if len(description.strip()) == 0:
-        raise HTTPException(status_code=400, detail="설명 텍스트를 입력해주세요.")
+    _validate_generate_request(description, image, temperature, target_count)
     
     try:
-        # 이미지 읽기 및 PIL 변환
+        # 이미지 읽기
         image_data = await image.read()
-        pil_image = Image.open(io.BytesIO(image_data))
         
         # 사용자 IP 추출
         user_ip = request.client.host if request.client else "unknown"
@@ -476,43 +828,20 @@ async def generate_icon_api(
             f"온도={temperature}, 개수={target_count}, IP={user_ip}"
         )
         
-        # 아이콘 생성 (generate_with_retries 함수 사용)
-        generated_images = generate_with_retries(
+        # Gemini 호출은 공유 클라이언트로 이벤트 루프에서 동시에 실행 (스레드를 점유하지 않음)
+        generated_images = await icon_generator.generate(
             input_text=description,
-            input_image=pil_image,
+            input_image=image_data,
             temperature=temperature,
             target_count=target_count,
-            max_retries=3
+            max_retries=3,
+            **GENERATE_OPTIONS
         )
         
-        # 생성된 이미지들을 base64로 인코딩 및 GCS에 업로드
-        results = []
-        session_id = str(uuid.uuid4())[:8]  # 세션 고유 ID
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        for i, img_bytes in enumerate(generated_images):
-            img_bytes.seek(0)  # BytesIO 포인터를 처음으로 이동
-            image_data = img_bytes.read()
-            
-            # Base64 인코딩 (사용자 응답용)
-            base64_data = base64.b64encode(image_data).decode('utf-8')
-            
-            # GCS 업로드용 파일명 생성
-            safe_description = "".join(c if c.isalnum() or c in '-_' else '_' for c in description[:20])
-            filename = f"generated/{timestamp}_{session_id}_{safe_description}_{i+1}.png"
-            
-            # Google Cloud Storage에 업로드
-            gcs_url = upload_to_gcs(image_data, filename, "image/png")
-            
-            result_item = {
-                "id": i + 1,
-                "image_base64": base64_data,
-                "format": "PNG",
-                "filename": filename,
-                "gcs_url": gcs_url if gcs_url else None,
-                "gcs_uploaded": bool(gcs_url)
-            }
-            results.append(result_item)
+        # GCS 업로드는 블로킹이므로 생성 실행기에서 처리
+        results, session_id = await generate_executor.run(
+            _upload_generated_icons, description, generated_images
+        )
         
         processing_time = time.time() - start_time
         
@@ -538,11 +867,245 @@ async def generate_icon_api(
         
         return response_data
         
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         logger.error(f"아이콘 생성 중 오류: {e}")
         raise HTTPException(status_code=500, detail=f"아이콘 생성 실패: {str(e)}")
 
 
+async def _generation_events(description: str, image_data: bytes, temperature: float, target_count: int):
+    """
+    아이콘 생성 이벤트 스트림
+
+    - icon  : 이미지가 디코딩되는 즉시 (base64 포함)
+    - upload: 해당 이미지의 GCS 업로드가 끝난 뒤 (업로드는 생성 실행기에서 병렬 처리)
+    - done  : 모든 생성/업로드가 끝난 뒤 요약 (time_to_first_icon 포함)
+    - error : 생성 중 오류
+
+    클라이언트 연결이 끊기면 남은 Gemini 호출은 취소된다.
+    """
+    start_time = time.time()
+    session_id = str(uuid.uuid4())[:8]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    events = asyncio.Queue()
+
+    async def produce():
+        try:
+            async with aclosing(icon_generator.stream(
+                description, image_data, temperature, target_count, max_retries=3, **GENERATE_OPTIONS
+            )) as icons:
+                async for img_bytes in icons:
+                    events.put_nowait(("icon", img_bytes.getvalue()))
+        except Exception as e:
+            logger.error(f"아이콘 생성 중 오류: {e}")
+            events.put_nowait(("error", str(e)))
+        finally:
+            events.put_nowait(("generated", None))
+
+    async def upload(index: int, png_data: bytes, filename: str):
+        try:
+            gcs_url = await generate_executor.run(upload_to_gcs, png_data, filename, "image/png")
+        except ExecutorSaturated:
+            logger.warning(f"⏳ 생성 실행기 포화로 업로드 생략: {filename}")
+            gcs_url = ""
+        events.put_nowait(("upload", {"event": "upload", "id": index, "filename": filename,
+                                      "gcs_url": gcs_url or None, "gcs_uploaded": bool(gcs_url)}))
+
+    producer = asyncio.ensure_future(produce())
+    uploads = []
+    remaining = 1  # 생성 작업 + 진행 중인 업로드 수
+    generated_count = 0
+    gcs_uploaded_count = 0
+    time_to_first_icon = None
+    try:
+        while remaining:
+            kind, payload = await events.get()
+            if kind == "icon":
+                generated_count += 1
+                if time_to_first_icon is None:
+                    time_to_first_icon = time.time() - start_time
+                filename = _generated_filename(timestamp, session_id, description, generated_count)
+                yield {
+                    "event": "icon",
+                    "id": generated_count,
+                    "image_base64": base64.b64encode(payload).decode('utf-8'),
+                    "format": "PNG",
+                    "filename": filename,
+                    "elapsed": time.time() - start_time,
+                }
+                uploads.append(asyncio.ensure_future(upload(generated_count, payload, filename)))
+                remaining += 1
+            elif kind == "upload":
+                remaining -= 1
+                gcs_uploaded_count += payload["gcs_uploaded"]
+                yield payload
+            elif kind == "error":
+                yield {"event": "error", "detail": f"아이콘 생성 실패: {payload}"}
+            else:
+                remaining -= 1
+
+        processing_time = time.time() - start_time
+        first_icon = f"{time_to_first_icon:.3f}초" if time_to_first_icon is not None else "없음"
+        logger.info(
+            f"아이콘 스트리밍 완료: {generated_count}개 생성, 첫 아이콘: {first_icon}, 처리시간: {processing_time:.3f}초"
+        )
+        yield {
+            "event": "done",
+            "success": generated_count > 0,
+            "description": description,
+            "generated_count": generated_count,
+            "requested_count": target_count,
+            "time_to_first_icon": time_to_first_icon,
+            "processing_time": processing_time,
+            "temperature": temperature,
+            "session_id": session_id,
+            "gcs_uploaded_count": gcs_uploaded_count,
+            "gcs_bucket": GCS_BUCKET_NAME,
+        }
+    finally:
+        # 클라이언트 연결 종료 시 남은 생성 호출 취소 (실행 중인 업로드 스레드는 끝까지 진행)
+        producer.cancel()
+        for task in uploads:
+            task.cancel()
+
+
+def _format_event(event: Dict[str, Any], sse: bool) -> str:
+    """이벤트 직렬화 (SSE: event/data 블록, NDJSON: 한 줄에 JSON 하나)"""
+    data = json.dumps(event, ensure_ascii=False)
+    if sse:
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def _run_generation_job(job: Dict[str, Any], image_data: bytes):
+    """생성 작업 실행 (스트리밍 생성과 같은 이벤트 스트림을 작업 문서에 기록)"""
+    return _generation_events(job["description"], image_data, job["temperature"], job["target_count"])
+
+
+# 워커 프로세스마다 GENERATE_JOB_WORKERS개의 생성 작업을 동시에 실행 (상태는 JOB_STORE에 기록)
+generation_jobs = GenerationJobs(
+    create_job_store(JOB_STORE, dsn=os.getenv("JOB_STORE_DSN") or os.getenv("DATABASE_URL")),
+    _run_generation_job,
+    workers=GENERATE_JOB_WORKERS,
+    max_queue=GENERATE_JOB_QUEUE,
+    retry_after=int(os.getenv("GENERATE_RETRY_AFTER", "10")),
+    ttl=GENERATE_JOB_TTL,
+    stale_after=GENERATE_JOB_STALE_AFTER,
+)
+
+
+@app.post("/generate/stream")
+async def generate_icon_stream_api(
+    request: Request,
+    description: str = Form(..., description="아이콘 설명 텍스트"),
+    image: UploadFile = File(..., description="사용자가 그린 손그림 이미지"),
+    temperature: float = Form(0.5, description="생성 모델 temperature (0.0-1.0)"),
+    target_count: int = Form(5, description="생성할 아이콘 개수 (1-10)")
+):
+    """
+    손그림을 픽토그램으로 변환하며, 생성되는 아이콘을 하나씩 스트리밍
+
+    기본 응답은 NDJSON(application/x-ndjson)이며, Accept: text/event-stream 이면 SSE로 보낸다.
+    이벤트 순서: icon(생성 즉시) -> upload(GCS 업로드 완료) ... -> done(요약)
+    """
+    _validate_generate_request(description, image, temperature, target_count)
+
+    image_data = await image.read()
+    user_ip = request.client.host if request.client else "unknown"
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    logger.info(
+        f"아이콘 스트리밍 요청: 설명='{description}', 이미지={image.filename}, "
+        f"온도={temperature}, 개수={target_count}, 형식={'sse' if sse else 'ndjson'}, IP={user_ip}"
+    )
+
+    async def body():
+        async for event in _generation_events(description, image_data, temperature, target_count):
+            yield _format_event(event, sse)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # 프록시 버퍼링 없이 이벤트를 바로 전달
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/generate/jobs", status_code=202)
+async def submit_generate_job(
+    request: Request,
+    description: str = Form(..., description="아이콘 설명 텍스트"),
+    image: UploadFile = File(..., description="사용자가 그린 손그림 이미지"),
+    temperature: float = Form(0.5, description="생성 모델 temperature (0.0-1.0)"),
+    target_count: int = Form(5, description="생성할 아이콘 개수 (1-10)")
+):
+    """
+    아이콘 생성 작업 제출 (작업 ID를 즉시 반환)
+
+    결과는 GET /generate/jobs/{job_id} 로 폴링하거나 /generate/jobs/{job_id}/ws 웹소켓으로 구독한다.
+    """
+    _validate_generate_request(description, image, temperature, target_count)
+
+    image_data = await image.read()
+    user_ip = request.client.host if request.client else "unknown"
+    job = await generation_jobs.submit(
+        {"description": description, "temperature": temperature, "target_count": target_count},
+        image_data,
+    )
+    logger.info(
+        f"아이콘 생성 작업 제출: id={job['id']}, 설명='{description}', 개수={target_count}, IP={user_ip}"
+    )
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/generate/jobs/{job['id']}",
+        "ws_url": f"/generate/jobs/{job['id']}/ws",
+    }
+
+
+@app.get("/generate/jobs/{job_id}")
+async def get_generate_job(job_id: str):
+    """
+    생성 작업 상태 조회 (어느 워커에서 실행 중이든 작업 저장소에서 조회)
+
+    Returns:
+        JSON: 상태(queued/running/succeeded/failed), 지금까지 생성된 결과, 오류
+    """
+    job = await generation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return job
+
+
+@app.websocket("/generate/jobs/{job_id}/ws")
+async def watch_generate_job(websocket: WebSocket, job_id: str):
+    """
+    생성 작업 구독
+
+    상태가 바뀌면 {"type": "status", ...}(결과 제외), 새 결과나 GCS 업로드 완료 시
+    {"type": "result", ...}를 보내고, 작업이 끝나면 연결을 닫는다.
+    """
+    await websocket.accept()
+    sent = {}  # 결과 ID -> 보낸 시점의 업로드 여부
+    found = False
+    try:
+        async for job in generation_jobs.watch(job_id, interval=GENERATE_JOB_POLL_INTERVAL):
+            found = True
+            await websocket.send_json({
+                "type": "status", **{key: value for key, value in job.items() if key != "results"}
+            })
+            for result in job["results"]:
+                if sent.get(result["id"]) != result["gcs_uploaded"]:
+                    await websocket.send_json({"type": "result", **result})
+                    sent[result["id"]] = result["gcs_uploaded"]
+        if not found:
+            await websocket.send_json({"type": "error", "detail": "작업을 찾을 수 없습니다"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+
 @app.get("/images")
 async def get_gcs_images(
     prefix: str = Query("", description="파일명 접두사 필터 (예: 'generated/', 'user_uploads/')"),
@@ -564,7 +1127,8 @@ async def get_gcs_images(
     """
     try:
         # GCS에서 이미지 목록 조회 (더 많은 개수를 가져옴)
-        images = list_gcs_images(prefix=prefix, limit=limit)
+        # GCS 조회는 블로킹이므로 스레드풀에서 실행 (추론 포화 시에도 응답 유지)
+        images = await run_in_threadpool(list_gcs_images, prefix=prefix, limit=limit)
         
         # 정렬 처리
         reverse_order = (order.lower() == "desc")
@@ -617,7 +1181,7 @@ async def get_recent_generated_images(
     """
     try:
         # 'generated/' 폴더의 이미지만 조회
-        all_images = list_gcs_images(prefix="generated/", limit=limit * 2)
+        all_images = await run_in_threadpool(list_gcs_images, prefix="generated/", limit=limit * 2)
         
         # 최근 N일 필터링
         from datetime import datetime, timedelta
@@ -651,6 +1215,28 @@ async def get_recent_generated_images(
         raise HTTPException(status_code=500, detail=f"최근 이미지 조회 실패: {str(e)}")
 
 
+def _download_gcs_image(filename: str):
+    """
+    GCS 이미지 다운로드 (블로킹 - 스레드풀에서 실행)
+
+    Returns:
+        tuple: (이미지 바이트, 콘텐츠 타입)
+    """
+    gcs_client = get_gcs_client()
+    if not gcs_client:
+        raise HTTPException(status_code=500, detail="GCS 클라이언트 초기화 실패")
+    
+    bucket = gcs_client.bucket(GCS_BUCKET_NAME)
+    blob = bucket.blob(filename)
+    
+    # 파일 존재 확인
+    if not blob.exists():
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다")
+    
+    # 이미지 데이터 다운로드 및 콘텐츠 타입 결정
+    return blob.download_as_bytes(), blob.content_type or "image/png"
+
+
 @app.get("/proxy/image/{filename:path}")
 @app.options("/proxy/image/{filename:path}")
 async def proxy_gcs_image(filename: str, request: Request):
@@ -680,23 +1266,8 @@ async def proxy_gcs_image(filename: str, request: Request):
         )
     
     try:
-        # GCS에서 이미지 다운로드
-        gcs_client = get_gcs_client()
-        if not gcs_client:
-            raise HTTPException(status_code=500, detail="GCS 클라이언트 초기화 실패")
-        
-        bucket = gcs_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(filename)
-        
-        # 파일 존재 확인
-        if not blob.exists():
-            raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다")
-        
-        # 이미지 데이터 다운로드
-        image_data = blob.download_as_bytes()
-        
-        # 콘텐츠 타입 결정
-        content_type = blob.content_type or "image/png"
+        # GCS 다운로드는 블로킹 I/O이므로 스레드풀에서 실행 (이벤트 루프를 막지 않음)
+        image_data, content_type = await run_in_threadpool(_download_gcs_image, filename)
         
         # 캐시 헤더 추가
         headers["Cache-Control"] = "public, max-age=3600"
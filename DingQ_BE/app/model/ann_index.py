@@ -0,0 +1,320 @@
+"""
+레퍼런스 벡터용 근사 최근접 이웃(ANN) 인덱스
+
+- IVFIndex  : numpy 전용 IVF (spherical k-means 코스 양자화 + 리스트별 연속 벡터)
+- HNSWIndex : hnswlib 기반 HNSW (선택 의존성)
+
+두 인덱스 모두 ReferenceIndex.matrix(그룹별 재정렬된 정규화 행렬)의 행 번호를
+반환하며, 파일에 레퍼런스 인덱스 버전을 함께 저장해 벡터가 바뀌면 재생성한다.
+
+오프라인 생성 (app/ 디렉토리에서):
+    python -m model.ann_index build --reference model/vectorweight.index --kind ivf --nlist 1024
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+# hnswlib는 선택 의존성 (ANN_INDEX=hnsw 일 때만 필요)
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSWLIB_AVAILABLE = False
+
+ANN_KINDS = ("ivf", "hnsw")
+
+
+def spherical_kmeans(vectors, num_clusters, iterations=10, sample_size=None, seed=0, chunk_size=65536):
+    """
+    코사인 유사도 기준 k-means (정규화된 벡터 입력)
+
+    Args:
+        vectors (np.ndarray): (N, D) 정규화된 벡터
+        num_clusters (int): 클러스터 수
+        iterations (int): 반복 횟수
+        sample_size (int): 학습에 사용할 샘플 수 (기본: 클러스터당 256개)
+        seed (int): 난수 시드
+        chunk_size (int): 할당 단계 청크 크기
+
+    Returns:
+        np.ndarray: (num_clusters, D) 정규화된 centroid
+    """
+    rng = np.random.default_rng(seed)
+    num_clusters = min(num_clusters, len(vectors))
+    sample_size = min(len(vectors), sample_size or num_clusters * 256)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, num_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = assign(sample, centroids, chunk_size)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=num_clusters)
+        filled = counts > 0
+        sums = np.empty_like(centroids)
+        sums[filled] = np.add.reduceat(sample[order], np.r_[0, np.cumsum(counts)[:-1]][filled], axis=0)
+        # 빈 클러스터는 임의 샘플로 다시 시작
+        sums[~filled] = sample[rng.choice(sample_size, int((~filled).sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return np.ascontiguousarray(centroids)
+
+
+def assign(vectors, centroids, chunk_size=65536):
+    """각 벡터를 가장 가까운(내적 최대) centroid에 할당"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+        assignment[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """
+    IVF (inverted file) 인덱스
+
+    벡터를 nlist개 클러스터로 나누고 리스트별로 연속 배치한 사본을 보관한다
+    (레퍼런스 행렬과 같은 크기의 float32 메모리 추가 사용).
+    쿼리는 centroid 점수 상위 nprobe개 리스트의 벡터만 정확히 점수화한다.
+    nprobe가 클수록 recall이 오르고 지연 시간이 늘어난다.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, centroids, list_offsets, row_ids, list_vectors, version=None, nprobe=8):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)  # (nlist + 1,)
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)  # 리스트 순서 -> 레퍼런스 행 번호
+        self.list_vectors = list_vectors
+        self.version = version
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, matrix, nlist=1024, iterations=10, version=None, nprobe=8, seed=0):
+        """
+        Args:
+            matrix (np.ndarray): (N, D) 정규화된 레퍼런스 행렬
+            nlist (int): 클러스터(역색인 리스트) 수
+            iterations (int): k-means 반복 횟수
+            version (str): 레퍼런스 인덱스 버전
+            nprobe (int): 기본 탐색 리스트 수
+        """
+        centroids = spherical_kmeans(matrix, nlist, iterations=iterations, seed=seed)
+        assignment = assign(matrix, centroids)
+        row_ids = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=len(centroids))
+        list_offsets = np.r_[0, np.cumsum(counts)]
+        list_vectors = np.ascontiguousarray(matrix[row_ids], dtype=np.float32)
+        return cls(centroids, list_offsets, row_ids, list_vectors, version=version, nprobe=nprobe)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def share_memory(self, share):
+        """fork 전 호출: 리스트 사본/행 번호/centroid를 공유 메모리 매핑으로 이동 (ReferenceIndex.share_memory)"""
+        self.centroids = share(self.centroids)
+        self.row_ids = share(self.row_ids)
+        self.list_vectors = share(self.list_vectors)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            row_ids=self.row_ids,
+            list_vectors=self.list_vectors,
+            version=np.array(self.version or ""),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        data = np.load(path)
+        return cls(
+            data["centroids"], data["list_offsets"], data["row_ids"], data["list_vectors"],
+            version=str(data["version"]) or None, nprobe=nprobe,
+        )
+
+    def search(self, query, k, probe=None):
+        """
+        Args:
+            query (np.ndarray): (D,) 정규화된 쿼리
+            k (int): 후보 행 수
+            probe (int): 탐색 리스트 수 (기본: self.nprobe)
+
+        Returns:
+            tuple: (레퍼런스 행 번호, 유사도) - 유사도 내림차순
+        """
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(probe or self.nprobe, self.nlist)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        starts, ends = self.list_offsets[lists], self.list_offsets[lists + 1]
+        scores = np.concatenate([self.list_vectors[s:e] @ query for s, e in zip(starts, ends)])
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            scores, positions = scores[top], positions[top]
+        order = np.argsort(-scores, kind="stable")
+        return self.row_ids[positions[order]], scores[order]
+
+
+class HNSWIndex:
+    """
+    HNSW 그래프 인덱스 (hnswlib, 내적 공간)
+
+    ef(탐색 후보 크기)가 클수록 recall이 오르고 지연 시간이 늘어난다.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, index, version=None, ef=128):
+        self.index = index
+        self.version = version
+        self.ef = ef
+        self.index.set_ef(ef)
+
+    @classmethod
+    def build(cls, matrix, m=16, ef_construction=200, version=None, ef=128, seed=0):
+        if not HNSWLIB_AVAILABLE:
+            raise ImportError("ANN_INDEX=hnsw 를 사용하려면 hnswlib 패키지가 필요합니다")
+        index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.init_index(max_elements=len(matrix), M=m, ef_construction=ef_construction, random_seed=seed)
+        index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(len(matrix)))
+        return cls(index, version=version, ef=ef)
+
+    def share_memory(self, share):
+        """hnswlib 그래프는 네이티브 메모리라 공유 매핑으로 옮길 수 없음 (fork 후 copy-on-write)"""
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        self.index.save_index(tmp_path)
+        os.replace(tmp_path, path)
+        with open(f"{path}.json", "w") as f:
+            json.dump({"version": self.version, "dim": self.index.dim, "count": self.index.get_current_count()}, f)
+
+    @classmethod
+    def load(cls, path, ef=128):
+        if not HNSWLIB_AVAILABLE:
+            raise ImportError("ANN_INDEX=hnsw 를 사용하려면 hnswlib 패키지가 필요합니다")
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        index = hnswlib.Index(space="ip", dim=meta["dim"])
+        index.load_index(path, max_elements=meta["count"])
+        return cls(index, version=meta.get("version"), ef=ef)
+
+    def search(self, query, k, probe=None):
+        """
+        Args:
+            query (np.ndarray): (D,) 정규화된 쿼리
+            k (int): 후보 행 수
+            probe (int): ef 값 (기본: self.ef, k보다 작으면 k 사용)
+
+        Returns:
+            tuple: (레퍼런스 행 번호, 유사도) - 유사도 내림차순
+        """
+        k = min(k, self.index.get_current_count())
+        ef = max(probe or self.ef, k)
+        if ef != self.index.ef:
+            self.index.set_ef(ef)
+        labels, distances = self.index.knn_query(np.asarray(query, dtype=np.float32), k=k, num_threads=1)
+        # ip 공간의 거리는 1 - 내적
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+
+def ann_path(reference_data_path, kind):
+    """레퍼런스 npz 옆에 저장되는 ANN 인덱스 파일 경로"""
+    base, _ = os.path.splitext(reference_data_path)
+    return f"{base}.{kind}.npz" if kind == "ivf" else f"{base}.{kind}.bin"
+
+
+def build_ann(kind, matrix, version=None, **params):
+    """종류별 ANN 인덱스 생성 (params: ivf=nlist/iterations/nprobe, hnsw=m/ef_construction/ef)"""
+    if kind == "ivf":
+        return IVFIndex.build(matrix, version=version, **params)
+    if kind == "hnsw":
+        return HNSWIndex.build(matrix, version=version, **params)
+    raise ValueError(f"알 수 없는 ANN 인덱스입니다: {kind} (선택: {', '.join(ANN_KINDS)})")
+
+
+def load_ann(kind, path, probe=None):
+    """저장된 ANN 인덱스 로드 (probe: ivf=nprobe, hnsw=ef)"""
+    if kind == "ivf":
+        return IVFIndex.load(path, **({"nprobe": probe} if probe else {}))
+    if kind == "hnsw":
+        return HNSWIndex.load(path, **({"ef": probe} if probe else {}))
+    raise ValueError(f"알 수 없는 ANN 인덱스입니다: {kind} (선택: {', '.join(ANN_KINDS)})")
+
+
+def load_or_build_ann(kind, reference_index, reference_data_path, probe=None):
+    """
+    레퍼런스 npz 옆의 ANN 인덱스를 로드하고, 없거나 버전이 다르면 생성 후 저장
+
+    Args:
+        kind (str): "ivf" | "hnsw"
+        reference_index (ReferenceIndex): 레퍼런스 인덱스
+        reference_data_path (str): 레퍼런스 npz 경로
+        probe (int): 탐색 폭 (ivf=nprobe, hnsw=ef)
+    """
+    path = ann_path(reference_data_path, kind)
+    if os.path.exists(path):
+        ann = load_ann(kind, path, probe=probe)
+        if ann.version == reference_index.base_version:
+            return ann
+        print(f"ANN 인덱스 버전이 레퍼런스와 다릅니다. 다시 생성합니다: {path}")
+
+    print(f"ANN 인덱스 생성 중 ({kind}): {path}")
+    params = default_params(kind, len(reference_index))
+    if probe:
+        params["nprobe" if kind == "ivf" else "ef"] = probe
+    ann = build_ann(kind, reference_index.matrix, version=reference_index.base_version, **params)
+    ann.save(path)
+    return ann
+
+
+def default_params(kind, num_vectors):
+    """벡터 수에 맞춘 기본 생성 파라미터"""
+    if kind == "ivf":
+        # nlist ~ 4 * sqrt(N)
+        return {"nlist": max(1, min(num_vectors, int(4 * np.sqrt(num_vectors))))}
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="레퍼런스 ANN 인덱스 오프라인 생성")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="레퍼런스 인덱스에서 ANN 인덱스를 생성해 옆에 저장")
+    build.add_argument("--reference", default="model/vectorweight.index", help="인덱스 디렉토리 또는 npz 경로")
+    build.add_argument("--kind", choices=ANN_KINDS, default="ivf")
+    build.add_argument("--nlist", type=int, default=None, help="IVF 리스트 수 (기본 4*sqrt(N))")
+    build.add_argument("--iterations", type=int, default=10, help="IVF k-means 반복 횟수")
+    build.add_argument("--m", type=int, default=16, help="HNSW 연결 수")
+    build.add_argument("--ef-construction", type=int, default=200)
+    args = parser.parse_args()
+
+    from model.reference_index import ReferenceIndex
+
+    reference = ReferenceIndex.load(args.reference)
+    if args.kind == "ivf":
+        params = default_params("ivf", len(reference))
+        if args.nlist:
+            params["nlist"] = args.nlist
+        params["iterations"] = args.iterations
+    else:
+        params = {"m": args.m, "ef_construction": args.ef_construction}
+
+    started = time.perf_counter()
+    ann = build_ann(args.kind, reference.matrix, version=reference.base_version, **params)
+    path = ann_path(args.reference, args.kind)
+    ann.save(path)
+    print(f"저장 완료: {path} ({len(reference)}개 벡터, {time.perf_counter() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    동적 마이크로 배치 스케줄러
+
+    동시에 들어온 요청을 최대 max_wait_ms 동안(또는 max_batch_size개가 찰 때까지)
+    모아 batch_fn 한 번으로 처리하고, 결과를 각 요청의 Future로 돌려준다.
+    대기 시간은 배치의 첫 요청이 큐에 들어온 시점부터 계산한다.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10.0, name="micro-batcher"):
+        """
+        Args:
+            batch_fn (Callable[[list], Sequence]): 입력 리스트를 받아 같은 길이의 결과를 반환하는 함수
+            max_batch_size (int): 한 배치의 최대 요청 수
+            max_wait_ms (float): 배치를 모으는 최대 대기 시간 (밀리초)
+            name (str): 워커 스레드 이름
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size는 1 이상이어야 합니다")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+
+        # 메트릭 (배치 크기 분포, 최근 대기/처리 시간)
+        self._batch_sizes = Counter()
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=1000)
+        self._total_items = 0
+        self._total_errors = 0
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """
+        요청 제출
+
+        Returns:
+            concurrent.futures.Future: batch_fn 결과 중 이 요청에 해당하는 값
+        """
+        future = Future()
+        # 종료 확인과 큐 추가를 한 잠금 안에서 (종료 신호 뒤에 요청이 들어가지 않도록)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("배치 스케줄러가 종료되었습니다")
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """요청을 제출하고 결과가 나올 때까지 대기"""
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        """워커 종료 (종료 신호 전에 제출된 요청은 처리 후 종료)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # 종료 신호는 현재 배치를 처리한 뒤 반영
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                self._drain()
+                return
+
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"batch_fn 결과 수({len(results)})가 입력 수({len(items)})와 다릅니다"
+                    )
+            except Exception as e:
+                logger.error(f"배치 처리 실패 (크기 {len(items)}): {e}")
+                with self._lock:
+                    self._total_errors += len(items)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._batch_sizes[len(items)] += 1
+                    self._total_items += len(items)
+                    self._run_times.append(finished - started)
+                    self._wait_times.extend(started - enqueued for _, _, enqueued in batch)
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def _drain(self):
+        """종료 신호 뒤에 남은 요청을 실패 처리"""
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                entry[1].set_exception(RuntimeError("배치 스케줄러가 종료되었습니다"))
+
+    def get_metrics(self):
+        """큐 깊이, 배치 크기 분포, 대기 시간 메트릭 반환"""
+        with self._lock:
+            wait_ms = np.array(self._wait_times) * 1000
+            run_ms = np.array(self._run_times) * 1000
+            batches = sum(self._batch_sizes.values())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "total_batches": batches,
+                "total_items": self._total_items,
+                "total_errors": self._total_errors,
+                "avg_batch_size": round(self._total_items / batches, 2) if batches else 0,
+                "batch_size_distribution": {
+                    str(size): count for size, count in sorted(self._batch_sizes.items())
+                },
+                "wait_ms_p50": round(float(np.percentile(wait_ms, 50)), 2) if wait_ms.size else 0,
+                "wait_ms_p99": round(float(np.percentile(wait_ms, 99)), 2) if wait_ms.size else 0,
+                "batch_run_ms_avg": round(float(run_ms.mean()), 2) if run_ms.size else 0,
+            }
@@ -1,48 +1,313 @@
 import numpy as np
 import torch
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
-from sklearn.metrics.pairwise import cosine_similarity
-import cv2
+from transformers import CLIPImageProcessor, CLIPModel, CLIPProcessor, CLIPVisionModelWithProjection
+import io
 import json
 import os
+import threading
+import time
+
+from model.ann_index import load_or_build_ann
+from model.batching import MicroBatcher
+from model.delta_index import DeltaStore, delta_path
+from model.index_watch import IndexWatcher, source_signature
+from model.engines import ImageEncoder, create_engine
+from model.icon_metadata import normalize_filter, read_metadata
+from model.preprocess import FusedPreprocessor, augment_icon, binarize_icon
+from model.query_cache import QueryCache
+from model.reference_index import ReferenceIndex
+from model.vector_store import InMemoryVectorStore
 
 class CLIPImageSearcher:
     """
     CLIP 모델을 사용한 이미지 유사도 검색 클래스
     """
     
-    def __init__(self, reference_data_path="reference_combined_augmented_posted_data.npz", model_name="openai/clip-vit-base-patch32"):
+    def __init__(self, reference_data_path="reference_combined_augmented_posted_data.npz", model_name="openai/clip-vit-base-patch32",
+                 engine="fp32", onnx_path=None, vision_only=True, fused_preprocess=True,
+                 shortlist_size=0, ann_index=None, ann_probe=None, precision="float32", rerank_factor=2,
+                 vector_store=None, metadata_path=None, num_threads=None, lazy_engine=False):
         """
         초기화 - 모델과 레퍼런스 데이터를 한번만 로드
         
         Args:
             reference_data_path (str): 레퍼런스 데이터 파일 경로
             model_name (str): 사용할 CLIP 모델명
+            engine (str): 이미지 추론 엔진 ("fp32" | "int8" | "onnx")
+            onnx_path (str): onnx 엔진용 그래프 경로 (기본: 모델 디렉토리, 없으면 내보내기)
+            vision_only (bool): 비전 타워 + 투영층만 로드 (텍스트 타워/토크나이저 제외)
+            fused_preprocess (bool): 이진화 결과를 룩업 테이블로 바로 정규화 (PIL/processor 경로 생략)
+            shortlist_size (int): 2단계 검색의 centroid 후보 그룹 수 (0이면 전수 검색)
+            ann_index (str): ANN 인덱스 종류 ("ivf" | "hnsw", None이면 사용 안 함)
+            ann_probe (int): ANN 탐색 폭 (ivf=nprobe, hnsw=ef; 클수록 recall↑ 지연↑)
+            precision (str): 1차 점수 정밀도 ("float32" | "float16" | "int8")
+            rerank_factor (int): 저정밀도 사용 시 float32로 재점수화할 후보 수 배율 (top_k 대비)
+            vector_store (VectorStore): 검색에 사용할 외부 벡터 저장소 (예: PgVectorStore,
+                None이면 레퍼런스 인덱스를 메모리에서 검색)
+            metadata_path (str): 아이콘 메타데이터 CSV (카테고리/태그 필터 검색용, None이면 필터 미지원)
+            num_threads (int): onnx 엔진 intra-op 스레드 수 (None이면 세션 생성 시점의
+                torch.get_num_threads(), 즉 TORCH_NUM_THREADS로 설정된 워커당 스레드 수)
+            lazy_engine (bool): onnx 세션 생성을 engine.load()까지 미룸 (gunicorn 마스터 사전 로드용,
+                fork 후 워커에서 load 호출)
         """
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model_name = model_name
         self.reference_data_path = reference_data_path
+        self.shortlist_size = shortlist_size
+        self.ann_index = ann_index
+        self.ann_probe = ann_probe
+        self.precision = precision
+        self.rerank_factor = rerank_factor
+        self.external_store = vector_store
+        self.metadata = read_metadata(metadata_path) if metadata_path else None
 
         # CLIP 모델 로드
+        # 검색은 이미지 경로만 사용하므로 기본적으로 비전 타워와 투영층만 로드
+        # (CLIPModel.get_image_features와 동일한 임베딩, 메모리/로딩 시간 절감)
         print("CLIP 모델을 로드하는 중...")
-        self.model = CLIPModel.from_pretrained(model_name)
-        self.processor = CLIPProcessor.from_pretrained(model_name)
-        print("모델 로드 완료")
+        if vision_only:
+            self.model = CLIPVisionModelWithProjection.from_pretrained(model_name)
+            self.processor = CLIPImageProcessor.from_pretrained(model_name)
+        else:
+            self.model = CLIPModel.from_pretrained(model_name)
+            self.processor = CLIPProcessor.from_pretrained(model_name)
+        print(f"모델 로드 완료 ({'vision-only' if vision_only else 'full'})")
+        
+        # 이진화 이미지 -> CLIP 입력 텐서 직접 변환 (processor 설정이 호환되지 않으면 None)
+        self.fused_preprocessor = FusedPreprocessor.from_processor(self.processor) if fused_preprocess else None
+        self.input_size = (self.fused_preprocessor.size,) * 2 if self.fused_preprocessor is not None else (224, 224)
+        
+        # 이미지 추론 엔진 (fp32 PyTorch / 동적 int8 양자화 / ONNX Runtime)
+        if onnx_path is None:
+            onnx_path = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), f"{model_name.replace('/', '_')}_image.onnx"
+            )
+        self.engine = create_engine(
+            engine, ImageEncoder(self.model), device=self.device, onnx_path=onnx_path,
+            num_threads=num_threads, lazy=lazy_engine,
+        )
+        print(f"추론 엔진: {self.engine.name}")
+        
+        # 동시 요청 마이크로 배치 (enable_batching 호출 시 활성화)
+        self.batcher = None
+        # 반복 스케치 결과 캐시 (enable_cache 호출 시 활성화)
+        self.query_cache = None
+        # 레퍼런스 파일 변경 감시 (enable_index_watch 호출 시 활성화)
+        self.index_watcher = None
+        self._reload_lock = threading.Lock()
+        self.index_generation = 0
+        self.index_loaded_at = None
+        self._base_signature = None
         
         # 레퍼런스 데이터 로드
         self._load_reference_data()
     
     def _load_reference_data(self):
         """레퍼런스 데이터 로드"""
-        if not os.path.exists(self.reference_data_path):
-            raise FileNotFoundError(f"레퍼런스 데이터 파일을 찾을 수 없습니다: {self.reference_data_path}")
+        self._activate_index(self._build_index(self.reference_data_path), self.reference_data_path)
+
+    def _build_index(self, reference_data_path):
+        """
+        레퍼런스 인덱스 생성 (정밀도/ANN 설정 포함, 검색기 상태는 바꾸지 않음)
+        
+        Args:
+            reference_data_path (str): 인덱스 디렉토리 또는 npz 경로
+        
+        Returns:
+            ReferenceIndex: 검색에 바로 쓸 수 있는 인덱스
+        """
+        if not os.path.exists(reference_data_path):
+            raise FileNotFoundError(f"레퍼런스 데이터 파일을 찾을 수 없습니다: {reference_data_path}")
         
         print("레퍼런스 데이터를 로드하는 중...")
-        data = np.load(self.reference_data_path, allow_pickle=True)
-        self.reference_vectors = data["vectors"]
-        self.reference_labels = data["labels"]
-        print(f"레퍼런스 벡터 개수: {len(self.reference_labels)}개")
+        # 인덱스 디렉토리는 mmap으로 즉시 로드, 기존 npz는 로드 시 한 번만 L2 정규화
+        index = ReferenceIndex.load(reference_data_path)
+        print(f"레퍼런스 벡터 개수: {len(index)}개 (버전 {index.version})")
+        
+        # 저정밀도 1차 점수 + float32 재점수화
+        if self.precision != "float32":
+            index.set_precision(self.precision, rerank_factor=self.rerank_factor)
+            print(f"레퍼런스 1차 점수 정밀도: {self.precision} ({index.coarse.nbytes / 1024 ** 2:.1f}MB)")
+        
+        header = index.header
+        if header and header.get("model_name") and header["model_name"] != self.model_name:
+            print(f"경고: 레퍼런스 인덱스 모델({header['model_name']})과 검색 모델({self.model_name})이 다릅니다")
+        
+        # ANN 인덱스 (npz 옆에 저장된 파일 사용, 없거나 버전이 다르면 생성)
+        if self.ann_index:
+            ann = load_or_build_ann(self.ann_index, index, reference_data_path, probe=self.ann_probe)
+            index.attach_ann(ann, probe=self.ann_probe)
+            print(f"ANN 인덱스: {ann.kind}")
+        
+        # 카테고리/태그별 파티션 (필터 검색은 해당 행만 점수화)
+        if self.metadata is not None:
+            index.attach_metadata(self.metadata)
+            print(f"아이콘 메타데이터: 카테고리 {len(index.partitions.categories)}개, 태그 {len(index.partitions.tag_masks)}개")
+        
+        # 증분 추가된 아이콘 (기준 버전이 같은 delta 파일만 반영)
+        index.attach_delta(DeltaStore(delta_path(reference_data_path), index.group_names, index.dim, index.base_version))
+        if len(index.delta):
+            print(f"증분 추가 벡터: {len(index.delta)}개 (신규 아이콘 {len(index.delta.new_group_names)}개)")
+        return index
+
+    def _activate_index(self, index, reference_data_path):
+        """
+        검색에 사용할 인덱스 교체
+        
+        self.index 대입 한 번으로 교체되고 search()는 시작 시점의 인덱스를 끝까지
+        사용하므로, 진행 중인 쿼리가 이전/새 인덱스를 섞어 쓰지 않는다.
+        캐시는 인덱스 버전이 바뀌면 다음 조회 시 비워진다.
+        """
+        self.index = index
+        self.reference_data_path = reference_data_path
+        self.reference_labels = index.labels
+        self.index_generation += 1
+        self.index_loaded_at = time.time()
+        self._base_signature = source_signature(reference_data_path)
+        self.vector_store = self.external_store or InMemoryVectorStore(index, shortlist=self.shortlist_size)
+
+    def reload_index(self, reference_data_path=None):
+        """
+        레퍼런스 인덱스 재로드 (CLIP 모델은 다시 로드하지 않음)
+        
+        새 인덱스를 모두 만든 뒤에 교체하므로, 생성 중에도 기존 인덱스로 검색이 계속되고
+        생성에 실패하면 기존 인덱스가 그대로 유지된다. 동시 재로드는 순서대로 처리한다.
+        
+        Args:
+            reference_data_path (str): 새 레퍼런스 경로 (기본: 현재 경로)
+        
+        Returns:
+            dict: 이전/현재 인덱스 버전과 소요 시간
+        """
+        with self._reload_lock:
+            path = reference_data_path or self.reference_data_path
+            previous = self.index.version
+            started = time.perf_counter()
+            self._activate_index(self._build_index(path), path)
+            if self.index_watcher is not None:
+                self.index_watcher.mark_current()
+            return {
+                "previous_version": previous,
+                **self.index_info(),
+                "reload_seconds": round(time.perf_counter() - started, 3),
+            }
+
+    def index_info(self):
+        """현재 사용 중인 레퍼런스 인덱스 정보 (헬스체크/관리용)"""
+        index = self.index
+        header = index.header or {}
+        return {
+            "version": index.version,
+            "content_hash": header.get("content_hash", index.version),
+            "generation": self.index_generation,
+            "source": self.reference_data_path,
+            "format": "directory" if index.header else "npz",
+            "created_at": header.get("created_at"),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.index_loaded_at)),
+            "vectors": len(index),
+            "icons": index.num_groups,
+            "delta": index.delta.get_metrics() if index.delta is not None else None,
+            "precision": index.precision,
+            "ann": index.ann.kind if index.ann is not None else None,
+            "vector_store": self.vector_store.name,
+        }
+
+    def refresh_index(self):
+        """
+        레퍼런스 변경 반영 (기준 인덱스가 바뀌었으면 재로드, 아니면 delta 파일만 동기화)
+        
+        다른 워커가 add_icons로 추가한 아이콘은 재로드 없이 sync()로 가져온다.
+        """
+        if source_signature(self.reference_data_path) != self._base_signature:
+            return self.reload_index()
+        added = self.index.delta.sync()
+        if added:
+            print(f"delta 동기화: {added}개 벡터 추가 (버전 {self.index.version})")
+        return self.index_info()
+
+    def _watch_signature(self):
+        """자동 감시용 시그니처 (기준 인덱스 + delta 커밋 로그)"""
+        path = self.reference_data_path
+        base = source_signature(path)
+        if base is None:
+            return None
+        return base, source_signature(os.path.join(delta_path(path), "labels.jsonl"))
+
+    def add_icons(self, icons, augmentations=6, seed=None):
+        """
+        새 아이콘을 재빌드/재시작 없이 검색 인덱스에 추가
+        
+        원본과 증강 이미지를 한 번의 배치로 임베딩해 delta 파일에 기록하고,
+        현재 인덱스의 청크 버퍼에 바로 반영한다 (다음 검색부터 결과에 포함).
+        레퍼런스 생성 노트북과 달리 텍스트 임베딩 평균 없이 이미지 임베딩만 사용한다.
+        
+        Args:
+            icons (Mapping[str, Any] | Sequence[tuple[str, Any]]): 아이콘명 -> 이미지
+                (PIL 이미지, numpy 배열, 바이트 또는 경로)
+            augmentations (int): 아이콘당 증강 이미지 수 (레이블 '<이름>_augN')
+            seed (int): 증강 난수 시드
+        
+        Returns:
+            dict: 추가된 아이콘/벡터 수와 현재 인덱스 버전
+        """
+        items = list(icons.items()) if hasattr(icons, "items") else list(icons)
+        if not items:
+            raise ValueError("추가할 아이콘이 없습니다")
+        for name, _ in items:
+            if not name or "_aug" in name:
+                raise ValueError(f"아이콘 이름이 올바르지 않습니다: {name!r}")
+        
+        rng = np.random.default_rng(seed)
+        binaries, labels = [], []
+        for name, image in items:
+            binary = self.preprocess_icon_array(self.load_image(image), size=self.input_size)
+            binaries.append(binary)
+            labels.append(name)
+            for i in range(augmentations):
+                binaries.append(augment_icon(binary, rng))
+                labels.append(f"{name}_aug{i + 1}")
+        
+        vectors = np.concatenate([
+            self._embed_pixels(self._pixel_values_from_binary(binaries[start:start + 32]))
+            for start in range(0, len(binaries), 32)
+        ])
+        
+        # 재로드와 겹치지 않도록 (추가 대상 인덱스가 중간에 바뀌지 않게) 직렬화
+        with self._reload_lock:
+            index = self.index
+            index.delta.append(vectors, labels)
+            return {
+                "icons": len(items),
+                "vectors": len(labels),
+                "version": index.version,
+                "delta": index.delta.get_metrics(),
+            }
+
+    def enable_index_watch(self, interval=10.0):
+        """
+        레퍼런스 파일 변경 시 자동 재로드 (프로세스마다 감시 스레드 1개)
+        
+        Args:
+            interval (float): 변경 확인 주기 (초)
+        """
+        if self.index_watcher is not None:
+            self.index_watcher.stop()
+        self.index_watcher = IndexWatcher(self._watch_signature, self.refresh_index, interval=interval).start()
+
+    def preprocess_icon_array(self, pil_image, size=(224, 224), pad_color=255):
+        """
+        아이콘 이미지 전처리 (이진화 + 노이즈 제거 + 비율 유지 리사이즈 + 중앙 패딩)
+        
+        Args:
+            pil_image (PIL.Image): 입력 이미지
+            size (tuple): 출력 크기 (height, width)
+            pad_color (int): 패딩 색상
+        
+        Returns:
+            np.ndarray: (height, width) uint8 전처리 결과
+        """
+        return binarize_icon(pil_image, size=size, pad_color=pad_color)
 
     def preprocess_icon_image(self, pil_image, size=(224, 224), pad_color=255):
         """
@@ -53,57 +318,174 @@ class CLIPImageSearcher:
             size (tuple): 출력 크기 (height, width)
             pad_color (int): 패딩 색상
         
-        Returns:url
+        Returns:
             PIL.Image: 전처리된 이미지
         """
-        img = np.array(pil_image.convert("L"))  # 흑백 변환
-        _, binary = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV)  # 이진화
-        kernel = np.ones((3, 3), np.uint8)
-        clean = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)  # 노이즈 제거
+        padded = self.preprocess_icon_array(pil_image, size=size, pad_color=pad_color)
+        return Image.fromarray(padded).convert("RGB")
+
+    def load_image(self, image):
+        """
+        검색 입력을 PIL 이미지로 변환 (임시 파일 없이 메모리에서 처리)
         
-        h, w = clean.shape
-        scale = min(size[0]/h, size[1]/w)  # 비율 유지하며 리사이즈
-        nh, nw = int(h*scale), int(w*scale)
-        resized = cv2.resize(clean, (nw, nh))
+        Args:
+            image (PIL.Image | np.ndarray | bytes | str): PIL 이미지, numpy 배열,
+                인코딩된 이미지 바이트 또는 이미지 파일 경로
+        
+        Returns:
+            PIL.Image: 입력 이미지
+        """
+        if isinstance(image, Image.Image):
+            return image
+        if isinstance(image, np.ndarray):
+            return Image.fromarray(image)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return Image.open(io.BytesIO(image))
+        if isinstance(image, (str, os.PathLike)):
+            if not os.path.exists(image):
+                raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {image}")
+            return Image.open(image)
+        raise TypeError(f"지원하지 않는 이미지 타입입니다: {type(image).__name__}")
+
+    def enable_batching(self, max_batch_size=8, max_wait_ms=10.0):
+        """
+        동시 요청 마이크로 배치 활성화
         
-        # 중앙정렬 패딩
-        top = (size[0] - nh) // 2
-        bottom = size[0] - nh - top
-        left = (size[1] - nw) // 2
-        right = size[1] - nw - left
-        padded = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(pad_color,))
+        Args:
+            max_batch_size (int): 한 번의 forward에 묶을 최대 이미지 수
+            max_wait_ms (float): 배치를 모으는 최대 대기 시간 (밀리초)
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+        self.batcher = MicroBatcher(
+            self._embed_pixel_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="clip-embedding-batcher",
+        )
+
+    def enable_cache(self, max_size=1024, ttl_seconds=600.0, perceptual=False, max_distance=0):
+        """
+        반복/유사 스케치 결과 캐시 활성화 (키: 전처리된 이진화 이미지)
         
-        pil_processed = Image.fromarray(padded).convert("RGB")
-        return pil_processed
+        Args:
+            max_size (int): 최대 캐시 항목 수
+            ttl_seconds (float): 항목 유효 시간 (초)
+            perceptual (bool): perceptual hash 기반 근사 중복 조회 사용 여부
+            max_distance (int): 근사 일치로 인정할 최대 해밍 거리
+        """
+        self.query_cache = QueryCache(
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+            perceptual=perceptual,
+            max_distance=max_distance,
+        )
+
+    def _pixel_values(self, processed_images):
+        """전처리된 이미지 리스트를 CLIP 입력 텐서 (N, 3, 224, 224)로 변환 (processor 경로)"""
+        inputs = self.processor(images=processed_images, return_tensors="np")  # type: ignore
+        return inputs["pixel_values"].astype(np.float32, copy=False)
+
+    def _pixel_values_from_binary(self, binaries):
+        """이진화 이미지 리스트를 CLIP 입력 (N, 3, H, W) float32로 변환"""
+        if self.fused_preprocessor is not None:
+            return self.fused_preprocessor(binaries)
+        return self._pixel_values([Image.fromarray(binary).convert("RGB") for binary in binaries])
+
+    def _embed_pixels(self, pixel_values):
+        """CLIP 입력 텐서에서 L2 정규화된 임베딩 (N, D) 계산"""
+        features = self.engine(pixel_values)
+        features = features / np.linalg.norm(features, axis=1, keepdims=True)  # L2 정규화
+        return features
 
-    def extract_image_features(self, image_path):
+    def _embed_pixel_batch(self, pixel_values_list):
+        """배치 스케줄러용: 요청별 (1, 3, H, W) 입력을 묶어 한 번에 forward"""
+        return list(self._embed_pixels(np.concatenate(pixel_values_list, axis=0)))
+
+    def embed_images(self, images):
+        """
+        여러 이미지를 한 번의 forward로 임베딩
+        
+        Args:
+            images (list): PIL 이미지, numpy 배열, 바이트 또는 경로 리스트
+        
+        Returns:
+            np.ndarray: (N, D) 정규화된 특징 벡터
+        """
+        binaries = [self.preprocess_icon_array(self.load_image(image), size=self.input_size) for image in images]
+        return self._embed_pixels(self._pixel_values_from_binary(binaries))
+
+    def extract_image_features(self, image):
         """
         이미지에서 특징 벡터 추출
         
+        배치 스케줄러가 활성화되어 있으면 전처리는 호출 스레드에서 하고,
+        CLIP forward는 동시에 들어온 다른 요청과 묶어서 실행한다.
+        
         Args:
-            image_path (str): 이미지 파일 경로
+            image (PIL.Image | np.ndarray | bytes | str): 검색할 이미지 또는 파일 경로
         
         Returns:
             np.ndarray: 정규화된 특징 벡터
         """
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {image_path}")
+        return self._embed_binary(self.preprocess_icon_array(self.load_image(image), size=self.input_size))
+
+    def _embed_binary(self, binary):
+        """전처리된 이진화 이미지 한 장의 임베딩 (배치 스케줄러 경유)"""
+        pixel_values = self._pixel_values_from_binary([binary])
         
-        image = Image.open(image_path)
-        processed_image = self.preprocess_icon_image(image)
-        inputs = self.processor(images=[processed_image], return_tensors="pt")  # type: ignore
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        if self.batcher is not None:
+            return self.batcher(pixel_values)
+        return self._embed_pixels(pixel_values)[0]
+    
+    def search(self, image, top_k=100, categories=None, tags=None):
+        """
+        이미지 유사도 검색 (구조화된 결과 반환)
         
-        with torch.no_grad():
-            features = self.model.get_image_features(**inputs)
+        Args:
+            image (PIL.Image | np.ndarray | bytes | str): 검색할 이미지 또는 파일 경로
+            top_k (int): 상위 k개 결과 반환
+            categories (str | Sequence[str]): 카테고리 필터 (여러 개면 OR, 'a,b' 형식 허용)
+            tags (str | Sequence[str]): 태그 필터 (여러 개면 AND)
         
-        features = features.cpu().numpy()
-        features = features / np.linalg.norm(features)  # L2 정규화
-        return features[0]
-    
+        Returns:
+            dict: {"total_results": int, "results": [{"reference_name", "similarity_score"}, ...]}
+        """
+        categories, tags = normalize_filter(categories), normalize_filter(tags)
+        filtered = categories is not None or tags is not None
+        binary = self.preprocess_icon_array(self.load_image(image), size=self.input_size)
+        store = self.vector_store
+        version = store.version
+        
+        # 같은(또는 거의 같은) 스케치 재요청이면 CLIP forward 생략
+        # (캐시 결과는 필터 없는 검색 기준이므로 필터 검색은 임베딩만 재사용)
+        cached = None
+        if self.query_cache is not None:
+            cached = self.query_cache.get(binary, version)
+            if cached is not None and cached.top_k >= top_k and not filtered:
+                results = cached.results[:top_k]
+                return {"total_results": len(results), "results": results}
+        
+        # 쿼리 이미지 임베딩 추출
+        query_vector = cached.embedding if cached is not None else self._embed_binary(binary)
+        
+        # 유사도 계산 + 원본 아이콘별 최대값으로 중복 제거 후 상위 k개 선택
+        unique_results = store.search(query_vector, top_k=top_k, categories=categories, tags=tags)
+        
+        if self.query_cache is not None:
+            if not filtered:
+                self.query_cache.put(binary, version, query_vector, unique_results, top_k)
+            elif cached is None:
+                self.query_cache.put(binary, version, query_vector, [], 0)
+        
+        return {
+            "total_results": len(unique_results),
+            "results": unique_results
+        }
+
     def search_similarity(self, image_path, top_k=100):
         """
-        이미지 유사도 검색 함수
+        이미지 유사도 검색 함수 (JSON 문자열 반환, CLI/디버깅용)
         
         Args:
             image_path (str): 검색할 이미지 파일 경로
@@ -113,43 +495,7 @@ class CLIPImageSearcher:
             str: JSON 형태의 검색 결과
         """
         try:
-            # 쿼리 이미지 임베딩 추출
-            query_vector = self.extract_image_features(image_path).reshape(1, -1)
-            
-            # 유사도 계산
-            similarities = cosine_similarity(query_vector, self.reference_vectors)[0]
-            
-            # 상위 결과 추출 (중복 제거)
-            top_indices = similarities.argsort()[::-1]
-            
-            unique_results = []
-            seen_base_names = set()
-            
-            for idx in top_indices:
-                label = self.reference_labels[idx]
-                # '_aug' 이전까지를 원본명으로 사용
-                if "_aug" in label:
-                    base_name = label.split("_aug")[0]
-                else:
-                    base_name = label
-                
-                if base_name not in seen_base_names:
-                    seen_base_names.add(base_name)
-                    unique_results.append({
-                        "reference_name": base_name,
-                        "similarity_score": float(similarities[idx])
-                    })
-                
-                if len(unique_results) >= top_k:
-                    break
-            
-            # 결과를 JSON 형태로 반환
-            result = {
-                "query_image": image_path,
-                "total_results": len(unique_results),
-                "results": unique_results
-            }
-            
+            result = {"query_image": image_path, **self.search(image_path, top_k=top_k)}
             return json.dumps(result, ensure_ascii=False, indent=2)
             
         except Exception as e:
@@ -160,8 +506,10 @@ class CLIPImageSearcher:
             return json.dumps(error_result, ensure_ascii=False, indent=2)
 
 if __name__ == "__main__":
-    query_image_path = "test.png"
-    reference_data_path = "vectorweight.npz"
+    # app/ 디렉토리에서 실행: python -m model.clip_search
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    query_image_path = os.path.join(current_dir, "test.png")
+    reference_data_path = os.path.join(current_dir, "vectorweight.npz")
 
     # 검색기 초기화 (모델과 데이터를 한번만 로드)
     searcher = CLIPImageSearcher(reference_data_path)
@@ -0,0 +1,348 @@
+"""
+레퍼런스 인덱스 증분 추가 (delta)
+
+새 아이콘 벡터는 기존 행렬을 재할당하지 않고 고정 크기 청크 버퍼에 추가하며,
+레퍼런스 경로 옆 delta 디렉토리에 추가 전용(append-only)으로 기록한다.
+
+    <reference>.delta/
+        header.json   : {"base_version", "dim"} - 기준 인덱스와 버전이 다르면 무시
+        vectors.f32   : (M, D) float32 원시 행 (추가 전용)
+        labels.jsonl  : 행별 {"label": ...} (커밋 로그: 레이블이 기록된 행까지만 유효)
+
+여러 워커가 같은 delta 파일에 추가할 수 있도록 기록은 파일 잠금(fcntl) 안에서 하고,
+각 워커는 sync()로 파일에서 자신이 아직 읽지 않은 행을 가져온다.
+compact()는 기준 인덱스 디렉토리를 delta와 합친 인덱스로 제자리 교체하고 delta를 비운다.
+(npz 레퍼런스는 다른 워커가 계속 npz를 읽으므로 먼저 인덱스 디렉토리로 변환해야 한다)
+
+사용법 (app/ 디렉토리에서):
+    python -m model.delta_index compact model/vectorweight.index
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+# 파일 잠금은 POSIX 전용 (Windows 로컬 개발 환경에서는 단일 프로세스 가정)
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+
+def write_json_atomic(path, data):
+    """임시 파일에 쓴 뒤 os.replace로 교체 (읽는 쪽이 쓰다 만 파일을 보지 않도록)"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def delta_path(reference_data_path):
+    """레퍼런스(npz 또는 인덱스 디렉토리) 옆 delta 디렉토리 경로"""
+    base, _ = os.path.splitext(os.path.normpath(reference_data_path))
+    return f"{base}.delta"
+
+
+class ChunkedBuffer:
+    """
+    행 추가 전용 청크 버퍼
+
+    chunk_rows 단위로 배열을 할당해 추가 시 기존 행을 복사하지 않는다.
+    새 행은 count 갱신 전에 기록되므로, count를 먼저 읽은 쿼리는 완성된 행만 본다.
+    """
+
+    def __init__(self, dim, chunk_rows=1024, dtype=np.float32):
+        self.dim = dim
+        self.chunk_rows = chunk_rows
+        self.dtype = dtype
+        self.chunks = []
+        self.count = 0
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self.dtype).reshape(-1, self.dim)
+        written = 0
+        position = self.count
+        while written < len(rows):
+            chunk_index, offset = divmod(position, self.chunk_rows)
+            if chunk_index == len(self.chunks):
+                self.chunks.append(np.empty((self.chunk_rows, self.dim), dtype=self.dtype))
+            take = min(self.chunk_rows - offset, len(rows) - written)
+            self.chunks[chunk_index][offset:offset + take] = rows[written:written + take]
+            written += take
+            position += take
+        self.count = position  # 기록 완료 후 공개
+
+    def views(self, count=None):
+        """앞에서부터 count개 행을 청크별 뷰로 반환"""
+        count = self.count if count is None else count
+        views = []
+        for chunk_index in range(0, (count + self.chunk_rows - 1) // self.chunk_rows):
+            rows = min(self.chunk_rows, count - chunk_index * self.chunk_rows)
+            views.append(self.chunks[chunk_index][:rows])
+        return views
+
+    @property
+    def nbytes(self):
+        return len(self.chunks) * self.chunk_rows * self.dim * np.dtype(self.dtype).itemsize
+
+
+class DeltaStore:
+    """
+    기준 ReferenceIndex에 추가된 아이콘 벡터 (메모리 청크 버퍼 + delta 파일)
+
+    그룹(원본 아이콘)은 기준 인덱스와 같은 규칙('_aug' 이전 이름)으로 묶는다.
+    기준 인덱스에 이미 있는 이름이면 그 그룹에, 없으면 기준 그룹 뒤에 새 그룹을 만든다.
+    """
+
+    def __init__(self, path, base_names, dim, base_version, chunk_rows=1024):
+        """
+        Args:
+            path (str): delta 디렉토리 경로 (없으면 첫 추가 시 생성)
+            base_names (Sequence[str]): 기준 인덱스 그룹명 (그룹 ID 순서)
+            dim (int): 벡터 차원
+            base_version (str): 기준 인덱스 버전
+            chunk_rows (int): 청크당 행 수
+        """
+        self.path = path
+        self.dim = dim
+        self.base_version = base_version
+        self.num_base_groups = len(base_names)
+        self._group_lookup = {str(name): i for i, name in enumerate(base_names)}
+
+        self.buffer = ChunkedBuffer(dim, chunk_rows=chunk_rows)
+        self.labels = []
+        self.new_group_names = []
+        self._group_ids = np.empty(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._stale_warned = False
+        self.sync()
+
+    def __len__(self):
+        return self.buffer.count
+
+    @property
+    def num_groups(self):
+        return self.num_base_groups + len(self.new_group_names)
+
+    def group_name(self, group):
+        return self.new_group_names[group - self.num_base_groups]
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file("lock"), "a") as lock_file:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_header(self):
+        try:
+            with open(self._file("header.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _add_rows(self, vectors, labels):
+        """메모리 버퍼에 행 추가 (레이블/그룹 정보를 먼저 만든 뒤 행 수 공개)"""
+        group_ids = []
+        for label in labels:
+            base_name = label.split("_aug")[0] if "_aug" in label else label
+            group = self._group_lookup.get(base_name)
+            if group is None:
+                group = self.num_base_groups + len(self.new_group_names)
+                self._group_lookup[base_name] = group
+                self.new_group_names.append(base_name)
+            group_ids.append(group)
+        self.labels.extend(labels)
+        self._group_ids = np.concatenate([self._group_ids, np.asarray(group_ids, dtype=np.int64)])
+        self.buffer.extend(vectors)
+
+    def sync(self):
+        """
+        delta 파일에서 아직 읽지 않은 행을 메모리로 가져오기
+
+        Returns:
+            int: 새로 가져온 행 수
+        """
+        header = self._read_header()
+        if header is None:
+            return 0
+        if header.get("base_version") != self.base_version or header.get("dim") != self.dim:
+            if not self._stale_warned:
+                print(f"경고: delta 파일의 기준 버전이 현재 인덱스와 다릅니다 (무시): {self.path}")
+                self._stale_warned = True
+            return 0
+
+        with self._lock:
+            try:
+                with open(self._file("labels.jsonl"), encoding="utf-8") as f:
+                    labels = [json.loads(line)["label"] for line in f if line.endswith("\n")]
+            except FileNotFoundError:
+                return 0
+            start = len(self)
+            if len(labels) <= start:
+                return 0
+            labels = labels[start:]
+            row_bytes = self.dim * 4
+            with open(self._file("vectors.f32"), "rb") as f:
+                f.seek(start * row_bytes)
+                vectors = np.frombuffer(f.read(len(labels) * row_bytes), dtype=np.float32)
+            labels = labels[:len(vectors) // self.dim]
+            self._add_rows(vectors[:len(labels) * self.dim].reshape(-1, self.dim), labels)
+            return len(labels)
+
+    def append(self, vectors, labels):
+        """
+        새 벡터를 delta 파일에 기록하고 메모리에 반영
+
+        벡터를 먼저 기록(fsync)한 뒤 레이블을 기록하므로, 중간에 중단되어도
+        레이블이 있는 행만 유효하다.
+
+        Args:
+            vectors (np.ndarray): (M, D) 정규화된 벡터
+            labels (Sequence[str]): 행별 레이블 ('<name>' 또는 '<name>_augN')
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) != len(labels):
+            raise ValueError(f"벡터 수({len(vectors)})와 레이블 수({len(labels)})가 다릅니다")
+
+        with self._file_lock():
+            header = self._read_header()
+            if header is None:
+                write_json_atomic(self._file("header.json"), {"base_version": self.base_version, "dim": self.dim})
+            elif header.get("base_version") != self.base_version:
+                raise RuntimeError("delta 파일이 다른 인덱스 버전 기준입니다. 인덱스를 다시 로드하세요")
+
+            # 다른 워커가 추가한 행을 먼저 반영 (파일과 메모리의 행 순서를 맞춤)
+            self.sync()
+            with open(self._file("vectors.f32"), "ab") as f:
+                # 레이블 기록 전에 중단된 추가분(고아 행)은 잘라냄
+                f.truncate(len(self) * self.dim * 4)
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._file("labels.jsonl"), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps({"label": str(label)}, ensure_ascii=False) + "\n" for label in labels)
+                f.flush()
+                os.fsync(f.fileno())
+            self.sync()
+
+    def group_scores(self, query):
+        """
+        delta 행의 그룹별 최대 유사도
+
+        Returns:
+            tuple: (그룹 ID 배열, 유사도 배열) - 행이 하나라도 있는 그룹만
+        """
+        count = len(self)
+        if count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.concatenate([view @ query for view in self.buffer.views(count)])
+        group_ids = self._group_ids[:count]
+        groups = np.unique(group_ids)
+        best = np.full(self.num_groups, -np.inf, dtype=np.float32)
+        np.maximum.at(best, group_ids, scores)
+        return groups, best[groups]
+
+    def vectors(self):
+        count = len(self)
+        views = self.buffer.views(count)
+        return np.concatenate(views) if views else np.empty((0, self.dim), dtype=np.float32)
+
+    def get_metrics(self):
+        return {
+            "vectors": len(self),
+            "new_icons": len(self.new_group_names),
+            "buffer_mb": round(self.buffer.nbytes / 1024 ** 2, 2),
+            "path": self.path,
+        }
+
+
+def compact(reference_data_path, output_path=None):
+    """
+    기준 인덱스와 delta를 합쳐 새 인덱스 디렉토리 생성
+
+    출력 경로가 기준 인덱스 디렉토리 자신이면(기본) 제자리 교체 후 delta를 새 인덱스 기준으로 비운다.
+    다른 경로로 내보내면 스냅샷만 만들고 delta는 그대로 둔다 (현재 워커들은 기존 인덱스 + delta 사용).
+
+    Args:
+        reference_data_path (str): 현재 레퍼런스 인덱스 디렉토리
+        output_path (str): 출력 인덱스 디렉토리 (기본: 제자리)
+
+    Returns:
+        dict: 새 인덱스 헤더 (delta가 비어 있으면 None)
+
+    Raises:
+        ValueError: npz 레퍼런스인 경우 (다른 워커가 계속 npz를 서빙하므로 먼저 convert 필요)
+    """
+    from model.reference_index import ReferenceIndex
+
+    if not os.path.isdir(reference_data_path):
+        raise ValueError(
+            f"npz 레퍼런스는 compaction할 수 없습니다. 인덱스 디렉토리로 변환 후 VECTOR_WEIGHT_PATH로 지정하세요: "
+            f"python -m model.reference_index convert {reference_data_path} "
+            f"{os.path.splitext(reference_data_path)[0]}.index"
+        )
+    base = ReferenceIndex.load(reference_data_path, mmap=False)
+    store = DeltaStore(delta_path(reference_data_path), base.group_names, base.dim, base.base_version)
+    if len(store) == 0:
+        return None
+    in_place = output_path is None or os.path.abspath(output_path) == os.path.abspath(reference_data_path)
+    output_path = reference_data_path if output_path is None else output_path
+
+    with store._file_lock():
+        store.sync()
+        merged = ReferenceIndex(
+            np.concatenate([np.asarray(base.matrix), store.vectors()]),
+            list(base.labels) + store.labels,
+        )
+        # 기준 인덱스의 저장 dtype 유지 (float16 인덱스는 float16으로)
+        header = merged.save(
+            output_path, model_name=base.header.get("model_name"), dtype=base.header.get("dtype", "float32")
+        )
+        if not in_place:
+            return header
+        # 잠금을 잡은 채로 delta를 새 인덱스 기준으로 비움
+        # (이전 인덱스를 쓰는 워커의 추가는 기준 버전 불일치로 거절되어 재로드를 유도)
+        stale = f"{store.path}.compacted"
+        shutil.rmtree(stale, ignore_errors=True)
+        os.rename(store.path, stale)
+        os.makedirs(store.path)
+        write_json_atomic(os.path.join(store.path, "header.json"), {"base_version": header["content_hash"], "dim": merged.dim})
+    shutil.rmtree(stale, ignore_errors=True)
+    return header
+
+
+def main():
+    parser = argparse.ArgumentParser(description="레퍼런스 인덱스 delta 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_parser = sub.add_parser("compact", help="delta를 기준 인덱스 디렉토리에 합침")
+    compact_parser.add_argument("reference", help="현재 레퍼런스 인덱스 디렉토리")
+    compact_parser.add_argument("--output", default=None, help="출력 인덱스 디렉토리 (지정 시 delta는 유지)")
+    args = parser.parse_args()
+
+    header = compact(args.reference, args.output)
+    if header is None:
+        print("합칠 delta가 없습니다")
+    else:
+        print(f"compaction 완료: {header['count']}개 벡터, {header['num_groups']}개 아이콘 (버전 {header['content_hash']})")
+
+
+if __name__ == "__main__":
+    main()
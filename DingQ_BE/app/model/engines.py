@@ -0,0 +1,167 @@
+import inspect
+import os
+import threading
+
+import numpy as np
+import torch
+
+# ONNX Runtime은 선택 의존성 (CLIP_ENGINE=onnx 일 때만 필요)
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNXRUNTIME_AVAILABLE = False
+
+ENGINE_NAMES = ("fp32", "int8", "onnx")
+
+
+class ImageEncoder(torch.nn.Module):
+    """
+    CLIP 이미지 인코더 (pixel_values -> 투영된 이미지 임베딩)
+
+    CLIPModel.get_image_features와 동일하게 vision_model의 pooled 출력에
+    visual_projection을 적용한다. 이미지 경로의 서브모듈만 보관하므로
+    양자화/ONNX 내보내기 대상이 텍스트 타워를 포함하지 않는다.
+    """
+
+    def __init__(self, clip_model):
+        super().__init__()
+        self.vision_model = clip_model.vision_model
+        self.visual_projection = clip_model.visual_projection
+
+    def forward(self, pixel_values):
+        pooled_output = self.vision_model(pixel_values=pixel_values)[1]
+        return self.visual_projection(pooled_output)
+
+
+class TorchEngine:
+    """기본 fp32 PyTorch 추론"""
+
+    name = "fp32"
+
+    def __init__(self, encoder, device="cpu"):
+        self.device = device
+        self.encoder = encoder.to(device).eval()
+
+    def load(self):
+        """워커 프로세스에서 실행 전 초기화 (fork 전 사전 로드 시 워커에서 호출, torch 엔진은 할 일 없음)"""
+
+    def __call__(self, pixel_values):
+        """
+        Args:
+            pixel_values (torch.Tensor | np.ndarray): (N, 3, 224, 224) 정규화된 입력
+
+        Returns:
+            np.ndarray: (N, D) float32 이미지 임베딩 (L2 정규화 전)
+        """
+        pixel_values = torch.as_tensor(pixel_values)
+        with torch.no_grad():
+            features = self.encoder(pixel_values.to(self.device))
+        return features.cpu().numpy().astype(np.float32)
+
+
+class QuantizedTorchEngine(TorchEngine):
+    """PyTorch 동적 int8 양자화 (Linear 레이어 가중치 int8, 활성값은 실행 시 양자화)"""
+
+    name = "int8"
+
+    def __init__(self, encoder, device="cpu"):
+        # 원본 인코더는 그대로 두고 양자화된 복사본 사용 (fp32 엔진/ONNX 내보내기와 공유 가능)
+        quantized = torch.quantization.quantize_dynamic(
+            encoder.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=False
+        )
+        # 동적 양자화 커널은 CPU 전용
+        super().__init__(quantized, device="cpu")
+
+
+class OnnxEngine:
+    """이미지 인코더를 ONNX 그래프로 내보내 ONNX Runtime(CPU)으로 실행"""
+
+    name = "onnx"
+
+    def __init__(self, encoder, onnx_path, num_threads=None, lazy=False):
+        """
+        Args:
+            encoder (ImageEncoder): 내보낼 인코더 (onnx_path가 이미 있으면 사용하지 않음)
+            onnx_path (str): ONNX 파일 경로 (없으면 내보낸 뒤 저장)
+            num_threads (int): ONNX Runtime intra-op 스레드 수 (None이면 세션 생성 시점의 torch.get_num_threads())
+            lazy (bool): 내보내기만 하고 세션은 load() 또는 첫 호출 때 생성
+                (gunicorn 마스터에서 사전 로드 시 세션 스레드 풀이 fork 전에 만들어지지 않도록)
+        """
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("CLIP_ENGINE=onnx 를 사용하려면 onnxruntime 패키지가 필요합니다")
+
+        if not os.path.exists(onnx_path):
+            self.export(encoder, onnx_path)
+
+        self.onnx_path = onnx_path
+        self.num_threads = num_threads
+        self.session = None
+        self._session_lock = threading.Lock()
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """InferenceSession 생성 (이미 있으면 그대로)"""
+        with self._session_lock:
+            if self.session is None:
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                # 워커당 스레드 수는 gunicorn post_fork에서 TORCH_NUM_THREADS로 설정됨
+                options.intra_op_num_threads = self.num_threads or torch.get_num_threads()
+                self.session = ort.InferenceSession(
+                    self.onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+                )
+        return self.session
+
+    @staticmethod
+    def export(encoder, onnx_path, image_size=224):
+        """인코더를 배치 크기 가변 ONNX 그래프로 내보내기"""
+        print(f"ONNX 그래프 내보내는 중: {onnx_path}")
+        os.makedirs(os.path.dirname(os.path.abspath(onnx_path)), exist_ok=True)
+        dummy = torch.zeros(1, 3, image_size, image_size)
+        tmp_path = f"{onnx_path}.tmp"
+        # 최신 torch는 기본 exporter가 dynamo 기반이므로 TorchScript exporter를 명시
+        extra = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        torch.onnx.export(
+            encoder.cpu().eval(),
+            (dummy,),
+            tmp_path,
+            input_names=["pixel_values"],
+            output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=14,
+            **extra,
+        )
+        os.replace(tmp_path, onnx_path)
+
+    def __call__(self, pixel_values):
+        if isinstance(pixel_values, torch.Tensor):
+            pixel_values = pixel_values.cpu().numpy()
+        inputs = {"pixel_values": np.ascontiguousarray(pixel_values, dtype=np.float32)}
+        session = self.session or self.load()
+        return session.run(None, inputs)[0].astype(np.float32)
+
+
+def create_engine(name, encoder, device="cpu", onnx_path=None, num_threads=None, lazy=False):
+    """
+    이름으로 추론 엔진 생성
+
+    Args:
+        name (str): "fp32" | "int8" | "onnx"
+        encoder (ImageEncoder): 이미지 인코더
+        device (str): fp32 엔진 실행 장치
+        onnx_path (str): onnx 엔진용 그래프 경로
+        num_threads (int): onnx 엔진 스레드 수
+        lazy (bool): onnx 엔진 세션 생성을 load()까지 미룸 (fork 전 사전 로드용)
+    """
+    if name == "fp32":
+        return TorchEngine(encoder, device=device)
+    if name == "int8":
+        return QuantizedTorchEngine(encoder)
+    if name == "onnx":
+        if onnx_path is None:
+            raise ValueError("onnx 엔진에는 onnx_path가 필요합니다")
+        return OnnxEngine(encoder, onnx_path, num_threads=num_threads, lazy=lazy)
+    raise ValueError(f"알 수 없는 추론 엔진입니다: {name} (선택: {', '.join(ENGINE_NAMES)})")
@@ -1,13 +1,21 @@
-import threading
+import asyncio
 import os
-import queue
+import random
 import base64
+import time
+from collections import deque
+from contextlib import nullcontext
 from io import BytesIO
 
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from PIL import Image
 
+# Gemini 이미지 생성 모델
+GEMINI_MODEL = "gemini-2.0-flash-preview-image-generation"
+# 기준 스타일 이미지 (현재 파일의 디렉토리 기준 절대 경로)
+STYLE_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'total_dingbat.png')
+
 # 프롬프트 설정
 prompt = """
 [목표 및 스타일 학습]
@@ -28,143 +36,346 @@ prompt = """
 요구사항에 명시된 사항을 다시 한 번 점검하여 확실한 이해를 하고 생성할 것.
 """
 
-def generate_icon(run_id, input_text, input_image, result_queue, temperature):
-    try:
-        client = genai.Client()
-        user_text = f"이 아이콘은 '{input_text}'의 심볼입니다."
+def to_png_bytes(image):
+    """PIL 이미지 또는 이미지 파일 바이트를 PNG 바이트로 변환 (요청마다 한 번만 인코딩)"""
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(BytesIO(image))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def extract_image(run_id, response):
+    """
+    Gemini 응답에서 생성된 이미지 추출
+
+    Returns:
+        PIL.Image.Image | None: 이미지가 없거나 디코딩에 실패하면 None
+    """
+    if not (response and response.candidates and len(response.candidates) > 0 and response.candidates[0].content):
+        print(f"[Run {run_id}] 응답이 비어있거나 올바르지 않습니다.")
+        return None
 
-        # 현재 파일의 디렉토리를 기준으로 절대 경로 생성
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        total_dingbat_path = os.path.join(current_dir, 'total_dingbat.png')
-        image_total = Image.open(total_dingbat_path)  # 기준 스타일 이미지
-
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-preview-image-generation",
-            contents=[prompt, user_text, input_image, image_total],
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT', 'IMAGE'],
-                temperature=temperature
-            ),
-        )
-        if response and response.candidates and len(response.candidates) > 0 and response.candidates[0].content:
-            has_image = False
-            for part in response.candidates[0].content.parts: # type: ignore
-                if part.inline_data is not None:
-                    has_image = True
-                    try:
-                        # 이미지 데이터 검증 및 안전한 변환
-                        image_data = part.inline_data.data # type: ignore
-                        mime_type = getattr(part.inline_data, 'mime_type', 'unknown') # type: ignore
-                        print(f"[Run {run_id}] 이미지 데이터 수신: {len(image_data) if image_data else 0} bytes, MIME: {mime_type}")
-                        
-                        if image_data and len(image_data) > 0:
-                            # 처음 몇 바이트를 확인해서 이미지 포맷 추정
-                            if len(image_data) >= 8:
-                                header = image_data[:8]
-                                print(f"[Run {run_id}] 파일 헤더: {header.hex()}")
-                                
-                                # Base64 인코딩된 데이터인지 확인 (iVBORw로 시작하면 Base64 PNG)
-                                if header == b'iVBORw0K':
-                                    print(f"[Run {run_id}] Base64 인코딩된 PNG 데이터 감지됨")
-                                    try:
-                                        # Base64 디코딩
-                                        decoded_data = base64.b64decode(image_data)
-                                        print(f"[Run {run_id}] Base64 디코딩 완료: {len(decoded_data)} bytes")
-                                        image_data = decoded_data
-                                        # 디코딩된 헤더 확인
-                                        decoded_header = image_data[:8]
-                                        print(f"[Run {run_id}] 디코딩된 헤더: {decoded_header.hex()}")
-                                    except Exception as decode_error:
-                                        print(f"[Run {run_id}] Base64 디코딩 실패: {decode_error}")
-                                        continue
-                                
-                                # PNG 헤더 확인 (89 50 4E 47 0D 0A 1A 0A)
-                                if image_data[:8].startswith(b'\x89PNG\r\n\x1a\n'):
-                                    print(f"[Run {run_id}] PNG 포맷 감지됨")
-                                # JPEG 헤더 확인 (FF D8)
-                                elif image_data[:8].startswith(b'\xFF\xD8'):
-                                    print(f"[Run {run_id}] JPEG 포맷 감지됨")
-                                # WEBP 헤더 확인
-                                elif b'WEBP' in image_data[:12]:
-                                    print(f"[Run {run_id}] WEBP 포맷 감지됨")
-                                else:
-                                    print(f"[Run {run_id}] 알 수 없는 이미지 포맷")
-                            
-                            image_bytes = BytesIO(image_data)
-                            image_bytes.seek(0)  # 포인터를 처음으로 이동
-                            generated_image = Image.open(image_bytes)
-                            # 이미지가 정상적으로 로드되었는지 확인
-                            generated_image.verify()
-                            # verify() 후에는 이미지를 다시 로드해야 함
-                            image_bytes.seek(0)
-                            generated_image = Image.open(image_bytes)
-                            print(f"[Run {run_id}] 이미지 성공적으로 로드됨: {generated_image.size}, 모드: {generated_image.mode}")
-                            result_queue.put((run_id, generated_image))
-                            return  # 성공 시 즉시 반환
+    has_image = False
+    for part in response.candidates[0].content.parts or []: # type: ignore
+        if part.inline_data is not None:
+            has_image = True
+            try:
+                # 이미지 데이터 검증 및 안전한 변환
+                image_data = part.inline_data.data # type: ignore
+                mime_type = getattr(part.inline_data, 'mime_type', 'unknown') # type: ignore
+                print(f"[Run {run_id}] 이미지 데이터 수신: {len(image_data) if image_data else 0} bytes, MIME: {mime_type}")
+
+                if image_data and len(image_data) > 0:
+                    # 처음 몇 바이트를 확인해서 이미지 포맷 추정
+                    if len(image_data) >= 8:
+                        header = image_data[:8]
+                        print(f"[Run {run_id}] 파일 헤더: {header.hex()}")
+
+                        # Base64 인코딩된 데이터인지 확인 (iVBORw로 시작하면 Base64 PNG)
+                        if header == b'iVBORw0K':
+                            print(f"[Run {run_id}] Base64 인코딩된 PNG 데이터 감지됨")
+                            try:
+                                # Base64 디코딩
+                                decoded_data = base64.b64decode(image_data)
+                                print(f"[Run {run_id}] Base64 디코딩 완료: {len(decoded_data)} bytes")
+                                image_data = decoded_data
+                                # 디코딩된 헤더 확인
+                                decoded_header = image_data[:8]
+                                print(f"[Run {run_id}] 디코딩된 헤더: {decoded_header.hex()}")
+                            except Exception as decode_error:
+                                print(f"[Run {run_id}] Base64 디코딩 실패: {decode_error}")
+                                continue
+
+                        # PNG 헤더 확인 (89 50 4E 47 0D 0A 1A 0A)
+                        if image_data[:8].startswith(b'\x89PNG\r\n\x1a\n'):
+                            print(f"[Run {run_id}] PNG 포맷 감지됨")
+                        # JPEG 헤더 확인 (FF D8)
+                        elif image_data[:8].startswith(b'\xFF\xD8'):
+                            print(f"[Run {run_id}] JPEG 포맷 감지됨")
+                        # WEBP 헤더 확인
+                        elif b'WEBP' in image_data[:12]:
+                            print(f"[Run {run_id}] WEBP 포맷 감지됨")
                         else:
-                            print(f"[Run {run_id}] 빈 이미지 데이터 수신")
-                    except Exception as img_error:
-                        print(f"[Run {run_id}] 이미지 처리 오류: {img_error}")
-                        print(f"[Run {run_id}] 오류 타입: {type(img_error).__name__}")
-                elif hasattr(part, 'text') and part.text:
-                    print(f"[Run {run_id}] API 텍스트 응답: {part.text[:100]}...")
-            
-            if not has_image:
-                print(f"[Run {run_id}] 응답에 이미지 데이터가 없습니다.")
-        else:
-            print(f"[Run {run_id}] 응답이 비어있거나 올바르지 않습니다.")
-            result_queue.put((run_id, None))
+                            print(f"[Run {run_id}] 알 수 없는 이미지 포맷")
+
+                    image_bytes = BytesIO(image_data)
+                    image_bytes.seek(0)  # 포인터를 처음으로 이동
+                    generated_image = Image.open(image_bytes)
+                    # 이미지가 정상적으로 로드되었는지 확인
+                    generated_image.verify()
+                    # verify() 후에는 이미지를 다시 로드해야 함
+                    image_bytes.seek(0)
+                    generated_image = Image.open(image_bytes)
+                    print(f"[Run {run_id}] 이미지 성공적으로 로드됨: {generated_image.size}, 모드: {generated_image.mode}")
+                    return generated_image
+                else:
+                    print(f"[Run {run_id}] 빈 이미지 데이터 수신")
+            except Exception as img_error:
+                print(f"[Run {run_id}] 이미지 처리 오류: {img_error}")
+                print(f"[Run {run_id}] 오류 타입: {type(img_error).__name__}")
+        elif hasattr(part, 'text') and part.text:
+            print(f"[Run {run_id}] API 텍스트 응답: {part.text[:100]}...")
 
-    except Exception as e:
-        print(f"[Run {run_id}] 오류 발생: {e}")
-        result_queue.put((run_id, None))
+    if not has_image:
+        print(f"[Run {run_id}] 응답에 이미지 데이터가 없습니다.")
+    return None
 
 
-def generate_with_retries(input_text, input_image, temperature=0.5, target_count=5, max_retries=5):
-    result_queue = queue.Queue()
-    total_generated = 0
-    attempt = 1
-    generated_images = []
+def decode_icon(run_id, response):
+    """응답 이미지를 PNG BytesIO로 변환 (실패 시 None)"""
+    img = extract_image(run_id, response)
+    if img is None:
+        return None
+    img_bytes = BytesIO()
+    img.save(img_bytes, format='PNG')
+    img_bytes.seek(0)
+    return img_bytes
 
-    while total_generated < target_count and attempt <= max_retries:
-        needed = target_count - total_generated
-        print(f"[generate] 이미지 {needed}개 생성 필요, 시도 {attempt}/{max_retries}")
 
-        threads = []
-        for i in range(1, needed + 1):
-            t = threading.Thread(
-                target=generate_icon,
-                args=(i, input_text, input_image, result_queue, temperature)
+class IconGenerator:
+    """
+    asyncio 기반 아이콘 생성기
+
+    프로세스 수명 동안 genai 클라이언트 하나(client.aio)를 공유해 HTTP 연결과 TLS 세션을
+    재사용하고, 여러 장의 생성 요청을 이벤트 루프에서 동시에 보낸다 (요청당 스레드 없음).
+    재시도는 슬롯 단위로 스케줄링하므로 느린 호출 하나가 다른 슬롯의 재시도를 막지 않는다.
+    이미지 인코딩/디코딩은 asyncio.to_thread로 처리해 이벤트 루프를 막지 않는다.
+    클라이언트는 첫 호출 시 만들므로 시크릿(GOOGLE_API_KEY) 로드 이후, 워커 프로세스 안에서 생성된다.
+    """
+
+    def __init__(self, model=GEMINI_MODEL, timeout=60.0, client=None, style_image_path=STYLE_IMAGE_PATH, limiter=None):
+        """
+        Args:
+            model (str): Gemini 이미지 생성 모델
+            timeout (float): Gemini 호출 1회 제한 시간 (초)
+            client (genai.Client): 사용할 클라이언트 (None이면 첫 호출 시 생성)
+            style_image_path (str): 기준 스타일 이미지 경로
+            limiter (GeminiLimiter): 요청 간 호출 제한기 (None이면 제한 없음)
+        """
+        self.model = model
+        self.limiter = limiter
+        self._requests = 0
+        self.timeout = timeout
+        self.style_image_path = style_image_path
+        self._client = client
+        self._style_part = None
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.retries = 0
+        self.hedges = 0
+        self.cancelled = 0
+        self.deadline_exceeded = 0
+        # 요청별 첫 이미지까지 걸린 시간 / 전체 시간 (초)
+        self.first_image_seconds = deque(maxlen=1000)
+        self.total_request_seconds = deque(maxlen=1000)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = genai.Client(http_options=types.HttpOptions(timeout=int(self.timeout * 1000)))
+        return self._client
+
+    async def style_part(self):
+        """기준 스타일 이미지 (프로세스당 한 번만 읽고 PNG로 인코딩)"""
+        if self._style_part is None:
+            png = await asyncio.to_thread(to_png_bytes, Image.open(self.style_image_path))
+            self._style_part = types.Part.from_bytes(data=png, mime_type='image/png')
+        return self._style_part
+
+    async def image_part(self, input_image):
+        """사용자 손그림 (PIL 이미지 또는 업로드 바이트) -> 요청 파트"""
+        png = await asyncio.to_thread(to_png_bytes, input_image)
+        return types.Part.from_bytes(data=png, mime_type='image/png')
+
+    async def generate_icon(self, run_id, input_text, image_part, temperature, key=None):
+        """
+        Gemini 호출 1회 (제한기가 있으면 허가를 받은 뒤 호출)
+
+        Args:
+            key: 제한기의 공정 스케줄링 단위 (같은 요청의 호출은 같은 key)
+
+        Returns:
+            BytesIO | None: 생성된 PNG (실패 시 None)
+        """
+        user_text = f"이 아이콘은 '{input_text}'의 심볼입니다."
+        started = time.perf_counter()
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            contents = [prompt, user_text, image_part, await self.style_part()]
+            async with self.limiter.slot(key) if self.limiter is not None else nullcontext():
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=self.model,
+                        contents=contents,
+                        config=types.GenerateContentConfig(
+                            response_modalities=['TEXT', 'IMAGE'],
+                            temperature=temperature
+                        ),
+                    )
+                except errors.APIError as e:
+                    if e.code == 429 and self.limiter is not None:
+                        # 할당량 초과: 슬롯을 반환하기 전에 기록해야 대기 중인 호출이 바로 나가지 않음
+                        self.limiter.record_429()
+                    raise
+            img_bytes = await asyncio.to_thread(decode_icon, run_id, response)
+        except Exception as e:
+            print(f"[Run {run_id}] 오류 발생: {e}")
+            img_bytes = None
+        finally:
+            self.in_flight -= 1
+            self.total_seconds += time.perf_counter() - started
+        if img_bytes is None:
+            self.failures += 1
+        return img_bytes
+
+    async def stream(self, input_text, input_image, temperature=0.5, target_count=5, max_retries=5,
+                     deadline=None, hedges=0, backoff=0.5, max_backoff=8.0):
+        """
+        생성된 이미지를 완료되는 순서대로 반환하는 비동기 이터레이터
+
+        target_count개의 슬롯이 각자 독립적으로 Gemini를 호출하고, 실패한 슬롯은 다른 슬롯을
+        기다리지 않고 지터를 준 지수 백오프 후 바로 재시도한다. 목표 개수가 모이거나 deadline이
+        지나면 남은 호출은 취소한다 (이터레이션을 중간에 멈춰도 취소됨).
+
+        Args:
+            input_text (str): 아이콘 설명
+            input_image (PIL.Image.Image | bytes): 사용자 손그림
+            temperature (float): 생성 temperature
+            target_count (int): 생성할 이미지 수
+            max_retries (int): 슬롯당 최대 시도 횟수
+            deadline (float): 전체 제한 시간 (초, None이면 제한 없음)
+            hedges (int): 목표의 절반이 도착한 뒤 남은 슬롯을 위해 추가로 보내는 헤지 요청 수 (0이면 비활성화)
+            backoff (float): 첫 재시도 대기 시간 (초, 시도마다 2배)
+            max_backoff (float): 재시도 대기 시간 상한 (초)
+
+        Yields:
+            BytesIO: 생성된 PNG 이미지
+        """
+        started = time.perf_counter()
+        image_part = await self.image_part(input_image)
+        self._requests += 1
+        key = self._requests  # 제한기에서 이 요청의 호출들을 묶는 key
+        results = asyncio.Queue()
+
+        async def slot(slot_id):
+            for attempt in range(1, max_retries + 1):
+                img_bytes = await self.generate_icon(slot_id, input_text, image_part, temperature, key)
+                if img_bytes is not None or attempt == max_retries:
+                    await results.put(img_bytes)
+                    return
+                self.retries += 1
+                delay = min(max_backoff, backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                print(f"[generate] 슬롯 {slot_id} 재시도 {attempt + 1}/{max_retries} ({delay:.2f}초 후)")
+                await asyncio.sleep(delay)
+
+        async def hedge(hedge_id):
+            await results.put(await self.generate_icon(f"hedge-{hedge_id}", input_text, image_part, temperature, key))
+
+        tasks = [asyncio.ensure_future(slot(i)) for i in range(1, target_count + 1)]
+        pending = len(tasks)  # 아직 결과를 보고하지 않은 작업 수
+        produced = 0
+        hedged = hedges <= 0
+        try:
+            while produced < target_count and pending > 0:
+                timeout = None if deadline is None else deadline - (time.perf_counter() - started)
+                if timeout is not None and timeout <= 0:
+                    raise asyncio.TimeoutError
+                img_bytes = await asyncio.wait_for(results.get(), timeout)
+                pending -= 1
+                if img_bytes is None:
+                    print(f"[generate] 슬롯 최대 시도 횟수 초과")
+                    continue
+                produced += 1
+                if produced == 1:
+                    self.first_image_seconds.append(time.perf_counter() - started)
+                print(f"[generate] 이미지 생성 완료 ({produced}/{target_count})")
+                yield img_bytes
+
+                # 빠른 응답이 절반 모이면 느린 슬롯과 경쟁할 헤지 요청 추가 (먼저 끝난 결과 사용)
+                if not hedged and produced * 2 >= target_count and produced < target_count:
+                    hedged = True
+                    extra = min(hedges, target_count - produced)
+                    self.hedges += extra
+                    print(f"[generate] 헤지 요청 {extra}개 추가")
+                    tasks += [asyncio.ensure_future(hedge(i)) for i in range(1, extra + 1)]
+                    pending += extra
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            print(f"[generate] 제한 시간 {deadline}초 초과")
+        finally:
+            outstanding = [task for task in tasks if not task.done()]
+            for task in outstanding:
+                task.cancel()
+            self.cancelled += len(outstanding)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.total_request_seconds.append(time.perf_counter() - started)
+
+        if produced < target_count:
+            print(f"[generate] 최종적으로 {target_count}개 생성하지 못했습니다. 생성된 이미지 수: {produced}")
+        else:
+            print(f"[generate] 이미지 {target_count}개 생성 완료! ({time.perf_counter() - started:.2f}초)")
+
+    async def generate(self, input_text, input_image, temperature=0.5, target_count=5, max_retries=5, **options):
+        """
+        target_count개 이미지 생성 (stream()의 결과를 모아서 반환)
+
+        Args:
+            options: stream() 옵션 (deadline, hedges, backoff, max_backoff)
+
+        Returns:
+            list[BytesIO]: 생성된 PNG 이미지들
+        """
+        return [
+            img_bytes async for img_bytes in self.stream(
+                input_text, input_image, temperature, target_count, max_retries, **options
             )
-            threads.append(t)
-            t.start()
-
-        for t in threads:
-            t.join()
-
-        success_count = 0
-        while not result_queue.empty():
-            run_id, img = result_queue.get()
-            if img:
-                # 이미지를 BytesIO로 변환
-                img_bytes = BytesIO()
-                img.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
-                generated_images.append(img_bytes)
-                total_generated += 1
-                print(f"[generate] 이미지 생성 완료 ({total_generated}/{target_count})")
-                success_count += 1
-            else:
-                print(f"[generate] 이미지 생성 실패")
-
-        attempt += 1
-
-    if total_generated < target_count:
-        print(f"[generate] 최종적으로 {target_count}개 생성하지 못했습니다. 생성된 이미지 수: {total_generated}")
-    else:
-        print(f"[generate] 이미지 {target_count}개 생성 완료!")
+        ]
+
+    @staticmethod
+    def _percentiles_ms(values):
+        values = sorted(values)
+        if not values:
+            return None
+        p50, p95 = (values[min(len(values) - 1, int(len(values) * q))] for q in (0.5, 0.95))
+        return {"p50": round(p50 * 1000, 1), "p95": round(p95 * 1000, 1)}
+
+    def get_metrics(self):
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "cancelled": self.cancelled,
+            "deadline_exceeded": self.deadline_exceeded,
+            "time_to_first_image_ms": self._percentiles_ms(self.first_image_seconds),
+            "request_ms": self._percentiles_ms(self.total_request_seconds),
+            "avg_call_ms": round(self.total_seconds / self.calls * 1000, 1) if self.calls else None,
+            "limiter": self.limiter.get_metrics() if self.limiter is not None else None,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aio.aclose()
+            self._client = None
+
+
+def generate_with_retries(input_text, input_image, temperature=0.5, target_count=5, max_retries=5, **options):
+    """동기 호출용 래퍼 (CLI/스크립트). 서버에서는 IconGenerator.generate를 await 한다."""
+    async def run():
+        generator = IconGenerator()
+        try:
+            return await generator.generate(input_text, input_image, temperature, target_count, max_retries, **options)
+        finally:
+            await generator.aclose()
+
+    return asyncio.run(run())
 
-    return generated_images
 
 def main():
     #INPUT 
@@ -0,0 +1,169 @@
+"""
+아이콘 메타데이터 (카테고리/태그)와 필터 검색용 파티션
+
+메타데이터 CSV 컬럼: icon_name(또는 확장자 포함 input_file), category,
+tags(';' 또는 '|' 구분), svg_path, description
+"""
+import csv
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def read_metadata(path):
+    """
+    아이콘 메타데이터 CSV 읽기 (비어 있는 값은 None)
+
+    Returns:
+        dict: 아이콘명 -> {"category", "tags", "svg_path", "description"}
+    """
+    metadata = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            name = row.get("icon_name") or os.path.splitext(row.get("input_file") or "")[0]
+            if not name:
+                continue
+            tags = (row.get("tags") or "").replace("|", ";")
+            metadata[name] = {
+                "category": row.get("category") or None,
+                "tags": [tag.strip() for tag in tags.split(";") if tag.strip()] or None,
+                "svg_path": row.get("svg_path") or None,
+                "description": row.get("description") or None,
+            }
+    return metadata
+
+
+def normalize_filter(values):
+    """필터 값 정리: None / 'a,b' / ['a', 'b'] -> 정렬된 튜플 (비어 있으면 None)"""
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = values.split(",")
+    values = tuple(sorted({value.strip() for value in values if value and value.strip()}))
+    return values or None
+
+
+class Partition:
+    """필터에 해당하는 아이콘 그룹과 그 행들"""
+
+    __slots__ = ("groups", "mask", "rows", "offsets", "matrix")
+
+    def __init__(self, groups, mask, rows, offsets, matrix=None):
+        self.groups = groups  # (P,) 그룹 ID (오름차순)
+        self.mask = mask  # (G,) 그룹 비트셋
+        self.rows = rows  # (R,) 기준 행렬의 행 인덱스 (그룹 순서대로 연속)
+        self.offsets = offsets  # (P,) 파티션 내 그룹 시작 위치
+        self.matrix = matrix  # (R, D) 연속 부분 행렬 (미리 분할된 카테고리만, 없으면 행 인덱스로 모음)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class IconPartitions:
+    """
+    카테고리/태그 필터용 파티션
+
+    카테고리/태그마다 그룹 비트셋을 두고, 카테고리별로는 해당 행을 연속 부분 행렬로
+    미리 분할해 둔다. 필터 검색은 파티션의 행만 점수화하므로 지연 시간이 파티션 크기에 비례한다.
+    필터 조합: 카테고리는 OR, 태그는 AND (모든 태그를 가진 아이콘).
+    """
+
+    def __init__(self, group_names, group_offsets, group_sizes, metadata, matrix=None, cache_size=64):
+        """
+        Args:
+            group_names (Sequence[str]): 그룹(아이콘)명
+            group_offsets (np.ndarray): (G,) 그룹 시작 행
+            group_sizes (np.ndarray): (G,) 그룹 행 수
+            metadata (dict): read_metadata 결과 (메타데이터가 없는 아이콘은 필터 결과에서 제외)
+            matrix (np.ndarray): (N, D) 기준 행렬 (주어지면 카테고리별 연속 부분 행렬 생성)
+            cache_size (int): 조합 필터 파티션 캐시 크기
+        """
+        self.group_offsets = np.asarray(group_offsets, dtype=np.int64)
+        self.group_sizes = np.asarray(group_sizes, dtype=np.int64)
+        num_groups = len(group_names)
+
+        category_groups, tag_groups = {}, {}
+        for group, name in enumerate(group_names):
+            meta = metadata.get(str(name)) or {}
+            if meta.get("category"):
+                category_groups.setdefault(meta["category"], []).append(group)
+            for tag in meta.get("tags") or ():
+                tag_groups.setdefault(tag, []).append(group)
+
+        def bitset(groups):
+            mask = np.zeros(num_groups, dtype=bool)
+            mask[groups] = True
+            return mask
+
+        self.category_masks = {category: bitset(groups) for category, groups in category_groups.items()}
+        self.tag_masks = {tag: bitset(groups) for tag, groups in tag_groups.items()}
+        self.num_groups = num_groups
+
+        # 카테고리별 미리 분할된 파티션 (카테고리는 서로 겹치지 않으므로 추가 메모리는 최대 행렬 1개)
+        self.categories = {
+            category: self._build(mask, matrix) for category, mask in self.category_masks.items()
+        }
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _build(self, mask, matrix=None):
+        groups = np.flatnonzero(mask)
+        sizes = self.group_sizes[groups]
+        offsets = np.r_[0, np.cumsum(sizes)[:-1]].astype(np.int64) if len(groups) else np.empty(0, dtype=np.int64)
+        rows = np.arange(sizes.sum(), dtype=np.int64) + np.repeat(self.group_offsets[groups] - offsets, sizes)
+        sub_matrix = np.ascontiguousarray(matrix[rows]) if matrix is not None else None
+        return Partition(groups, mask, rows, offsets, sub_matrix)
+
+    def share_memory(self, share):
+        """fork 전 호출: 카테고리별 부분 행렬/행 인덱스를 공유 메모리 매핑으로 이동 (ReferenceIndex.share_memory)"""
+        for partition in self.categories.values():
+            partition.rows = share(partition.rows)
+            partition.matrix = share(partition.matrix)
+
+    def select(self, categories=None, tags=None):
+        """
+        필터에 해당하는 파티션
+
+        Args:
+            categories (str | Sequence[str]): 카테고리 (여러 개면 OR, 'a,b' 형식 허용)
+            tags (str | Sequence[str]): 태그 (여러 개면 AND)
+
+        Returns:
+            Partition | None: 필터가 없으면 None
+        """
+        categories, tags = normalize_filter(categories), normalize_filter(tags)
+        if categories is None and tags is None:
+            return None
+        if tags is None and len(categories) == 1 and categories[0] in self.categories:
+            return self.categories[categories[0]]
+
+        key = (categories, tags)
+        with self._lock:
+            partition = self._cache.get(key)
+            if partition is not None:
+                self._cache.move_to_end(key)
+                return partition
+
+        empty = np.zeros(self.num_groups, dtype=bool)
+        if categories is None:
+            mask = np.ones(self.num_groups, dtype=bool)
+        else:
+            mask = np.logical_or.reduce([self.category_masks.get(c, empty) for c in categories])
+        for tag in tags or ():
+            mask = mask & self.tag_masks.get(tag, empty)
+        partition = self._build(mask)
+
+        with self._lock:
+            self._cache[key] = partition
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return partition
+
+    def get_metrics(self):
+        return {
+            "categories": {category: int(len(p.groups)) for category, p in self.categories.items()},
+            "tags": len(self.tag_masks),
+        }
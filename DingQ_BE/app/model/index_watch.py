@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def source_signature(path):
+    """
+    레퍼런스 경로의 변경 감지용 시그니처
+
+    인덱스 디렉토리는 header.json, npz는 파일 자체의 (inode, 크기, mtime)을 사용한다.
+    convert는 디렉토리를 통째로 교체하므로 header.json의 inode가 바뀐다.
+    경로가 없으면 None.
+    """
+    target = os.path.join(path, "header.json") if os.path.isdir(path) else path
+    try:
+        stat = os.stat(target)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class IndexWatcher:
+    """
+    레퍼런스 파일 변경 감시 스레드
+
+    interval마다 signature_fn을 확인하고, 바뀐 시그니처가 다음 확인 때도 같으면
+    (파일 쓰기가 끝난 것으로 보고) reload_fn을 호출한다. 프로세스(워커)마다
+    따로 실행되므로 멀티 워커 환경에서도 모든 워커가 새 인덱스로 전환된다.
+    """
+
+    def __init__(self, signature_fn, reload_fn, interval=10.0, name="index-watcher"):
+        """
+        Args:
+            signature_fn (Callable[[], Hashable]): 감시 대상의 현재 시그니처
+                (예: lambda: source_signature(path), 대상이 없으면 None)
+            reload_fn (Callable[[], Any]): 변경 감지 시 호출 (예외는 로그 후 무시)
+            interval (float): 확인 주기 (초)
+            name (str): 스레드 이름
+        """
+        self.signature_fn = signature_fn
+        self.reload_fn = reload_fn
+        self.interval = interval
+        self._signature = signature_fn()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def check(self):
+        """
+        한 번 확인 (테스트/수동 호출용)
+
+        Returns:
+            bool: reload_fn을 호출했으면 True
+        """
+        self.checks += 1
+        signature = self.signature_fn()
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # 쓰기 중일 수 있으므로 다음 확인까지 대기
+            self._pending = signature
+            return False
+
+        self._pending = None
+        self._signature = signature
+        try:
+            self.reload_fn()
+            self.reloads += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"레퍼런스 인덱스 자동 재로드 실패: {e}")
+        return True
+
+    def mark_current(self):
+        """수동 재로드 후 현재 파일을 기준 시그니처로 갱신 (중복 재로드 방지)"""
+        self._signature = self.signature_fn()
+        self._pending = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def get_metrics(self):
+        return {
+            "interval_seconds": self.interval,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+
+# CLIPImageProcessor 기본값 (openai/clip-vit-*)
+CLIP_IMAGE_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_IMAGE_STD = (0.26862954, 0.26130258, 0.27577711)
+
+
+def binarize_icon(image, size=(224, 224), pad_color=255):
+    """
+    아이콘 이미지 전처리 (이진화 + 노이즈 제거 + 비율 유지 리사이즈 + 중앙 패딩)
+
+    Args:
+        image (PIL.Image | np.ndarray): 입력 이미지 (ndarray는 흑백 uint8)
+        size (tuple): 출력 크기 (height, width)
+        pad_color (int): 패딩 색상
+
+    Returns:
+        np.ndarray: (height, width) uint8 전처리 결과
+    """
+    img = image if isinstance(image, np.ndarray) else np.array(image.convert("L"))  # 흑백 변환
+    _, binary = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY_INV)  # 이진화
+    kernel = np.ones((3, 3), np.uint8)
+    clean = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)  # 노이즈 제거
+
+    h, w = clean.shape
+    scale = min(size[0]/h, size[1]/w)  # 비율 유지하며 리사이즈
+    nh, nw = int(h*scale), int(w*scale)
+    resized = cv2.resize(clean, (nw, nh))
+
+    # 중앙정렬 패딩
+    top = (size[0] - nh) // 2
+    bottom = size[0] - nh - top
+    left = (size[1] - nw) // 2
+    right = size[1] - nw - left
+    return cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(pad_color,))
+
+
+class FusedPreprocessor:
+    """
+    이진화 이미지 -> 정규화된 CLIP 입력 (N, 3, H, W) float32 변환
+
+    binarize_icon 결과가 이미 CLIP 입력 크기이므로 CLIPImageProcessor의
+    PIL RGB 변환 / 리사이즈 / 센터 크롭은 항등 변환이다. 남는 rescale + normalize를
+    채널별 256 엔트리 룩업 테이블 한 번으로 처리한다 (흑백 -> RGB 복제 포함).
+    """
+
+    def __init__(self, image_mean=CLIP_IMAGE_MEAN, image_std=CLIP_IMAGE_STD, size=224):
+        """
+        Args:
+            image_mean (Sequence[float]): 채널별 평균
+            image_std (Sequence[float]): 채널별 표준편차
+            size (int): 입력 한 변 크기
+        """
+        self.size = size
+        mean = np.asarray(image_mean, dtype=np.float32)[:, None]
+        std = np.asarray(image_std, dtype=np.float32)[:, None]
+        # lut[c, v] = (v / 255 - mean[c]) / std[c]
+        levels = np.arange(256, dtype=np.float32)[None, :] * np.float32(1 / 255)
+        self.lut = np.ascontiguousarray((levels - mean) / std, dtype=np.float32)
+
+    @classmethod
+    def from_processor(cls, processor):
+        """
+        CLIPProcessor / CLIPImageProcessor 설정으로 생성
+
+        리사이즈/크롭 크기가 서로 다르면 이진화 단계에서 맞출 수 없으므로 None 반환
+        (기존 processor 경로 사용).
+        """
+        image_processor = getattr(processor, "image_processor", processor)
+        crop = getattr(image_processor, "crop_size", None) or {}
+        resize = getattr(image_processor, "size", None) or {}
+        crop_h, crop_w = crop.get("height"), crop.get("width")
+        shortest_edge = resize.get("shortest_edge", crop_h)
+        if crop_h is None or crop_h != crop_w or shortest_edge != crop_h:
+            return None
+        if not getattr(image_processor, "do_normalize", True) or not getattr(image_processor, "do_rescale", True):
+            return None
+        return cls(image_processor.image_mean, image_processor.image_std, size=crop_h)
+
+    def __call__(self, binaries):
+        """
+        Args:
+            binaries (list[np.ndarray] | np.ndarray): (H, W) uint8 이진화 이미지 목록 또는 (N, H, W) 배열
+
+        Returns:
+            np.ndarray: (N, 3, H, W) float32 정규화 입력
+        """
+        batch = np.asarray(binaries, dtype=np.uint8)
+        if batch.ndim == 2:
+            batch = batch[None]
+        out = np.empty((batch.shape[0], 3) + batch.shape[1:], dtype=np.float32)
+        for channel in range(3):
+            np.take(self.lut[channel], batch, out=out[:, channel])
+        return out
+
+
+def augment_icon(binary, rng):
+    """
+    이진화 아이콘 랜덤 증강 (레퍼런스 생성 노트북의 torchvision 증강을 OpenCV로 재현)
+
+    RandomRotation(15) -> RandomResizedCrop(scale 0.8~1.0) -> RandomHorizontalFlip
+    -> ColorJitter(brightness/contrast 0.2) 순서로 적용한다.
+
+    Args:
+        binary (np.ndarray): (H, W) uint8 binarize_icon 결과
+        rng (np.random.Generator): 난수 생성기
+
+    Returns:
+        np.ndarray: (H, W) uint8 증강 결과
+    """
+    h, w = binary.shape
+    # 회전 (빈 영역은 0으로 채움)
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-15, 15), 1.0)
+    image = cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_NEAREST, borderValue=0)
+
+    # 면적 비율 0.8~1.0, 종횡비 3/4~4/3 영역을 잘라 원래 크기로 리사이즈
+    for _ in range(10):
+        area = h * w * rng.uniform(0.8, 1.0)
+        ratio = np.exp(rng.uniform(np.log(3 / 4), np.log(4 / 3)))
+        cw, ch = int(round(np.sqrt(area * ratio))), int(round(np.sqrt(area / ratio)))
+        if 0 < cw <= w and 0 < ch <= h:
+            top, left = rng.integers(0, h - ch + 1), rng.integers(0, w - cw + 1)
+            image = cv2.resize(image[top:top + ch, left:left + cw], (w, h), interpolation=cv2.INTER_LINEAR)
+            break
+
+    if rng.random() < 0.5:
+        image = cv2.flip(image, 1)
+
+    # 밝기/대비 (대비는 평균 밝기 기준)
+    brightness = rng.uniform(0.8, 1.2)
+    contrast = rng.uniform(0.8, 1.2)
+    image = image.astype(np.float32) * brightness
+    image = (image - image.mean()) * contrast + image.mean()
+    return np.clip(image, 0, 255).astype(np.uint8)
@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class CachedQuery:
+    """캐시 항목: 쿼리 임베딩과 최종 top-k 결과"""
+
+    __slots__ = ("embedding", "results", "top_k", "phash", "expires_at")
+
+    def __init__(self, embedding, results, top_k, phash, expires_at):
+        self.embedding = embedding
+        self.results = results
+        self.top_k = top_k
+        self.phash = phash
+        self.expires_at = expires_at
+
+
+class QueryCache:
+    """
+    스케치 검색 결과 캐시 (LRU + TTL)
+
+    키는 preprocess_icon_image의 이진화된 224x224 결과로 계산한다.
+    - 정확 일치: 픽셀 바이트의 blake2b 해시
+    - 근사 일치 (선택): 64비트 difference hash, 해밍 거리 max_distance 이내
+    레퍼런스 인덱스 버전이 바뀌면 다음 조회 시 전체 캐시를 비운다.
+    관리자 재로드/compaction(/admin/reload-index, /admin/compact-index)은 clear()로 바로 비운다.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=600.0, perceptual=False, max_distance=0):
+        """
+        Args:
+            max_size (int): 최대 캐시 항목 수
+            ttl_seconds (float): 항목 유효 시간 (초)
+            perceptual (bool): 근사 중복(perceptual hash) 조회 사용 여부
+            max_distance (int): 근사 일치로 인정할 최대 해밍 거리
+        """
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+
+        self._entries = OrderedDict()  # exact key -> CachedQuery
+        self._by_phash = {}  # phash -> exact key
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def exact_key(binary):
+        """이진화 이미지의 정확 일치 키"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(binary.shape).encode())
+        digest.update(np.ascontiguousarray(binary).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def perceptual_hash(binary):
+        """64비트 difference hash (9x8 축소 후 가로 인접 픽셀 비교)"""
+        small = cv2.resize(binary, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        return int(np.packbits(bits).view(">u8")[0])
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._by_phash.clear()
+            self._version = version
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        if entry.phash is not None and self._by_phash.get(entry.phash) == key:
+            del self._by_phash[entry.phash]
+
+    def _find_near(self, phash):
+        key = self._by_phash.get(phash)
+        if key is not None or self.max_distance <= 0:
+            return key
+        for other, other_key in self._by_phash.items():
+            if (other ^ phash).bit_count() <= self.max_distance:
+                return other_key
+        return None
+
+    def get(self, binary, version):
+        """
+        캐시 조회
+
+        Args:
+            binary (np.ndarray): 전처리된 이진화 이미지
+            version (str): 현재 레퍼런스 인덱스 버전
+
+        Returns:
+            CachedQuery | None
+        """
+        key = self.exact_key(binary)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            near = False
+            if key not in self._entries and self.perceptual:
+                near_key = self._find_near(self.perceptual_hash(binary))
+                if near_key is not None:
+                    key, near = near_key, True
+
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if near:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, binary, version, embedding, results, top_k):
+        """검색 결과 저장 (크기 초과 시 가장 오래 사용되지 않은 항목 제거)"""
+        if self.max_size <= 0:
+            return
+        key = self.exact_key(binary)
+        phash = self.perceptual_hash(binary) if self.perceptual else None
+        entry = CachedQuery(embedding, results, top_k, phash, time.monotonic() + self.ttl)
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            if phash is not None:
+                self._by_phash[phash] = key
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_phash.clear()
+            self.invalidations += 1
+
+    def get_metrics(self):
+        """적중률, 제거 수 등 캐시 메트릭 반환"""
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "perceptual": self.perceptual,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "index_version": self._version,
+            }
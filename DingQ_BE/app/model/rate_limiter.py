@@ -0,0 +1,260 @@
+"""
+Gemini 호출 제한기 (토큰 버킷 + 동시 호출 수 제한 + 요청 간 공정 스케줄링)
+
+- 토큰 버킷: 초당 호출 수(rate)와 순간 허용량(burst) 제한
+- 동시 호출 수: 진행 중인 Gemini 호출 수 상한
+- 공정 스케줄링: 대기 중인 호출을 요청(/generate 호출) 단위로 라운드 로빈 배정하므로
+  target_count가 큰 요청 하나가 다른 요청을 굶기지 않는다
+- 429 응답을 받으면 잠시 새 호출을 멈춰 재시도 폭주를 막는다
+
+lock_dir을 지정하면 토큰 버킷 상태와 동시 호출 슬롯을 파일 잠금(fcntl)으로 공유해
+같은 호스트의 모든 워커 프로세스가 하나의 제한을 따른다 (Redis 불필요).
+프로세스가 죽으면 커널이 잠금을 풀어주므로 슬롯이 새지 않는다.
+"""
+import asyncio
+import fcntl
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+
+class TokenBucket:
+    """프로세스 내 토큰 버킷"""
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): 초당 토큰 보충 수
+            burst (int): 버킷 크기 (한 번에 허용되는 최대 호출 수)
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+
+    def _take(self, tokens, updated, now):
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def take(self):
+        """
+        토큰 1개 사용
+
+        Returns:
+            float: 0이면 사용 성공, 아니면 다음 토큰까지 기다릴 시간 (초)
+        """
+        now = time.time()
+        self.tokens, wait = self._take(self.tokens, self.updated, now)
+        self.updated = now
+        return wait
+
+
+class FileTokenBucket(TokenBucket):
+    """워커 프로세스 간 공유 토큰 버킷 (상태 파일 + fcntl 잠금)"""
+
+    def __init__(self, path, rate, burst=1, lock_retry=0.005):
+        """
+        Args:
+            lock_retry (float): 다른 워커가 상태 파일을 잠그고 있을 때 다시 시도할 때까지의 시간 (초)
+        """
+        super().__init__(rate, burst)
+        self.path = path
+        self.lock_retry = lock_retry
+
+    def take(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # 이벤트 루프에서 호출되므로 잠금을 기다리지 않고, 잠겨 있으면 잠시 뒤 재시도하도록 대기 시간 반환
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return self.lock_retry
+            state = os.read(fd, 64).split()
+            now = time.time()
+            tokens, updated = (float(state[0]), float(state[1])) if len(state) == 2 else (float(self.burst), now)
+            tokens, wait = self._take(tokens, updated, now)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{tokens:.6f} {now:.6f}".encode())
+            return wait
+        finally:
+            os.close(fd)
+
+
+class FileSlots:
+    """워커 프로세스 간 공유 동시 호출 슬롯 (슬롯마다 잠금 파일 1개)"""
+
+    def __init__(self, lock_dir, count):
+        self.paths = [os.path.join(lock_dir, f"gemini.slot.{i}") for i in range(count)]
+
+    def try_acquire(self):
+        """
+        비어 있는 슬롯 잠금 (기다리지 않음)
+
+        Returns:
+            int | None: 잠금을 잡은 파일 디스크립터 (모든 슬롯이 사용 중이면 None)
+        """
+        # 호출마다 새로 열어야 fork된 워커끼리 같은 open file description(=같은 잠금)을 공유하지 않음
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    @staticmethod
+    def release(fd):
+        os.close(fd)  # 닫으면 잠금도 해제됨
+
+
+class GeminiLimiter:
+    """
+    Gemini 호출 제한기 (워커 프로세스의 이벤트 루프에서 사용)
+
+    호출은 acquire/release(또는 async with limiter.slot(key)) 사이에서 실행한다.
+    key가 같은 호출은 같은 요청으로 보고, 대기 중인 호출은 요청 간 라운드 로빈으로 실행된다.
+    """
+
+    def __init__(self, rate=0, burst=1, max_in_flight=0, lock_dir=None, cooldown=2.0, poll_interval=0.05):
+        """
+        Args:
+            rate (float): 초당 최대 호출 수 (0이면 제한 없음)
+            burst (int): 순간 허용 호출 수
+            max_in_flight (int): 동시 호출 수 상한 (0이면 제한 없음, lock_dir이 있으면 모든 워커 합계)
+            lock_dir (str): 워커 간 공유용 잠금 파일 디렉토리 (None이면 프로세스 내 제한)
+            cooldown (float): 429 응답 후 새 호출을 멈추는 시간 (초)
+            poll_interval (float): 다른 워커가 공유 슬롯을 모두 쓰고 있을 때 재확인 주기 (초)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.lock_dir = lock_dir
+        self.cooldown = cooldown
+        self.poll_interval = poll_interval
+        self.bucket = None
+        self.slots = None
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+            if rate > 0:
+                self.bucket = FileTokenBucket(os.path.join(lock_dir, "gemini.bucket"), rate, burst)
+            if max_in_flight > 0:
+                self.slots = FileSlots(lock_dir, max_in_flight)
+        elif rate > 0:
+            self.bucket = TokenBucket(rate, burst)
+
+        self._waiters = OrderedDict()  # 요청 key -> 대기 중인 future (FIFO)
+        self._timer = None
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._granted = 0
+        self._throttled = 0
+        self._rate_limited = 0
+        self._wait_times = deque(maxlen=1000)
+
+    async def acquire(self, key=None):
+        """
+        호출 허가를 기다림
+
+        Returns:
+            int | None: release()에 넘길 공유 슬롯 핸들
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, deque()).append(future)
+        enqueued = time.monotonic()
+        self._dispatch()
+        try:
+            handle = await future
+        except asyncio.CancelledError:
+            # 허가를 받은 직후 취소된 경우 슬롯 반환
+            if future.done() and not future.cancelled():
+                self.release(future.result())
+            raise
+        self._wait_times.append(time.monotonic() - enqueued)
+        return handle
+
+    def release(self, handle=None):
+        self._in_flight -= 1
+        if handle is not None:
+            self.slots.release(handle)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, key=None):
+        handle = await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(handle)
+
+    def record_429(self, retry_after=None):
+        """429(할당량 초과) 응답 기록: retry_after(없으면 cooldown)초 동안 새 호출을 멈춤"""
+        self._rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or self.cooldown))
+
+    def _next(self, pop=False):
+        """라운드 로빈 순서의 다음 대기 호출 (취소된 대기는 정리)"""
+        while self._waiters:
+            key, futures = next(iter(self._waiters.items()))
+            while futures and futures[0].done():
+                futures.popleft()
+            if not futures:
+                del self._waiters[key]
+                continue
+            if not pop:
+                return futures[0]
+            future = futures.popleft()
+            if futures:
+                self._waiters.move_to_end(key)  # 같은 요청의 다음 호출은 다른 요청들 뒤로
+            else:
+                del self._waiters[key]
+            return future
+        return None
+
+    def _dispatch(self):
+        while self._next() is not None:
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                return  # release()에서 다시 배정
+            delay = self._paused_until - time.monotonic()
+            handle = None
+            if delay <= 0 and self.slots is not None:
+                handle = self.slots.try_acquire()
+                if handle is None:
+                    delay = self.poll_interval  # 다른 워커가 슬롯을 모두 사용 중
+            if delay <= 0 and self.bucket is not None:
+                delay = self.bucket.take()
+                if delay > 0 and handle is not None:
+                    self.slots.release(handle)
+            if delay > 0:
+                self._throttled += 1
+                self._schedule(delay)
+                return
+            self._in_flight += 1
+            self._granted += 1
+            self._next(pop=True).set_result(handle)
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def get_metrics(self):
+        waits = sorted(self._wait_times)
+        p50, p95 = (waits[min(len(waits) - 1, int(len(waits) * q))] for q in (0.5, 0.95)) if waits else (0, 0)
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "max_in_flight": self.max_in_flight,
+            "shared": bool(self.lock_dir),
+            "in_flight": self._in_flight,
+            "waiting": sum(not future.done() for futures in self._waiters.values() for future in futures),
+            "granted": self._granted,
+            "throttled": self._throttled,
+            "rate_limited_429": self._rate_limited,
+            "wait_p50_ms": round(p50 * 1000, 1),
+            "wait_p95_ms": round(p95 * 1000, 1),
+        }
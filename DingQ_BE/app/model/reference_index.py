@@ -0,0 +1,525 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# 인덱스 디렉토리 포맷 (convert로 생성, load로 mmap 로드)
+#   header.json      : 포맷 버전, 모델명, 차원, dtype, 정규화 여부, 콘텐츠 해시
+#   vectors.npy      : (N, D) 정규화 + 그룹별 연속 배치된 행렬 (float32 | float16)
+#   centroids.npy    : (G, D) 그룹별 centroid (float32)
+#   group_offsets.npy: (G,) 그룹 시작 행 (int64)
+#   group_names.npy  : (G,) 원본 아이콘명 (고정 길이 유니코드, pickle 없음)
+#   labels.npy       : (N,) 행별 레이블 (고정 길이 유니코드, pickle 없음)
+INDEX_FORMAT = "dingq-reference-index"
+INDEX_FORMAT_VERSION = 1
+INDEX_DTYPES = ("float32", "float16")
+# float16 행렬 점수 계산 시 한 번에 float32로 변환하는 행 수
+SCORE_CHUNK_ROWS = 4096
+
+
+class ReferenceIndex:
+    """
+    레퍼런스 벡터 인덱스
+
+    로드 시점에 한 번만 L2 정규화한 C-contiguous float32 행렬을 보관하고,
+    쿼리마다 단일 BLAS 행렬-벡터 곱으로 코사인 유사도를 계산한다.
+    증강 벡터('<name>_augN')는 원본 아이콘 그룹별로 연속된 행에 모아 두어
+    그룹별 최대 점수를 벡터 연산(np.maximum.reduceat)으로 구한다.
+
+    2단계 검색(shortlist 지정 시): 그룹별 정규화 평균 벡터(centroid)로 후보 그룹을
+    먼저 고른 뒤, 후보 그룹의 증강 벡터만 정확히 다시 점수화한다.
+    ANN 인덱스(attach_ann)가 연결되어 있으면 후보 행을 ANN으로 찾는다.
+    저정밀도(set_precision) 사용 시 float16/int8 행렬로 1차 점수를 계산하고
+    상위 후보 그룹만 float32로 다시 점수화한다.
+    증분 추가된 아이콘(attach_delta)은 별도 청크 버퍼에서 정확히 점수화해 결과에 합친다.
+    """
+
+    def __init__(self, vectors, labels):
+        """
+        Args:
+            vectors (np.ndarray): (N, D) 레퍼런스 벡터
+            labels (Sequence[str]): 각 행의 레이블
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError(f"레퍼런스 벡터는 2차원이어야 합니다: shape={matrix.shape}")
+        if len(labels) != matrix.shape[0]:
+            raise ValueError(f"벡터 수({matrix.shape[0]})와 레이블 수({len(labels)})가 다릅니다")
+
+        labels = np.asarray(labels).astype(str)
+        group_ids, self.group_names = self._build_groups(labels)
+
+        # 그룹별로 행이 연속되도록 재정렬 (그룹 내 원래 순서는 유지)
+        row_order = np.argsort(group_ids, kind="stable")
+        matrix = matrix[row_order]
+        self.labels = labels[row_order]
+        self.group_ids = group_ids[row_order]
+        self.group_offsets = np.flatnonzero(
+            np.r_[True, self.group_ids[1:] != self.group_ids[:-1]]
+        )
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        self._init_derived()
+
+    def _init_derived(self, centroids=None, version=None):
+        """matrix / labels / group_offsets 설정 후 파생 필드 초기화"""
+        self.group_sizes = np.diff(np.r_[self.group_offsets, len(self.matrix)])
+        if not hasattr(self, "group_ids"):
+            self.group_ids = np.repeat(np.arange(len(self.group_offsets)), self.group_sizes)
+        if centroids is None:
+            centroids = self._build_centroids(self.matrix, self.group_offsets, self.group_sizes)
+        self.centroids = centroids
+        self.base_version = version or self._content_hash(self.matrix, self.labels)
+        self.header = getattr(self, "header", None)
+        # 스레드별 점수 버퍼 (쿼리마다 새 배열을 할당하지 않음)
+        self._buffers = threading.local()
+        self.ann = None
+        self.ann_probe = None
+        self.precision = "float32"
+        self.coarse = None
+        self.rerank_factor = 2
+        self.delta = None
+        self.partitions = None
+
+    @staticmethod
+    def _build_groups(labels):
+        """
+        레이블에서 원본 아이콘명('_aug' 이전) 기준 그룹 ID 계산
+
+        Returns:
+            tuple: (행별 그룹 ID, 첫 등장 순서의 그룹명 배열)
+        """
+        base_names = np.array(
+            [label.split("_aug")[0] if "_aug" in label else label for label in labels]
+        )
+        names, first_index, inverse = np.unique(
+            base_names, return_index=True, return_inverse=True
+        )
+        group_order = np.argsort(first_index, kind="stable")
+        rank = np.empty_like(group_order)
+        rank[group_order] = np.arange(len(group_order))
+        return rank[inverse.reshape(-1)], names[group_order]
+
+    @staticmethod
+    def _build_centroids(matrix, group_offsets, group_sizes):
+        """그룹별 정규화 벡터의 평균을 다시 정규화한 (G, D) centroid 행렬"""
+        sums = np.add.reduceat(matrix, group_offsets, axis=0) if len(matrix) else matrix
+        centroids = sums / group_sizes[:, None]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(centroids / norms, dtype=np.float32)
+
+    @staticmethod
+    def _content_hash(matrix, labels):
+        """벡터와 레이블 내용으로 계산한 인덱스 버전 (캐시 무효화 등에 사용)"""
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(np.ascontiguousarray(matrix).tobytes())
+        digest.update("\n".join(labels).encode("utf-8"))
+        return digest.hexdigest()
+
+    @property
+    def version(self):
+        """인덱스 버전 (기준 행렬 해시, 증분 추가가 있으면 '+추가 행 수')"""
+        delta_count = len(self.delta) if self.delta is not None else 0
+        return f"{self.base_version}+{delta_count}" if delta_count else self.base_version
+
+    @classmethod
+    def from_npz(cls, path):
+        """기존 vectorweight.npz (vectors, labels) 파일에서 인덱스 생성"""
+        data = np.load(path, allow_pickle=True)
+        return cls(data["vectors"], data["labels"])
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        경로 종류에 따라 인덱스 로드
+
+        Args:
+            path (str): 인덱스 디렉토리(convert 결과) 또는 기존 npz 파일
+            mmap (bool): 인덱스 디렉토리의 배열을 mmap_mode="r"로 열지 여부
+        """
+        if os.path.isdir(path):
+            return cls.from_directory(path, mmap=mmap)
+        return cls.from_npz(path)
+
+    @classmethod
+    def from_directory(cls, path, mmap=True):
+        """
+        인덱스 디렉토리 로드 (정규화/재정렬/해시 계산 없음)
+
+        행렬은 mmap으로 열어 실제 접근 시 페이지 단위로 읽히고, 같은 파일을 여는
+        프로세스들은 OS 페이지 캐시를 공유한다. float16 행렬도 그대로 두고 점수 계산 시
+        청크 단위로 float32 변환한다 (SCORE_CHUNK_ROWS).
+        """
+        with open(os.path.join(path, "header.json"), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format") != INDEX_FORMAT:
+            raise ValueError(f"레퍼런스 인덱스 디렉토리가 아닙니다: {path}")
+        if header.get("format_version", 0) > INDEX_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 인덱스 포맷 버전입니다: {header.get('format_version')}")
+
+        mmap_mode = "r" if mmap else None
+
+        def array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+        index = cls.__new__(cls)
+        index.header = header
+        matrix = array("vectors")
+        if matrix.shape != (header["count"], header["dim"]):
+            raise ValueError(
+                f"vectors.npy shape {matrix.shape}이 헤더({header['count']}, {header['dim']})와 다릅니다"
+            )
+        index.matrix = matrix
+        index.labels = array("labels")
+        index.group_offsets = np.asarray(array("group_offsets"), dtype=np.int64)
+        index.group_names = array("group_names")
+        index._init_derived(centroids=array("centroids"), version=header["content_hash"])
+        return index
+
+    def save(self, path, model_name=None, dtype="float32"):
+        """
+        인덱스 디렉토리로 저장 (임시 디렉토리에 쓴 뒤 교체)
+
+        Args:
+            path (str): 출력 디렉토리
+            model_name (str): 벡터를 만든 CLIP 모델명 (헤더 기록용)
+            dtype (str): 행렬 저장 dtype ("float32" | "float16")
+        """
+        if dtype not in INDEX_DTYPES:
+            raise ValueError(f"지원하지 않는 dtype입니다: {dtype} (선택: {', '.join(INDEX_DTYPES)})")
+        matrix = np.ascontiguousarray(self.matrix, dtype=dtype)
+        header = {
+            "format": INDEX_FORMAT,
+            "format_version": INDEX_FORMAT_VERSION,
+            "model_name": model_name,
+            "dim": self.dim,
+            "count": len(self),
+            "num_groups": self.num_groups,
+            "dtype": dtype,
+            "normalized": True,
+            # 저장된 행렬 기준 해시 (float16 저장 시 float32 원본과 다름)
+            "content_hash": self._content_hash(matrix, self.labels),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+
+        path = os.path.abspath(path)
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".reference_index_", dir=parent)
+        try:
+            np.save(os.path.join(tmp_dir, "vectors.npy"), matrix)
+            np.save(os.path.join(tmp_dir, "centroids.npy"), np.ascontiguousarray(self.centroids, dtype=np.float32))
+            np.save(os.path.join(tmp_dir, "group_offsets.npy"), np.asarray(self.group_offsets, dtype=np.int64))
+            np.save(os.path.join(tmp_dir, "group_names.npy"), np.asarray(self.group_names).astype(str))
+            np.save(os.path.join(tmp_dir, "labels.npy"), np.asarray(self.labels).astype(str))
+            with open(os.path.join(tmp_dir, "header.json"), "w", encoding="utf-8") as f:
+                json.dump(header, f, ensure_ascii=False, indent=2)
+
+            # 기존 디렉토리는 옆으로 옮긴 뒤 교체 (읽고 있던 프로세스의 mmap은 유지됨)
+            old_dir = None
+            if os.path.exists(path):
+                old_dir = tempfile.mkdtemp(prefix=".reference_index_old_", dir=parent)
+                os.rename(path, os.path.join(old_dir, "index"))
+            os.rename(tmp_dir, path)
+            if old_dir is not None:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return header
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    @property
+    def num_groups(self):
+        """기준 행렬의 그룹 수 (증분 추가된 새 아이콘 제외)"""
+        return len(self.group_names)
+
+    def group_name(self, group):
+        """그룹 ID의 원본 아이콘명 (증분 추가된 아이콘 포함)"""
+        if group < len(self.group_names):
+            return str(self.group_names[group])
+        return self.delta.group_name(group)
+
+    def attach_metadata(self, metadata):
+        """카테고리/태그 필터용 파티션 생성 (model.icon_metadata.read_metadata 결과)"""
+        from model.icon_metadata import IconPartitions
+
+        self.partitions = IconPartitions(
+            self.group_names, self.group_offsets, self.group_sizes, metadata, matrix=self.matrix
+        )
+
+    def attach_delta(self, delta):
+        """증분 추가 저장소 연결 (model.delta_index.DeltaStore)"""
+        if delta is not None and delta.base_version != self.base_version:
+            raise ValueError("delta 저장소의 기준 버전이 인덱스와 다릅니다")
+        self.delta = delta
+
+    def share_memory(self, directory=None):
+        """
+        검색에 쓰는 큰 배열을 공유 메모리(/dev/shm) 파일 매핑으로 이동
+
+        대상: 레퍼런스 행렬, centroid, 저정밀도 1차 점수 행렬(set_precision),
+        카테고리 파티션 부분 행렬(attach_metadata), IVF 리스트 사본(attach_ann).
+        매핑 직후 파일을 unlink 하므로 정리할 파일이 남지 않으며, 이후 fork 된
+        프로세스들은 같은 물리 페이지를 읽기 전용으로 공유한다. 인덱스 디렉토리에서
+        mmap으로 연 배열은 이미 OS 페이지 캐시를 공유하므로 그대로 둔다.
+        HNSW 그래프(hnswlib 네이티브 메모리)와 fork 이후 재로드한 인덱스는 공유되지 않는다.
+
+        Args:
+            directory (str): 매핑 파일을 만들 디렉토리 (기본: /dev/shm, 없으면 임시 디렉토리)
+        """
+        if directory is None:
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+        def share(array):
+            if array is None or isinstance(array, np.memmap):
+                return array
+            fd, path = tempfile.mkstemp(prefix="dingq_reference_", suffix=".npy", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                return np.load(path, mmap_mode="r")
+            finally:
+                os.unlink(path)
+
+        self.matrix = share(self.matrix)
+        self.centroids = share(self.centroids)
+        for component in (self.coarse, self.partitions, self.ann):
+            if component is not None:
+                component.share_memory(share)
+
+    def attach_ann(self, ann, probe=None):
+        """
+        ANN 인덱스 연결 (model.ann_index의 IVFIndex / HNSWIndex)
+
+        Args:
+            ann: search(query, k, probe) -> (행 번호, 유사도)를 제공하는 인덱스
+            probe (int): 탐색 폭 (ivf=nprobe, hnsw=ef, None이면 인덱스 기본값)
+        """
+        if ann is not None and ann.version is not None and ann.version != self.base_version:
+            raise ValueError(f"ANN 인덱스 버전({ann.version})이 레퍼런스 버전({self.base_version})과 다릅니다")
+        self.ann = ann
+        self.ann_probe = probe
+
+    def set_precision(self, precision="float32", rerank_factor=2):
+        """
+        1차 점수 계산 정밀도 설정
+
+        float32 행렬은 후보 재점수화에만 쓰이므로, 인덱스 디렉토리(mmap)에서 로드한 경우
+        상주 메모리는 저정밀도 행렬 + 재점수화로 읽힌 페이지 정도가 된다.
+        npz에서 로드한 경우 float32 행렬이 이미 메모리에 있으므로 저정밀도 행렬만큼
+        메모리가 오히려 늘어난다 (메모리 절감은 인덱스 디렉토리 경로에서만).
+
+        Args:
+            precision (str): "float32" | "float16" | "int8"
+            rerank_factor (int): float32로 재점수화할 후보 그룹 수 = top_k * rerank_factor
+        """
+        if precision == "float32":
+            self.coarse = None
+        else:
+            from model.reduced_precision import create_scorer
+
+            self.coarse = create_scorer(precision, self.matrix)
+        self.precision = precision
+        self.rerank_factor = max(1, rerank_factor)
+
+    def _score_buffer(self, batch_size):
+        buffer = getattr(self._buffers, "scores", None)
+        if buffer is None or buffer.shape[0] < batch_size:
+            buffer = np.empty((batch_size, len(self)), dtype=np.float32)
+            self._buffers.scores = buffer
+        return buffer[:batch_size]
+
+    def score(self, query_vectors):
+        """
+        코사인 유사도 계산
+
+        쿼리는 이미 L2 정규화되어 있어야 한다. 반환값은 스레드별로 재사용되는
+        버퍼이므로 같은 스레드에서 다음 score() 호출 전까지만 유효하다.
+
+        Args:
+            query_vectors (np.ndarray): (D,) 또는 (B, D) 정규화된 쿼리 벡터
+
+        Returns:
+            np.ndarray: (N,) 또는 (B, N) 유사도
+        """
+        query = np.asarray(query_vectors, dtype=np.float32)
+        out = self._score_buffer(1)[0] if query.ndim == 1 else self._score_buffer(query.shape[0])
+        if self.matrix.dtype != np.float32:
+            # float16 행렬: 전체를 float32로 복사하지 않고 청크 단위로 변환해 점수화
+            for start in range(0, len(self), SCORE_CHUNK_ROWS):
+                chunk = np.asarray(self.matrix[start:start + SCORE_CHUNK_ROWS], dtype=np.float32)
+                if query.ndim == 1:
+                    np.matmul(chunk, query, out=out[start:start + len(chunk)])
+                else:
+                    np.matmul(query, chunk.T, out=out[:, start:start + len(chunk)])
+            return out
+
+        if query.ndim == 1:
+            np.matmul(self.matrix, query, out=out)
+        else:
+            np.matmul(query, self.matrix.T, out=out)
+        return out
+
+    def group_scores(self, scores):
+        """행별 유사도에서 그룹(원본 아이콘)별 최대 유사도 계산"""
+        return np.maximum.reduceat(scores, self.group_offsets, axis=-1)
+
+    def top_groups(self, query_vector, top_k=100, shortlist=None, partition=None):
+        """
+        중복 제거된 상위 k개 아이콘 검색
+
+        Args:
+            query_vector (np.ndarray): (D,) 정규화된 쿼리 벡터
+            top_k (int): 반환할 아이콘 수
+            shortlist (int): centroid 단계에서 남길 후보 그룹 수
+                (None/0 이거나 전체 그룹 수 이상이면 전수 검색)
+            partition (Partition): 카테고리/태그 필터 파티션 (partitions.select 결과,
+                주어지면 파티션 행만 float32로 정확히 점수화)
+
+        Returns:
+            tuple: (그룹 인덱스 배열, 유사도 배열) - 유사도 내림차순
+        """
+        if top_k <= 0:
+            # 후보가 없으면 ANN/저정밀도 경로의 reduceat이 빈 배열에서 실패하므로 바로 반환
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        if partition is not None:
+            result = self._top_groups_partition(query_vector, top_k, partition)
+            if self.delta is not None and len(self.delta):
+                result = self._merge_delta(query_vector, result, top_k, mask=partition.mask)
+            return result
+        if self.ann is not None:
+            result = self._top_groups_ann(query_vector, top_k)
+        elif self.coarse is not None and top_k * self.rerank_factor < self.num_groups:
+            result = self._top_groups_reduced(query_vector, top_k)
+        elif shortlist and max(shortlist, top_k) < self.num_groups:
+            result = self._top_groups_shortlist(query_vector, top_k, max(shortlist, top_k))
+        else:
+            result = self._select_top(self.group_scores(self.score(query_vector)), top_k)
+        if self.delta is not None and len(self.delta):
+            result = self._merge_delta(query_vector, result, top_k)
+        return result
+
+    def _merge_delta(self, query_vector, result, top_k, mask=None):
+        """
+        기준 행렬 결과와 증분 추가 행의 그룹별 최대 유사도를 합쳐 상위 k개 선택
+
+        mask가 주어지면 (필터 검색) 비트셋에 포함된 기존 그룹의 delta 행만 반영한다.
+        """
+        delta_groups, delta_scores = self.delta.group_scores(query_vector)
+        if mask is not None:
+            keep = delta_groups < len(mask)
+            keep[keep] = mask[delta_groups[keep]]
+            delta_groups, delta_scores = delta_groups[keep], delta_scores[keep]
+        groups = np.concatenate([result[0], delta_groups])
+        scores = np.concatenate([result[1], delta_scores]).astype(np.float32)
+        # 같은 그룹은 최대값만 (유사도 내림차순 정렬 후 첫 등장)
+        order = np.argsort(-scores, kind="stable")
+        _, first = np.unique(groups[order], return_index=True)
+        keep = order[np.sort(first)][:top_k]
+        return groups[keep], scores[keep]
+
+    def _top_groups_shortlist(self, query_vector, top_k, shortlist):
+        """centroid 점수 상위 shortlist개 그룹의 증강 벡터만 재점수화"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        centroid_scores = self.centroids @ query
+        candidates = np.argpartition(-centroid_scores, shortlist - 1)[:shortlist]
+        return self._rerank_groups(query, candidates, top_k)
+
+    def _top_groups_reduced(self, query_vector, top_k):
+        """저정밀도 1차 점수의 그룹 상위 top_k * rerank_factor개를 float32로 재점수화"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        coarse_scores = self.group_scores(self.coarse(query))
+        rerank = top_k * self.rerank_factor
+        candidates = np.argpartition(-coarse_scores, rerank - 1)[:rerank]
+        return self._rerank_groups(query, candidates, top_k)
+
+    def _rerank_groups(self, query, candidates, top_k):
+        """후보 그룹들의 행만 float32로 정확히 점수화해 상위 k개 선택"""
+        candidates = np.sort(candidates)  # 행 접근을 메모리 순서로
+
+        # 후보 그룹들의 행 인덱스 (그룹별 연속 구간을 이어 붙임)
+        sizes = self.group_sizes[candidates]
+        sub_offsets = np.r_[0, np.cumsum(sizes)[:-1]]
+        rows = np.arange(sizes.sum()) + np.repeat(self.group_offsets[candidates] - sub_offsets, sizes)
+
+        scores = np.asarray(self.matrix[rows], dtype=np.float32) @ query
+        group_scores = np.maximum.reduceat(scores, sub_offsets)
+        order, top_scores = self._select_top(group_scores, top_k)
+        return candidates[order], top_scores
+
+    def _top_groups_partition(self, query_vector, top_k, partition):
+        """필터 파티션의 행만 점수화 (미리 분할된 부분 행렬이 없으면 행 인덱스로 모음)"""
+        if len(partition.groups) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        query = np.asarray(query_vector, dtype=np.float32)
+        matrix = partition.matrix if partition.matrix is not None else np.asarray(self.matrix[partition.rows], dtype=np.float32)
+        group_scores = np.maximum.reduceat(matrix @ query, partition.offsets)
+        order, top_scores = self._select_top(group_scores, top_k)
+        return partition.groups[order], top_scores
+
+    def _top_groups_ann(self, query_vector, top_k):
+        """ANN 후보 행에서 그룹별 최대 유사도 상위 k개 (그룹 크기만큼 후보를 더 가져옴)"""
+        k = min(len(self), top_k * int(self.group_sizes.max(initial=1)))
+        rows, scores = self.ann.search(query_vector, k, probe=self.ann_probe)
+        # 유사도 내림차순이므로 그룹별 첫 등장 위치가 그룹 내 최대값
+        _, first = np.unique(self.group_ids[rows], return_index=True)
+        first.sort()
+        first = first[:top_k]
+        return self.group_ids[rows[first]], scores[first]
+
+    @staticmethod
+    def _select_top(group_scores, top_k):
+        k = min(top_k, len(group_scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        if k < len(group_scores):
+            candidates = np.argpartition(-group_scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(group_scores))
+        order = candidates[np.argsort(-group_scores[candidates], kind="stable")]
+        return order, group_scores[order]
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description="레퍼런스 인덱스 변환")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="vectorweight.npz를 mmap 가능한 인덱스 디렉토리로 변환")
+    convert.add_argument("source", help="기존 npz 파일 (vectors, labels)")
+    convert.add_argument("output", help="출력 인덱스 디렉토리 (예: model/vectorweight.index)")
+    convert.add_argument("--model-name", default="openai/clip-vit-base-patch32")
+    convert.add_argument("--dtype", choices=INDEX_DTYPES, default="float32")
+    info = sub.add_parser("info", help="인덱스 디렉토리 헤더 출력")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print(json.dumps(ReferenceIndex.from_directory(args.path).header, ensure_ascii=False, indent=2))
+        return
+
+    started = time.perf_counter()
+    header = ReferenceIndex.from_npz(args.source).save(args.output, model_name=args.model_name, dtype=args.dtype)
+    print(
+        f"변환 완료: {args.output} ({header['count']}개 벡터, {header['num_groups']}개 아이콘, "
+        f"{header['dtype']}, {time.perf_counter() - started:.2f}초)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+pgvector 카탈로그 관리 (svg_icons)
+
+레퍼런스 벡터와 메타데이터를 COPY로 한 트랜잭션에 적재한다 (icon_name 기준 upsert).
+아이콘당 벡터는 원본 + 증강 벡터의 정규화 centroid 1개를 사용한다.
+벡터 인덱스(ivfflat/hnsw)는 클러스터링이 데이터에 맞도록 적재 후에 다시 만든다.
+
+사용법 (app/ 디렉토리에서):
+    python -m model.vector_db load model/vectorweight.index --metadata icons.csv --index ivfflat
+    python -m model.vector_db index --kind hnsw
+    python -m model.vector_db report --probes 1 4 8 16
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from model.icon_metadata import read_metadata
+from model.vector_store import PROBE_SETTINGS
+
+try:
+    import psycopg
+    from pgvector.psycopg import register_vector
+    PGVECTOR_AVAILABLE = True
+except ImportError:
+    PGVECTOR_AVAILABLE = False
+
+COPY_FORMATS = ("binary", "text")
+DEFAULT_SVG_BASE = "gs://dingq-svg-icons"
+INDEX_KINDS = ("ivfflat", "hnsw")
+INDEX_NAME = "idx_svg_icons_vector"
+
+_CREATE_STAGING = """
+CREATE TEMP TABLE svg_icons_load (
+    icon_name VARCHAR(255) NOT NULL,
+    svg_path VARCHAR(500) NOT NULL,
+    category VARCHAR(100),
+    description TEXT,
+    tags TEXT[],
+    vector_features vector
+) ON COMMIT DROP
+"""
+
+_UPSERT = """
+INSERT INTO svg_icons (icon_name, svg_path, category, description, tags, vector_features)
+SELECT icon_name, svg_path, category, description, tags, vector_features FROM svg_icons_load
+ON CONFLICT (icon_name) DO UPDATE SET
+    vector_features = EXCLUDED.vector_features,
+    svg_path = EXCLUDED.svg_path,
+    category = COALESCE(EXCLUDED.category, svg_icons.category),
+    description = COALESCE(EXCLUDED.description, svg_icons.description),
+    tags = COALESCE(EXCLUDED.tags, svg_icons.tags)
+"""
+
+_COLUMNS = "icon_name, svg_path, category, description, tags, vector_features"
+_COLUMN_TYPES = ["text", "text", "text", "text", "text[]", "vector"]
+
+
+def iter_icon_rows(names, vectors, metadata=None, svg_base=DEFAULT_SVG_BASE):
+    """
+    COPY 행 생성 (아이콘명, SVG 경로, 카테고리, 설명, 태그, 벡터)
+
+    Args:
+        names (Sequence[str]): 아이콘명
+        vectors (np.ndarray): (N, D) 아이콘별 정규화 벡터
+        metadata (dict): read_metadata 결과
+        svg_base (str): svg_path가 없을 때 사용할 '<svg_base>/<이름>.svg'
+    """
+    metadata = metadata or {}
+    for name, vector in zip(names, vectors):
+        name = str(name)
+        meta = metadata.get(name, {})
+        yield (
+            name,
+            meta.get("svg_path") or f"{svg_base.rstrip('/')}/{name}.svg",
+            meta.get("category"),
+            meta.get("description"),
+            meta.get("tags"),
+            np.asarray(vector, dtype=np.float32),
+        )
+
+
+def bulk_load(conn, rows, copy_format="binary"):
+    """
+    svg_icons에 COPY 적재 + icon_name 기준 upsert (호출자의 트랜잭션 안에서 실행)
+
+    임시 테이블로 COPY한 뒤 INSERT ... ON CONFLICT 한 번으로 합친다.
+
+    Args:
+        conn (psycopg.Connection): register_vector가 적용된 연결
+        rows (Iterable[tuple]): iter_icon_rows 결과
+        copy_format (str): "binary" | "text"
+
+    Returns:
+        int: upsert된 행 수
+    """
+    if copy_format not in COPY_FORMATS:
+        raise ValueError(f"알 수 없는 COPY 포맷입니다: {copy_format} (선택: {', '.join(COPY_FORMATS)})")
+    with conn.cursor() as cur:
+        cur.execute(_CREATE_STAGING)
+        with cur.copy(f"COPY svg_icons_load ({_COLUMNS}) FROM STDIN (FORMAT {copy_format.upper()})") as copy:
+            if copy_format == "binary":
+                copy.set_types(_COLUMN_TYPES)
+            for row in rows:
+                copy.write_row(row)
+        cur.execute(_UPSERT)
+        return cur.rowcount
+
+
+def load_reference(dsn, reference_data_path, metadata_path=None, svg_base=DEFAULT_SVG_BASE, copy_format="binary"):
+    """
+    레퍼런스(인덱스 디렉토리 또는 npz)를 svg_icons에 적재
+
+    Returns:
+        dict: 적재 행 수, 소요 시간, 초당 행 수
+    """
+    from model.reference_index import ReferenceIndex
+
+    index = ReferenceIndex.load(reference_data_path)
+    metadata = read_metadata(metadata_path) if metadata_path else None
+    rows = iter_icon_rows(index.group_names, index.centroids, metadata, svg_base=svg_base)
+
+    started = time.perf_counter()
+    with _connect(dsn) as conn:
+        count = bulk_load(conn, rows, copy_format=copy_format)
+    seconds = time.perf_counter() - started
+    return {
+        "rows": count,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(count / seconds) if seconds > 0 else None,
+        "format": copy_format,
+    }
+
+
+def default_lists(rows):
+    """ivfflat 리스트 수 (pgvector 권장값: 100만 행까지 rows/1000, 그 이상은 sqrt(rows))"""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def default_probe(kind, lists=None, top_k=100):
+    """
+    검색 탐색 폭 기본값
+
+    ivfflat은 sqrt(lists), hnsw는 top_k의 2배 (ef_search보다 많은 결과는 반환되지 않음)
+    """
+    if kind == "ivfflat":
+        return max(1, int(math.sqrt(lists or 1)))
+    return max(40, 2 * top_k)
+
+
+def build_vector_index(conn, kind="ivfflat", lists=None, m=16, ef_construction=64, maintenance_work_mem=None):
+    """
+    svg_icons 벡터 인덱스 삭제 후 재생성 (적재 후 호출)
+
+    ivfflat은 생성 시점의 행으로 k-means 리스트를 만들므로 빈 테이블에서 만든
+    인덱스는 쓸모가 없다. 행 수에 맞춰 lists를 정한다.
+
+    Args:
+        conn (psycopg.Connection): 연결 (autocommit 권장, 트랜잭션이면 커밋은 호출자가)
+        kind (str): "ivfflat" | "hnsw"
+        lists (int): ivfflat 리스트 수 (None이면 행 수로 결정)
+        m (int): hnsw 노드당 연결 수
+        ef_construction (int): hnsw 생성 시 후보 큐 크기
+        maintenance_work_mem (str): 생성 중 maintenance_work_mem (예: "1GB")
+
+    Returns:
+        dict: 인덱스 종류, 파라미터, 행 수, 권장 탐색 폭, 소요 시간
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"알 수 없는 인덱스 종류입니다: {kind} (선택: {', '.join(INDEX_KINDS)})")
+    rows = conn.execute("SELECT count(*) FROM svg_icons WHERE vector_features IS NOT NULL").fetchone()[0]
+    if kind == "ivfflat":
+        lists = lists or default_lists(rows)
+        params = {"lists": lists}
+    else:
+        params = {"m": m, "ef_construction": ef_construction}
+    options = ", ".join(f"{key} = {int(value)}" for key, value in params.items())
+
+    started = time.perf_counter()
+    if maintenance_work_mem:
+        conn.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+    conn.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+    conn.execute(
+        f"CREATE INDEX {INDEX_NAME} ON svg_icons USING {kind} (vector_features vector_cosine_ops) WITH ({options})"
+    )
+    conn.execute("ANALYZE svg_icons")
+    return {
+        "kind": kind,
+        **params,
+        "rows": rows,
+        "probe": default_probe(kind, params.get("lists")),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def current_index(conn):
+    """현재 svg_icons 벡터 인덱스 종류 ("ivfflat" | "hnsw" | None)"""
+    row = conn.execute(
+        "SELECT am.amname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_am am ON am.oid = c.relam "
+        "WHERE i.indrelid = 'svg_icons'::regclass AND c.relname = %s",
+        (INDEX_NAME,),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def recall_report(conn, probes, num_queries=100, top_k=100, noise=0.1, seed=0):
+    """
+    인덱스 검색 recall@k / 지연시간 보고서 (전수 검색 대비)
+
+    테이블의 벡터를 무작위로 골라 노이즈를 더한 쿼리(손 스케치 근사)를 사용한다.
+
+    Args:
+        conn (psycopg.Connection): register_vector가 적용된 연결
+        probes (Sequence[int]): 비교할 탐색 폭 (ivfflat.probes 또는 hnsw.ef_search)
+        num_queries (int): 쿼리 수
+        top_k (int): recall 계산 기준 상위 k
+        noise (float): 쿼리 노이즈 표준편차 (정규화 전 성분별)
+
+    Returns:
+        list[dict]: 설정별 {"mode", "probe", "recall", "p50_ms", "p99_ms"}
+    """
+    kind = current_index(conn)
+    rows = conn.execute(
+        "SELECT vector_features FROM svg_icons WHERE vector_features IS NOT NULL ORDER BY random() LIMIT %s",
+        (num_queries,),
+    ).fetchall()
+    rng = np.random.default_rng(seed)
+    queries = []
+    for (vector,) in rows:
+        vector = np.asarray(vector.to_numpy() if hasattr(vector, "to_numpy") else vector, dtype=np.float32)
+        query = vector + rng.normal(scale=noise, size=vector.shape).astype(np.float32)
+        queries.append(query / np.linalg.norm(query))
+
+    query_sql = (
+        "SELECT icon_name FROM svg_icons WHERE vector_features IS NOT NULL "
+        "ORDER BY vector_features <=> %b LIMIT %s"
+    )
+
+    def run(settings):
+        results, latencies = [], []
+        for query in queries:
+            with conn.transaction():
+                for name, value in settings.items():
+                    conn.execute("SELECT set_config(%s, %s, true)", (name, str(value)))
+                started = time.perf_counter()
+                results.append([row[0] for row in conn.execute(query_sql, (query, top_k)).fetchall()])
+                latencies.append((time.perf_counter() - started) * 1000)
+        return results, latencies
+
+    # 전수 검색 (인덱스 스캔 비활성화)
+    exact, latencies = run({"enable_indexscan": "off"})
+    report = [{
+        "mode": "exact", "probe": None, "recall": 1.0,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3), "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }]
+    if kind is None:
+        return report
+    for probe in probes:
+        approx, latencies = run({PROBE_SETTINGS[kind]: probe})
+        hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+        report.append({
+            "mode": kind, "probe": probe,
+            "recall": round(hits / max(1, sum(len(e) for e in exact)), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        })
+    return report
+
+
+def _connect(dsn, autocommit=False):
+    if not PGVECTOR_AVAILABLE:
+        raise ImportError("psycopg[binary], pgvector를 설치하세요")
+    conn = psycopg.connect(dsn, autocommit=autocommit)
+    register_vector(conn)
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pgvector 카탈로그 관리 (svg_icons)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="레퍼런스 벡터 + 메타데이터를 COPY로 적재 (icon_name 기준 upsert)")
+    load.add_argument("reference", help="레퍼런스 (인덱스 디렉토리 또는 npz)")
+    load.add_argument("--metadata", default=None, help="메타데이터 CSV (icon_name, category, tags, svg_path, description)")
+    load.add_argument("--svg-base", default=DEFAULT_SVG_BASE, help="svg_path가 없는 아이콘의 기본 경로")
+    load.add_argument("--format", choices=COPY_FORMATS, default="binary", help="COPY 포맷")
+    load.add_argument("--index", choices=INDEX_KINDS, default=None, help="적재 후 벡터 인덱스 재생성")
+
+    index = sub.add_parser("index", help="벡터 인덱스 삭제 후 재생성")
+    index.add_argument("--kind", choices=INDEX_KINDS, default="ivfflat")
+    index.add_argument("--lists", type=int, default=None, help="ivfflat 리스트 수 (기본: 행 수로 결정)")
+    index.add_argument("--m", type=int, default=16, help="hnsw 노드당 연결 수")
+    index.add_argument("--ef-construction", type=int, default=64, help="hnsw 생성 시 후보 큐 크기")
+    index.add_argument("--maintenance-work-mem", default=None, help="생성 중 maintenance_work_mem (예: 1GB)")
+
+    report = sub.add_parser("report", help="현재 인덱스의 recall@k / 지연시간 (전수 검색 대비)")
+    report.add_argument("--probes", type=int, nargs="+", default=[1, 4, 10, 40])
+    report.add_argument("--queries", type=int, default=100)
+    report.add_argument("--top-k", type=int, default=100)
+    report.add_argument("--json", default=None, help="결과 JSON 저장 경로")
+
+    for command in (load, index, report):
+        command.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="PostgreSQL 연결 문자열 (기본: DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        result = load_reference(args.dsn, args.reference, args.metadata, svg_base=args.svg_base, copy_format=args.format)
+        print(f"적재 완료: {result['rows']}개 아이콘, {result['seconds']}초 ({result['rows_per_second']} rows/s, {result['format']})")
+        if args.index is None:
+            return
+        args.kind, args.lists, args.m, args.ef_construction, args.maintenance_work_mem = args.index, None, 16, 64, None
+
+    if args.command in ("load", "index"):
+        with _connect(args.dsn, autocommit=True) as conn:
+            result = build_vector_index(
+                conn, args.kind, lists=args.lists, m=args.m, ef_construction=args.ef_construction,
+                maintenance_work_mem=args.maintenance_work_mem,
+            )
+        print(f"인덱스 생성 완료: {json.dumps(result, ensure_ascii=False)}")
+        print(f"권장 설정: VECTOR_STORE_INDEX={result['kind']} VECTOR_STORE_PROBE={result['probe']}")
+        return
+
+    with _connect(args.dsn, autocommit=True) as conn:
+        rows = recall_report(conn, args.probes, num_queries=args.queries, top_k=args.top_k)
+    for row in rows:
+        probe = "-" if row["probe"] is None else row["probe"]
+        print(f"{row['mode']:>8} probe={probe:>4} recall@{args.top_k}={row['recall']:.4f} p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
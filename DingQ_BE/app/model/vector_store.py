@@ -0,0 +1,263 @@
+"""
+검색 벡터 저장소 (쿼리 벡터 -> 상위 아이콘)
+
+- memory   : 프로세스 내 ReferenceIndex (NumPy, 증강 벡터 중 아이콘별 최대 유사도)
+- pgvector : PostgreSQL svg_icons.vector_features (아이콘당 벡터 1개, 커넥션 풀)
+
+두 저장소 모두 search()가 [{"reference_name", "similarity_score"}, ...]를
+유사도 내림차순으로 반환하므로 CLIPImageSearcher는 저장소 종류와 무관하게 동작한다.
+카테고리/태그 필터도 같은 의미(카테고리 OR, 태그 AND)로 처리한다.
+
+점수는 같지 않다. memory는 원본 + 증강 벡터 중 최대 유사도, pgvector는 vector_db load가
+적재한 아이콘별 정규화 centroid 1개와의 유사도이므로 순위와 점수가 다를 수 있다
+(특정 증강 벡터와만 가까운 스케치는 memory에서 더 높게 나온다).
+"""
+import threading
+import time
+
+import numpy as np
+
+from model.icon_metadata import normalize_filter
+
+# pgvector 저장소 전용 의존성 (memory 저장소만 쓰면 필요 없음)
+try:
+    from pgvector.psycopg import register_vector
+    from psycopg import sql
+    from psycopg_pool import ConnectionPool
+    PGVECTOR_AVAILABLE = True
+except ImportError:
+    PGVECTOR_AVAILABLE = False
+
+VECTOR_STORES = ("memory", "pgvector")
+# pgvector 인덱스별 요청 탐색 폭 설정 (ivfflat: 탐색할 리스트 수, hnsw: 후보 큐 크기)
+PROBE_SETTINGS = {"ivfflat": "ivfflat.probes", "hnsw": "hnsw.ef_search"}
+
+
+class VectorStore:
+    """벡터 저장소 인터페이스"""
+
+    name = "base"
+
+    @property
+    def version(self):
+        """결과 캐시 키에 쓰는 저장소 버전 (내용이 바뀌면 달라짐)"""
+        raise NotImplementedError
+
+    def search(self, query_vector, top_k=100, categories=None, tags=None):
+        """
+        Args:
+            query_vector (np.ndarray): (D,) L2 정규화된 쿼리 벡터
+            top_k (int): 반환할 아이콘 수
+            categories (str | Sequence[str]): 카테고리 필터 (여러 개면 OR)
+            tags (str | Sequence[str]): 태그 필터 (여러 개면 AND)
+
+        Returns:
+            list[dict]: [{"reference_name": str, "similarity_score": float}, ...] (유사도 내림차순)
+        """
+        raise NotImplementedError
+
+    def get_metrics(self):
+        return {"backend": self.name}
+
+    def close(self):
+        pass
+
+
+class InMemoryVectorStore(VectorStore):
+    """프로세스 내 ReferenceIndex 검색 (정밀도/shortlist/ANN/delta 설정은 인덱스를 따름)"""
+
+    name = "memory"
+
+    def __init__(self, index, shortlist=0):
+        """
+        Args:
+            index (ReferenceIndex): 레퍼런스 인덱스
+            shortlist (int): 2단계 검색의 centroid 후보 그룹 수 (0이면 전수 검색)
+        """
+        self.index = index
+        self.shortlist = shortlist
+
+    @property
+    def version(self):
+        return self.index.version
+
+    def search(self, query_vector, top_k=100, categories=None, tags=None):
+        index = self.index
+        partition = None
+        if categories or tags:
+            if index.partitions is None:
+                raise ValueError("아이콘 메타데이터가 없어 카테고리/태그 필터를 사용할 수 없습니다")
+            partition = index.partitions.select(categories, tags)
+        groups, scores = index.top_groups(query_vector, top_k=top_k, shortlist=self.shortlist, partition=partition)
+        return [
+            {"reference_name": index.group_name(group), "similarity_score": float(score)}
+            for group, score in zip(groups, scores)
+        ]
+
+    def get_metrics(self):
+        return {"backend": self.name, "vectors": len(self.index), "icons": self.index.num_groups}
+
+
+class PgVectorStore(VectorStore):
+    """
+    pgvector 검색 (psycopg 3 커넥션 풀 + 바이너리 벡터 파라미터)
+
+    쿼리 벡터는 문자열로 만들지 않고 pgvector 바이너리 포맷(float32)으로 전송하며,
+    같은 쿼리를 반복하므로 psycopg가 서버 측 prepared statement로 전환한다.
+    풀은 첫 검색 시 연다 (gunicorn 마스터에서 생성 후 fork 되어도 워커마다 별도 연결).
+    """
+
+    name = "pgvector"
+
+    def __init__(self, dsn, table="svg_icons", min_size=1, max_size=4, timeout=5.0, index_kind=None, probe=None,
+                 version_interval=5.0):
+        """
+        Args:
+            dsn (str): PostgreSQL 연결 문자열 (DATABASE_URL)
+            table (str): 아이콘 테이블 (icon_name, vector_features 컬럼)
+            min_size (int): 풀 최소 연결 수
+            max_size (int): 풀 최대 연결 수 (검색 실행기 워커 수 이하 권장)
+            timeout (float): 풀에서 연결을 기다리는 최대 시간 (초)
+            index_kind (str): 벡터 인덱스 종류 ("ivfflat" | "hnsw", None이면 탐색 폭 설정 안 함)
+            probe (int): 요청마다 설정할 탐색 폭 (ivfflat.probes / hnsw.ef_search)
+            version_interval (float): 테이블 버전을 다시 조회하는 간격 (초)
+        """
+        if not PGVECTOR_AVAILABLE:
+            raise ImportError("pgvector 저장소를 사용하려면 psycopg[binary], psycopg_pool, pgvector를 설치하세요")
+        self.dsn = dsn
+        self.table = table
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        if index_kind is not None and index_kind not in PROBE_SETTINGS:
+            raise ValueError(f"알 수 없는 인덱스 종류입니다: {index_kind} (선택: {', '.join(PROBE_SETTINGS)})")
+        self.index_kind = index_kind
+        self.probe = probe
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self.version_interval = version_interval
+        self._version = None
+        self._version_checked = 0.0
+        self.queries = 0
+        self.total_seconds = 0.0
+        self._queries = {}
+
+    @property
+    def version(self):
+        """
+        테이블 내용 기준 버전 (행 수 + 마지막으로 쓰인 행의 트랜잭션 ID)
+
+        vector_db load(upsert)나 다른 경로의 UPDATE/DELETE가 커밋되면 값이 바뀌어
+        결과 캐시가 무효화된다. 검색마다 조회하지 않도록 version_interval초 동안 재사용한다.
+        """
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked >= self.version_interval:
+            query = sql.SQL("SELECT count(*), max(xmin::text::bigint) FROM {table}").format(
+                table=sql.Identifier(self.table)
+            )
+            with self._get_pool().connection() as conn:
+                count, last_xid = conn.execute(query).fetchone()
+            self._version = f"pgvector:{self.table}:{count}:{last_xid or 0}"
+            self._version_checked = now
+        return self._version
+
+    def _query(self, categories, tags):
+        """필터 조합별 검색 쿼리 (조합마다 한 번만 만들어 prepared statement 재사용)"""
+        key = (categories is not None, tags is not None)
+        query = self._queries.get(key)
+        if query is None:
+            conditions = ["vector_features IS NOT NULL"]
+            if categories is not None:
+                conditions.append("category = ANY(%(categories)s)")
+            if tags is not None:
+                conditions.append("tags @> %(tags)s")
+            query = sql.SQL(
+                "SELECT icon_name, 1 - (vector_features <=> %(query)b) AS similarity_score "
+                "FROM {table} WHERE " + " AND ".join(conditions) + " "
+                "ORDER BY vector_features <=> %(query)b LIMIT %(top_k)s"
+            ).format(table=sql.Identifier(self.table))
+            self._queries[key] = query
+        return query
+
+    @staticmethod
+    def _configure(conn):
+        register_vector(conn)
+
+    def _get_pool(self):
+        if self.pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = ConnectionPool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        timeout=self.timeout,
+                        configure=self._configure,
+                        kwargs={"autocommit": True},
+                        open=True,
+                        name=f"{self.name}-{self.table}",
+                    )
+        return self.pool
+
+    def search(self, query_vector, top_k=100, categories=None, tags=None):
+        query_vector = np.ascontiguousarray(query_vector, dtype=np.float32)
+        categories, tags = normalize_filter(categories), normalize_filter(tags)
+        started = time.perf_counter()
+        query = self._query(categories, tags)
+        params = {
+            "query": query_vector,
+            "top_k": top_k,
+            "categories": list(categories or ()),
+            "tags": list(tags or ()),
+        }
+        with self._get_pool().connection() as conn:
+            if self.index_kind and self.probe:
+                # hnsw는 ef_search보다 많은 결과를 반환하지 않으므로 top_k 이상으로 설정
+                probe = max(self.probe, top_k) if self.index_kind == "hnsw" else self.probe
+                # 탐색 폭은 이 요청의 트랜잭션에만 적용 (SET LOCAL), 한 번의 왕복으로 전송
+                with conn.pipeline(), conn.transaction():
+                    conn.execute("SELECT set_config(%s, %s, true)", (PROBE_SETTINGS[self.index_kind], str(probe)))
+                    cursor = conn.execute(query, params)
+                rows = cursor.fetchall()
+            else:
+                rows = conn.execute(query, params).fetchall()
+        self.queries += 1
+        self.total_seconds += time.perf_counter() - started
+        return [{"reference_name": name, "similarity_score": float(score)} for name, score in rows]
+
+    def get_metrics(self):
+        metrics = {
+            "backend": self.name,
+            "table": self.table,
+            "index": self.index_kind,
+            "probe": self.probe,
+            "queries": self.queries,
+            "avg_ms": round(self.total_seconds / self.queries * 1000, 3) if self.queries else None,
+        }
+        if self.pool is not None:
+            stats = self.pool.get_stats()
+            metrics["pool"] = {
+                key: stats.get(key, 0) for key in ("pool_size", "pool_available", "requests_waiting", "requests_num")
+            }
+        return metrics
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+
+def create_vector_store(backend, index=None, shortlist=0, dsn=None, **options):
+    """
+    Args:
+        backend (str): "memory" | "pgvector"
+        index (ReferenceIndex): memory 저장소용 인덱스
+        shortlist (int): memory 저장소 2단계 검색 후보 수
+        dsn (str): pgvector 저장소 연결 문자열
+        **options: PgVectorStore 옵션 (table, min_size, max_size, timeout, index_kind, probe, version_interval)
+    """
+    if backend == "memory":
+        return InMemoryVectorStore(index, shortlist=shortlist)
+    if backend == "pgvector":
+        return PgVectorStore(dsn, **options)
+    raise ValueError(f"알 수 없는 벡터 저장소입니다: {backend} (선택: {', '.join(VECTOR_STORES)})")
@@ -0,0 +1,138 @@
+"""
+ANN 인덱스 벤치마크 (IVF / HNSW vs 전수 검색)
+
+합성 벡터(클러스터 구조를 가진 정규화 벡터, 각 벡터가 별도 아이콘)로 카탈로그 크기별
+recall@k(전수 검색 상위 k개 대비 겹침 비율)와 쿼리 지연 시간 p50/p99, 생성 시간을 측정한다.
+탐색 폭(ivf=nprobe, hnsw=ef)을 바꿔 가며 recall/지연 시간 trade-off를 확인한다.
+
+메모리: 벡터 수 x 차원 x 4바이트의 레퍼런스 행렬에 더해 IVF는 같은 크기의 사본,
+HNSW는 그래프 링크를 추가로 사용한다 (1M x 512 기준 행렬만 약 2GB).
+
+사용법 (DingQ_BE 디렉토리에서):
+    python benchmarks/bench_ann.py --sizes 10000 100000 1000000
+    python benchmarks/bench_ann.py --sizes 1000000 --dim 128 --kinds ivf --probes 8 16 32 --json ann.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from model.ann_index import HNSWLIB_AVAILABLE, build_ann, default_params  # noqa: E402
+from model.reference_index import ReferenceIndex  # noqa: E402
+
+DEFAULT_PROBES = {"ivf": [4, 16, 64], "hnsw": [64, 128, 256]}
+
+
+def synthetic_vectors(size, dim, rng, points_per_cluster=100, spread=0.5, chunk_size=100000):
+    """클러스터 중심 주변에 분포한 정규화 벡터 (CLIP 임베딩처럼 군집된 분포를 흉내)"""
+    centers = rng.standard_normal((max(1, size // points_per_cluster), dim), dtype=np.float32)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, chunk_size):
+        end = min(size, start + chunk_size)
+        chunk = centers[rng.integers(len(centers), size=end - start)]
+        chunk += spread * rng.standard_normal((end - start, dim), dtype=np.float32)
+        vectors[start:end] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(index, count, rng, noise=0.3):
+    queries = index.matrix[rng.integers(len(index), size=count)].copy()
+    queries += noise * rng.standard_normal(queries.shape, dtype=np.float32) / np.sqrt(index.dim)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def measure(index, queries, top_k):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        groups, _ = index.top_groups(query, top_k=top_k)
+        latencies.append(time.perf_counter() - started)
+        results.append(set(groups.tolist()))
+    latencies = np.array(latencies) * 1000
+    return results, {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def report_row(row, top_k):
+    print(
+        f"n={row['size']:>8} {row['mode']:>14} recall@{top_k}={row['recall']:.4f} "
+        f"p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms"
+        + (f" build={row['build_s']:.1f}s" if "build_s" in row else "")
+    )
+
+
+def run_size(size, args, rng):
+    vectors = synthetic_vectors(size, args.dim, rng)
+    index = ReferenceIndex(vectors, np.arange(size).astype(str))
+    del vectors
+    gc.collect()
+    queries = make_queries(index, args.queries, rng)
+
+    exact, stats = measure(index, queries, args.top_k)
+    rows = [{"size": size, "dim": args.dim, "mode": "exact", "recall": 1.0, **stats}]
+    report_row(rows[-1], args.top_k)
+
+    for kind in args.kinds:
+        if kind == "hnsw" and not HNSWLIB_AVAILABLE:
+            print("hnswlib 없음: hnsw 생략")
+            continue
+        params = default_params(kind, size)
+        started = time.perf_counter()
+        ann = build_ann(kind, index.matrix, version=index.version, **params)
+        build_s = time.perf_counter() - started
+
+        for probe in args.probes or DEFAULT_PROBES[kind]:
+            index.attach_ann(ann, probe=probe)
+            results, stats = measure(index, queries, args.top_k)
+            recall = np.mean([len(r & e) / len(e) for r, e in zip(results, exact)])
+            rows.append({
+                "size": size,
+                "dim": args.dim,
+                "mode": f"{kind}:{'nprobe' if kind == 'ivf' else 'ef'}={probe}",
+                "recall": round(float(recall), 4),
+                "build_s": round(build_s, 2),
+                **params,
+                **stats,
+            })
+            report_row(rows[-1], args.top_k)
+        index.attach_ann(None)
+        del ann
+        gc.collect()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN 인덱스 recall/지연 시간 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--kinds", nargs="+", choices=["ivf", "hnsw"], default=["ivf", "hnsw"])
+    parser.add_argument("--probes", type=int, nargs="*", default=None, help="탐색 폭 목록 (기본: 종류별 기본값)")
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    report = []
+    for size in args.sizes:
+        report += run_size(size, args, rng)
+        gc.collect()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+CLIP 이미지 추론 엔진 벤치마크 (fp32 / int8 / onnx)
+
+엔진별 지연 시간, 처리량, 상주 메모리와 fp32 대비 임베딩 코사인 일치도,
+top-k 검색 결과 겹침 비율을 측정한다.
+
+메모리는 엔진마다 비전 타워(CLIPVisionModelWithProjection)를 새로 로드해 엔진을 만들고,
+fp32 원본을 해제한 뒤의 RSS 증가량이다 (int8/onnx는 원본 가중치를 참조하지 않음).
+
+사용법 (DingQ_BE 디렉토리에서):
+    python benchmarks/bench_engines.py --images app/preprocessing/sandstone_aug
+    python benchmarks/bench_engines.py --engines fp32 int8 --limit 200 --json engines.json
+"""
+import argparse
+import ctypes
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import psutil
+from PIL import Image
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from transformers import CLIPVisionModelWithProjection  # noqa: E402
+
+from model.clip_search import CLIPImageSearcher  # noqa: E402
+from model.engines import ENGINE_NAMES, ImageEncoder, OnnxEngine, create_engine  # noqa: E402
+
+
+def load_images(directory, limit):
+    names = sorted(
+        name for name in os.listdir(directory) if name.lower().endswith((".png", ".jpg", ".jpeg"))
+    )[:limit]
+    images = []
+    for name in names:
+        image = Image.open(os.path.join(directory, name))
+        if image.mode == "RGBA":
+            background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, image)
+        images.append(image.convert("RGB"))
+    return images
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / (1024 ** 2)
+
+
+def release_memory():
+    """해제된 텐서 메모리를 OS에 반환 (glibc가 힙에 남겨 두면 RSS가 줄지 않음)"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def build_engine(name, model_name, onnx_path, sample):
+    """
+    엔진 하나를 만들고 그 엔진만의 상주 메모리(MB)를 측정
+
+    비전 타워만 로드해 엔진을 만든 뒤 fp32 원본 참조를 버리고, 한 번 추론해
+    (safetensors mmap 가중치는 접근해야 페이지가 올라옴) RSS를 읽는다.
+    fp32 엔진은 원본을 그대로 쓰므로 비전 타워 크기, int8은 양자화된 복사본,
+    onnx는 ONNX Runtime 세션 크기가 된다.
+    """
+    release_memory()
+    before = rss_mb()
+    source = CLIPVisionModelWithProjection.from_pretrained(model_name)
+    engine = create_engine(name, ImageEncoder(source), onnx_path=onnx_path)
+    del source
+    engine(sample)
+    release_memory()
+    return engine, rss_mb() - before
+
+
+def normalize(features):
+    return features / np.linalg.norm(features, axis=1, keepdims=True)
+
+
+def run_engine(engine, pixel_values, batch_size, warmup=3):
+    for _ in range(warmup):
+        engine(pixel_values[:1])
+
+    # 단건 지연 시간
+    latencies = []
+    for i in range(len(pixel_values)):
+        started = time.perf_counter()
+        engine(pixel_values[i:i + 1])
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # 배치 처리량 + 전체 임베딩
+    started = time.perf_counter()
+    features = np.concatenate(
+        [engine(pixel_values[i:i + batch_size]) for i in range(0, len(pixel_values), batch_size)]
+    )
+    elapsed = time.perf_counter() - started
+    return normalize(features), np.array(latencies), len(pixel_values) / elapsed
+
+
+def topk_overlap(index, baseline, candidate, k):
+    overlaps = []
+    for base_vector, vector in zip(baseline, candidate):
+        base_groups, _ = index.top_groups(base_vector, top_k=k)
+        groups, _ = index.top_groups(vector, top_k=k)
+        overlaps.append(len(set(base_groups.tolist()) & set(groups.tolist())) / len(base_groups))
+    return float(np.mean(overlaps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=os.path.join(APP_DIR, "preprocessing", "sandstone_aug"),
+                        help="벤치마크 이미지 디렉토리 (기본: app/preprocessing/sandstone_aug)")
+    parser.add_argument("--reference", default=os.path.join(APP_DIR, "model", "vectorweight.npz"))
+    parser.add_argument("--model-name", default="openai/clip-vit-base-patch32")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINE_NAMES), choices=ENGINE_NAMES)
+    parser.add_argument("--onnx-path", default=None, help="onnx 그래프 경로 (기본: 모델 디렉토리)")
+    parser.add_argument("--limit", type=int, default=500, help="사용할 최대 이미지 수")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.images):
+        # sandstone_aug가 없으면 원본 sandstone 세트 사용
+        args.images = os.path.join(APP_DIR, "preprocessing", "sandstone")
+    images = load_images(args.images, args.limit)
+    print(f"이미지 {len(images)}장: {args.images}")
+
+    # 검색기는 전처리와 레퍼런스 인덱스에만 사용 (엔진은 아래에서 따로 만듦)
+    searcher = CLIPImageSearcher(args.reference, model_name=args.model_name, engine="fp32")
+    pixel_values = searcher._pixel_values_from_binary(
+        [searcher.preprocess_icon_array(image, size=searcher.input_size) for image in images]
+    )
+    onnx_path = args.onnx_path or os.path.join(
+        APP_DIR, "model", f"{args.model_name.replace('/', '_')}_image.onnx"
+    )
+    if "onnx" in args.engines and not os.path.exists(onnx_path):
+        # 내보내기(torch.onnx.export) 중 메모리가 onnx 엔진 측정에 섞이지 않도록 미리 내보냄
+        OnnxEngine.export(ImageEncoder(searcher.model), onnx_path)
+
+    baseline = None
+    report = []
+    for name in ["fp32"] + [name for name in args.engines if name != "fp32"]:
+        engine, memory_mb = build_engine(name, args.model_name, onnx_path, pixel_values[:1])
+
+        features, latencies, throughput = run_engine(engine, pixel_values, args.batch_size)
+        if baseline is None:
+            baseline = features
+
+        cosine = np.sum(features * baseline, axis=1)
+        row = {
+            "engine": name,
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+            "throughput_img_s": round(throughput, 1),
+            "memory_mb": round(memory_mb, 1),
+            "cosine_mean": round(float(cosine.mean()), 5),
+            "cosine_min": round(float(cosine.min()), 5),
+            "top10_overlap": round(topk_overlap(searcher.index, baseline, features, 10), 4),
+            "top100_overlap": round(topk_overlap(searcher.index, baseline, features, 100), 4),
+        }
+        report.append(row)
+        del engine
+
+    header = list(report[0].keys())
+    print("\n" + " | ".join(header))
+    for row in report:
+        print(" | ".join(str(row[key]) for key in header))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"images": args.images, "count": len(images), "results": report}, f, indent=2)
+        print(f"\n결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+2단계 검색 벤치마크 (centroid shortlist / 저정밀도 1차 점수 + float32 rerank)
+
+전수 검색(ReferenceIndex.top_groups, 기존 search_similarity와 동일 결과) 대비
+2단계 검색의 지연 시간과 recall@k(상위 k개 아이콘 겹침 비율)를 측정한다.
+저정밀도(--precisions)는 1차 점수 행렬 메모리도 함께 출력한다.
+vectorweight.npz 외에, 같은 아이콘당 증강 수/분산을 흉내 낸 합성 카탈로그를
+여러 크기로 만들어 카탈로그가 커질 때의 속도 향상을 함께 본다.
+
+쿼리는 레퍼런스 증강 벡터에 노이즈를 더해 만든다 (CLIP 모델 불필요).
+
+사용법 (DingQ_BE 디렉토리에서):
+    python benchmarks/bench_shortlist.py
+    python benchmarks/bench_shortlist.py --top-k 100 --shortlists 100 200 400 --sizes 2540 25400 --json shortlist.json
+    python benchmarks/bench_shortlist.py --shortlists --precisions float16 int8 --sizes 25400
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+from model.reference_index import ReferenceIndex  # noqa: E402
+
+
+def make_queries(index, num_queries, noise, rng):
+    rows = rng.integers(len(index), size=num_queries)
+    queries = index.matrix[rows] + noise * rng.normal(size=(num_queries, index.dim)) / np.sqrt(index.dim)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_catalog(base, num_groups, rng):
+    """
+    실제 레퍼런스의 그룹 구조를 따라 합성 카탈로그 생성
+
+    그룹 중심은 실제 centroid를 섞은 뒤 노이즈를 더해 만들고, 증강 벡터는
+    실제 데이터의 (증강 벡터 - centroid) 잔차를 재사용한다.
+    """
+    per_group = int(np.median(base.group_sizes))
+    residuals = base.matrix - np.repeat(base.centroids, base.group_sizes, axis=0)
+    mix = rng.dirichlet(np.full(base.num_groups, 0.05), size=num_groups).astype(np.float32)
+    centers = mix @ base.centroids + 0.05 * rng.normal(size=(num_groups, base.dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    picks = rng.integers(len(residuals), size=num_groups * per_group)
+    vectors = np.repeat(centers, per_group, axis=0) + residuals[picks]
+    labels = [
+        f"synthetic{g}" if a == 0 else f"synthetic{g}_aug{a}" for g in range(num_groups) for a in range(per_group)
+    ]
+    return ReferenceIndex(vectors, labels)
+
+
+def measure(index, queries, top_k, shortlist):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        groups, _ = index.top_groups(query, top_k=top_k, shortlist=shortlist)
+        latencies.append(time.perf_counter() - started)
+        results.append(groups)
+    latencies = np.array(latencies) * 1000
+    return results, {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+    }
+
+
+def recall_at_k(results, exact_results, top_k):
+    return float(np.mean([
+        len(set(groups.tolist()) & set(exact.tolist())) / min(top_k, len(exact))
+        for groups, exact in zip(results, exact_results)
+    ]))
+
+
+def run(name, index, queries, top_k, shortlists, precisions=(), rerank_factor=2):
+    exact_results, exact_stats = measure(index, queries, top_k, None)
+    rows = [{"catalog": name, "groups": index.num_groups, "vectors": len(index), "mode": "exhaustive",
+             "recall": 1.0, **exact_stats}]
+    for shortlist in shortlists:
+        results, stats = measure(index, queries, top_k, shortlist)
+        rows.append({
+            "catalog": name,
+            "groups": index.num_groups,
+            "vectors": len(index),
+            "mode": f"shortlist={shortlist}",
+            "recall": round(recall_at_k(results, exact_results, top_k), 4),
+            "speedup": round(exact_stats["p50_ms"] / stats["p50_ms"], 2) if stats["p50_ms"] else None,
+            **stats,
+        })
+    for precision in precisions:
+        index.set_precision(precision, rerank_factor=rerank_factor)
+        results, stats = measure(index, queries, top_k, None)
+        rows.append({
+            "catalog": name,
+            "groups": index.num_groups,
+            "vectors": len(index),
+            "mode": f"{precision}x{rerank_factor}",
+            "recall": round(recall_at_k(results, exact_results, top_k), 4),
+            "speedup": round(exact_stats["p50_ms"] / stats["p50_ms"], 2) if stats["p50_ms"] else None,
+            "matrix_mb": round(index.coarse.nbytes / 1024 ** 2, 1) if index.coarse is not None else None,
+            "float32_mb": round(index.matrix.nbytes / 1024 ** 2, 1),
+            **stats,
+        })
+        index.set_precision("float32")
+    for row in rows:
+        print(
+            f"{row['catalog']:>10} groups={row['groups']:>7} vectors={row['vectors']:>8} {row['mode']:>16} "
+            f"recall@{top_k}={row['recall']:.4f} p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms "
+            f"speedup={row.get('speedup', 1.0)}"
+            + (f" matrix={row['matrix_mb']}MB (float32 {row['float32_mb']}MB)" if row.get("matrix_mb") else "")
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="centroid shortlist 2단계 검색 벤치마크")
+    parser.add_argument("--reference", default=os.path.join(APP_DIR, "model", "vectorweight.npz"))
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--shortlists", type=int, nargs="*", default=[100, 150, 200, 400])
+    parser.add_argument("--precisions", nargs="*", choices=["float16", "int8"], default=[])
+    parser.add_argument("--rerank-factor", type=int, default=2)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[2540, 25400], help="합성 카탈로그 아이콘 수")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=0.5, help="쿼리 노이즈 크기 (벡터 노름 대비)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    base = ReferenceIndex.from_npz(args.reference)
+    options = (args.top_k, args.shortlists, args.precisions, args.rerank_factor)
+    report = run("reference", base, make_queries(base, args.queries, args.noise, rng), *options)
+    for size in args.sizes:
+        index = synthetic_catalog(base, size, rng)
+        queries = make_queries(index, args.queries, args.noise, rng)
+        report += run(f"synth{size}", index, queries, *options)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
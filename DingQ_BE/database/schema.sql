@@ -27,9 +27,20 @@ CREATE TABLE IF NOT EXISTS user_sketches (
     processed_at TIMESTAMP
 );
 
--- Create index for vector similarity search
-CREATE INDEX IF NOT EXISTS idx_svg_icons_vector 
-ON svg_icons USING ivfflat (vector_features vector_cosine_ops);
+-- Background icon generation jobs (JOB_STORE=postgres, created on first use if missing)
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    job JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    heartbeat_at TIMESTAMPTZ DEFAULT now()
+);
+
+-- Vector similarity index (idx_svg_icons_vector) is not created here: ivfflat clusters the rows
+-- present at build time, so it is built after loading vectors:
+--   python -m model.vector_db load model/vectorweight.index --index ivfflat
+--   python -m model.vector_db index --kind hnsw
 
 -- Create index for category search
 CREATE INDEX IF NOT EXISTS idx_svg_icons_category 
@@ -45,6 +56,9 @@ ON user_sketches(created_at);
 CREATE INDEX IF NOT EXISTS idx_user_sketches_search_results 
 ON user_sketches USING gin (search_results);
 
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_updated_at
+ON generation_jobs(updated_at);
+
 -- Create function to update timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
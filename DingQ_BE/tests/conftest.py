@@ -0,0 +1,38 @@
+import os
+import sys
+
+# app/ 모듈은 `from model.xxx import ...` 형태로 import 하므로 app 디렉토리를 경로에 추가
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tiny_clip_dir(tmp_path_factory):
+    """네트워크 없이 CLIPImageSearcher를 만들 수 있는 작은 랜덤 CLIP 비전 모델 디렉토리"""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    torch.manual_seed(0)
+    config = transformers.CLIPVisionConfig(
+        hidden_size=32, intermediate_size=64, num_hidden_layers=1, num_attention_heads=2,
+        image_size=224, patch_size=32, projection_dim=16,
+    )
+    path = tmp_path_factory.mktemp("tiny_clip")
+    transformers.CLIPVisionModelWithProjection(config).save_pretrained(path)
+    transformers.CLIPImageProcessor().save_pretrained(path)
+    return str(path)
+
+
+def write_reference_npz(path, prefix, num_icons=6, augmentations=2, dim=16, seed=0):
+    """'<prefix><i>' / '<prefix><i>_augN' 레이블의 레퍼런스 npz 생성"""
+    rng = np.random.default_rng(seed)
+    labels = [
+        f"{prefix}{i}" if a == 0 else f"{prefix}{i}_aug{a}"
+        for i in range(num_icons) for a in range(augmentations + 1)
+    ]
+    np.savez_compressed(path, vectors=rng.normal(size=(len(labels), dim)).astype(np.float32),
+                        labels=np.array(labels, dtype=object))
+    return str(path)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from model.ann_index import HNSWLIB_AVAILABLE, IVFIndex, ann_path, build_ann, load_ann, load_or_build_ann
+from model.reference_index import ReferenceIndex
+
+
+def make_reference(num_groups=400, per_group=5, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_groups, dim))
+    vectors = np.repeat(centers, per_group, axis=0) + 0.3 * rng.normal(size=(num_groups * per_group, dim))
+    labels = [f"icon{g}" if a == 0 else f"icon{g}_aug{a}" for g in range(num_groups) for a in range(per_group)]
+    return ReferenceIndex(vectors, labels)
+
+
+def make_queries(index, count=20, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = index.matrix[rng.integers(len(index), size=count)] + 0.1 * rng.normal(size=(count, index.dim))
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def group_recall(index, ann, queries, top_k=10, probe=None):
+    exact = [set(index.top_groups(query, top_k=top_k)[0].tolist()) for query in queries]
+    index.attach_ann(ann, probe=probe)
+    try:
+        approx = [index.top_groups(query, top_k=top_k) for query in queries]
+    finally:
+        index.attach_ann(None)
+    for groups, scores in approx:
+        assert len(groups) <= top_k
+        assert np.all(np.diff(scores) <= 0)
+    return np.mean([len(set(groups.tolist()) & truth) / top_k for (groups, _), truth in zip(approx, exact)])
+
+
+class TestIVFIndex:
+    def test_all_lists_probed_is_exact(self):
+        index = make_reference()
+        ann = IVFIndex.build(index.matrix, nlist=16, version=index.version)
+        for query in make_queries(index, count=5):
+            rows, scores = ann.search(query, k=20, probe=ann.nlist)
+            exact = np.argsort(-index.matrix @ query, kind="stable")[:20]
+            np.testing.assert_array_equal(np.sort(rows), np.sort(exact))
+            np.testing.assert_allclose(scores, index.matrix[rows] @ query, atol=1e-6)
+
+    def test_recall_grows_with_nprobe(self):
+        index = make_reference()
+        ann = IVFIndex.build(index.matrix, nlist=64, version=index.version)
+        queries = make_queries(index)
+        low = group_recall(index, ann, queries, probe=1)
+        high = group_recall(index, ann, queries, probe=32)
+        assert high >= low
+        assert high >= 0.9
+
+    def test_save_load_roundtrip(self, tmp_path):
+        index = make_reference()
+        ann = build_ann("ivf", index.matrix, version=index.version, nlist=32)
+        path = str(tmp_path / "ref.ivf.npz")
+        ann.save(path)
+        loaded = load_ann("ivf", path, probe=4)
+        assert loaded.version == index.version
+        assert loaded.nprobe == 4
+        query = make_queries(index, count=1)[0]
+        np.testing.assert_array_equal(loaded.search(query, 10)[0], ann.search(query, 10, probe=4)[0])
+
+
+def test_attach_rejects_other_version():
+    index = make_reference()
+    ann = IVFIndex.build(make_reference(seed=5).matrix, nlist=8, version="other")
+    with pytest.raises(ValueError):
+        index.attach_ann(ann)
+
+
+def test_load_or_build_persists_next_to_npz(tmp_path):
+    index = make_reference(num_groups=50)
+    reference_path = str(tmp_path / "vectors.npz")
+    ann = load_or_build_ann("ivf", index, reference_path)
+    assert ann_path(reference_path, "ivf") == str(tmp_path / "vectors.ivf.npz")
+    assert (tmp_path / "vectors.ivf.npz").exists()
+    assert load_or_build_ann("ivf", index, reference_path).version == index.version
+
+
+@pytest.mark.skipif(not HNSWLIB_AVAILABLE, reason="hnswlib 없음")
+def test_hnsw_recall_and_roundtrip(tmp_path):
+    index = make_reference()
+    ann = build_ann("hnsw", index.matrix, version=index.version)
+    assert group_recall(index, ann, make_queries(index), probe=64) >= 0.95
+
+    path = str(tmp_path / "ref.hnsw.bin")
+    ann.save(path)
+    loaded = load_ann("hnsw", path, probe=64)
+    assert loaded.version == index.version
+    query = make_queries(index, count=1)[0]
+    np.testing.assert_array_equal(loaded.search(query, 10)[0], ann.search(query, 10)[0])
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from model.batching import MicroBatcher
+
+
+class TestMicroBatcher:
+    def test_concurrent_requests_share_a_batch(self):
+        batch_sizes = []
+
+        def batch_fn(items):
+            batch_sizes.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=200)
+        start = threading.Barrier(4)
+        results = {}
+
+        def worker(i):
+            start.wait()
+            results[i] = batcher(i, timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        batcher.close()
+
+        assert results == {0: 0, 1: 2, 2: 4, 3: 6}
+        assert batch_sizes == [4]
+        metrics = batcher.get_metrics()
+        assert metrics["total_items"] == 4
+        assert metrics["batch_size_distribution"] == {"4": 1}
+
+    def test_single_request_flushes_after_window(self):
+        batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait_ms=1)
+        assert batcher("a", timeout=5) == "a"
+        batcher.close()
+
+    def test_errors_fan_out_to_all_waiters(self):
+        def batch_fn(items):
+            raise ValueError("boom")
+
+        batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_ms=1)
+        with pytest.raises(ValueError):
+            batcher(1, timeout=5)
+        assert batcher.get_metrics()["total_errors"] == 1
+        batcher.close()
+
+    def test_submit_after_close(self):
+        batcher = MicroBatcher(lambda items: items)
+        batcher.close()
+        with pytest.raises(RuntimeError):
+            batcher.submit(1)
+
+    def test_close_during_submit_resolves_every_future(self):
+        batcher = MicroBatcher(lambda items: items, max_batch_size=4, max_wait_ms=1)
+        futures = []
+        start = threading.Barrier(5)
+
+        def submitter():
+            start.wait()
+            for i in range(200):
+                try:
+                    futures.append(batcher.submit(i))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submitter) for _ in range(4)]
+        for t in threads:
+            t.start()
+        start.wait()
+        batcher.close()
+        for t in threads:
+            t.join()
+
+        # 종료와 경합한 요청도 결과 또는 RuntimeError로 끝나야 함 (영원히 대기하지 않음)
+        for future in futures:
+            assert future.exception(timeout=1) is None or isinstance(future.exception(), RuntimeError)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from model.engines import ImageEncoder, TorchEngine  # noqa: E402
+
+
+def tiny_clip_config():
+    return transformers.CLIPConfig(
+        text_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1, num_attention_heads=2),
+        vision_config=dict(
+            hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=2,
+            image_size=224, patch_size=32, projection_dim=16,
+        ),
+        projection_dim=16,
+    )
+
+
+def test_vision_only_model_matches_full_model(tmp_path):
+    """비전 전용 로딩이 CLIPModel.get_image_features와 같은 임베딩을 내는지 확인"""
+    torch.manual_seed(0)
+    full = transformers.CLIPModel(tiny_clip_config()).eval()
+    full.save_pretrained(tmp_path)
+
+    vision_only = transformers.CLIPVisionModelWithProjection.from_pretrained(tmp_path).eval()
+    pixel_values = torch.randn(2, 3, 224, 224)
+
+    full_features = TorchEngine(ImageEncoder(full))(pixel_values)
+    vision_features = TorchEngine(ImageEncoder(vision_only))(pixel_values)
+
+    np.testing.assert_allclose(vision_features, full_features, atol=1e-5)
+    full_params = sum(p.numel() for p in full.parameters())
+    vision_params = sum(p.numel() for p in vision_only.parameters())
+    assert vision_params < full_params
@@ -0,0 +1,165 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import write_reference_npz
+from model.delta_index import ChunkedBuffer, DeltaStore, compact, delta_path
+from model.reference_index import ReferenceIndex
+
+
+def unit(rng, rows, dim=16):
+    vectors = rng.normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_store(path, index):
+    return DeltaStore(str(path), index.group_names, index.dim, index.base_version, chunk_rows=4)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ReferenceIndex.from_npz(write_reference_npz(tmp_path / "ref.npz", "a", seed=1))
+
+
+class TestChunkedBuffer:
+    def test_extend_across_chunks_keeps_existing_chunks(self):
+        rng = np.random.default_rng(0)
+        buffer = ChunkedBuffer(dim=3, chunk_rows=4)
+        first, second = rng.normal(size=(3, 3)), rng.normal(size=(7, 3))
+        buffer.extend(first)
+        chunk = buffer.chunks[0]
+        buffer.extend(second)
+
+        assert buffer.chunks[0] is chunk  # 재할당 없음
+        assert buffer.count == 10 and len(buffer.chunks) == 3
+        np.testing.assert_allclose(np.concatenate(buffer.views()), np.concatenate([first, second]), rtol=1e-6)
+        assert sum(len(view) for view in buffer.views(5)) == 5
+
+
+class TestDeltaStore:
+    def test_append_is_visible_to_other_store_after_sync(self, index, tmp_path):
+        rng = np.random.default_rng(0)
+        writer = make_store(tmp_path / "ref.delta", index)
+        reader = make_store(tmp_path / "ref.delta", index)
+
+        writer.append(unit(rng, 3), ["new", "new_aug1", "a0_aug9"])
+        assert len(writer) == 3 and len(reader) == 0
+        assert reader.sync() == 3
+        assert reader.new_group_names == ["new"]
+        # 기존 아이콘 이름은 기존 그룹에 합쳐짐
+        assert reader._group_ids.tolist() == [index.num_groups] * 2 + [0]
+
+        reader.append(unit(rng, 1), ["other"])
+        writer.sync()
+        np.testing.assert_array_equal(writer.vectors(), reader.vectors())
+        assert writer.labels == reader.labels
+
+    def test_uncommitted_rows_are_ignored_and_overwritten(self, index, tmp_path):
+        rng = np.random.default_rng(0)
+        store = make_store(tmp_path / "ref.delta", index)
+        store.append(unit(rng, 2), ["new", "new_aug1"])
+        # 레이블 기록 전에 중단된 추가분 (벡터만 기록, 레이블 줄은 미완성)
+        with open(os.path.join(store.path, "vectors.f32"), "ab") as f:
+            f.write(unit(rng, 1).tobytes())
+        with open(os.path.join(store.path, "labels.jsonl"), "a") as f:
+            f.write('{"label": "tor')
+
+        reopened = make_store(store.path, index)
+        assert len(reopened) == 2
+        with open(os.path.join(store.path, "labels.jsonl"), "w") as f:
+            f.writelines(f'{{"label": "{label}"}}\n' for label in store.labels)
+
+        vectors = unit(rng, 1)
+        reopened.append(vectors, ["late"])
+        np.testing.assert_array_equal(make_store(store.path, index).vectors()[-1], vectors[0])
+
+    def test_delta_for_other_base_version_is_ignored(self, index, tmp_path):
+        store = make_store(tmp_path / "ref.delta", index)
+        store.append(unit(np.random.default_rng(0), 1), ["new"])
+        other = DeltaStore(store.path, index.group_names, index.dim, "other-version")
+        assert len(other) == 0
+        with pytest.raises(RuntimeError):
+            other.append(unit(np.random.default_rng(1), 1), ["x"])
+
+
+class TestIndexWithDelta:
+    def test_top_groups_include_delta_groups(self, index, tmp_path):
+        rng = np.random.default_rng(0)
+        base_version = index.version
+        index.attach_delta(make_store(tmp_path / "ref.delta", index))
+        query = unit(rng, 1)[0]
+        index.delta.append(query[None], ["new"])
+
+        groups, scores = index.top_groups(query, top_k=3)
+        assert index.group_name(groups[0]) == "new"
+        assert scores[0] == pytest.approx(1.0, abs=1e-5)
+        assert np.all(np.diff(scores) <= 0)
+        assert len(set(groups.tolist())) == len(groups)
+        assert index.version == f"{base_version}+1" and index.base_version == base_version
+
+    def test_delta_row_raises_existing_group_score(self, index, tmp_path):
+        index.attach_delta(make_store(tmp_path / "ref.delta", index))
+        query = unit(np.random.default_rng(3), 1)[0]
+        index.delta.append(query[None], ["a2_aug7"])
+
+        groups, scores = index.top_groups(query, top_k=index.num_groups)
+        assert index.group_name(groups[0]) == "a2"
+        assert len(groups) == index.num_groups
+
+
+def test_compact_merges_delta_into_index_directory(index, tmp_path):
+    source = str(tmp_path / "ref.index")
+    index.save(source, dtype="float16")
+    base = ReferenceIndex.load(source)
+    store = DeltaStore(delta_path(source), base.group_names, base.dim, base.base_version)
+    store.append(unit(np.random.default_rng(0), 2), ["new", "new_aug1"])
+
+    header = compact(source)
+
+    merged = ReferenceIndex.load(source)
+    assert header["count"] == len(index) + 2 and len(merged) == len(index) + 2
+    assert merged.num_groups == index.num_groups + 1
+    assert header["dtype"] == "float16" and merged.matrix.dtype == np.float16
+    # 새 인덱스 기준의 빈 delta (헤더는 임시 파일 없이 교체됨)
+    fresh = DeltaStore(delta_path(source), merged.group_names, merged.dim, merged.base_version)
+    assert len(fresh) == 0
+    assert os.listdir(delta_path(source)) == ["header.json"]
+    assert compact(source) is None
+
+
+def test_compact_refuses_npz_reference(index, tmp_path):
+    source = str(tmp_path / "ref.npz")
+    store = DeltaStore(delta_path(source), index.group_names, index.dim, index.base_version)
+    store.append(unit(np.random.default_rng(0), 1), ["new"])
+
+    # 다른 워커는 계속 npz를 서빙하므로 delta를 건드리지 않고 거절
+    with pytest.raises(ValueError):
+        compact(source)
+    assert len(DeltaStore(delta_path(source), index.group_names, index.dim, index.base_version)) == 1
+    assert not os.path.exists(tmp_path / "ref.index")
+
+
+def test_searcher_add_icons_is_searchable_in_all_workers(tiny_clip_dir, tmp_path):
+    from model.clip_search import CLIPImageSearcher
+
+    path = write_reference_npz(tmp_path / "ref.npz", "a", seed=1)
+    searcher = CLIPImageSearcher(path, model_name=tiny_clip_dir)
+    other = CLIPImageSearcher(path, model_name=tiny_clip_dir)
+    searcher.enable_cache()
+    pixels = np.full((64, 64), 255, dtype=np.uint8)
+    pixels[10:50, 20:30] = 0
+    icon = Image.fromarray(pixels)
+    searcher.search(icon, top_k=3)
+
+    result = searcher.add_icons({"new_icon": icon}, augmentations=2, seed=0)
+
+    assert result["vectors"] == 3 and result["version"].endswith("+3")
+    assert searcher.search(icon, top_k=3)["results"][0]["reference_name"] == "new_icon"
+    with pytest.raises(ValueError):
+        searcher.add_icons({"bad_aug1": icon})
+
+    other.refresh_index()
+    assert other.index.version == searcher.index.version
+    assert other.search(icon, top_k=1)["results"][0]["reference_name"] == "new_icon"
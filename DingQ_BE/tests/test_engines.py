@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from model.engines import ImageEncoder, create_engine  # noqa: E402
+
+
+def cosine(a, b):
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+@pytest.fixture
+def encoder(tiny_clip_dir):
+    model = transformers.CLIPVisionModelWithProjection.from_pretrained(tiny_clip_dir)
+    return ImageEncoder(model).eval()
+
+
+@pytest.fixture
+def pixel_values():
+    torch.manual_seed(1)
+    return torch.randn(3, 3, 224, 224)
+
+
+def test_int8_matches_fp32_and_keeps_encoder(encoder, pixel_values):
+    fp32 = create_engine("fp32", encoder)(pixel_values)
+    int8 = create_engine("int8", encoder)
+
+    assert cosine(int8(pixel_values), fp32).min() > 0.99
+    # 양자화는 복사본에 적용 (원본 인코더의 Linear는 fp32 그대로)
+    assert any(type(module) is torch.nn.Linear for module in encoder.modules())
+    np.testing.assert_allclose(create_engine("fp32", encoder)(pixel_values), fp32, atol=1e-6)
+
+
+def test_onnx_matches_fp32(encoder, pixel_values, tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    fp32 = create_engine("fp32", encoder)(pixel_values)
+    onnx = create_engine("onnx", encoder, onnx_path=str(tmp_path / "image.onnx"), num_threads=1)
+
+    np.testing.assert_allclose(onnx(pixel_values), fp32, atol=1e-4)
+    np.testing.assert_allclose(onnx(pixel_values[:1].numpy()), fp32[:1], atol=1e-4)
+    assert onnx.session.get_session_options().intra_op_num_threads == 1
+
+
+def test_unknown_engine(encoder):
+    with pytest.raises(ValueError):
+        create_engine("tensorrt", encoder)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import BoundedExecutor, ExecutorSaturated
+
+
+class TestBoundedExecutor:
+    def test_runs_off_the_event_loop(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+
+        async def main():
+            loop_thread = threading.get_ident()
+            worker_thread = await executor.run(threading.get_ident)
+            return loop_thread, worker_thread
+
+        loop_thread, worker_thread = asyncio.run(main())
+        assert loop_thread != worker_thread
+        assert executor.get_metrics()["completed"] == 1
+
+    def test_rejects_when_slots_and_queue_are_full(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1, retry_after=7)
+        release = threading.Event()
+
+        async def main():
+            running = asyncio.ensure_future(executor.run(release.wait, 5))
+            queued = asyncio.ensure_future(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            with pytest.raises(ExecutorSaturated) as info:
+                await executor.run(release.wait, 5)
+            assert info.value.retry_after == 7
+
+            # 포화 상태에서도 이벤트 루프는 다른 작업을 처리할 수 있어야 함
+            await asyncio.sleep(0)
+            release.set()
+            await asyncio.gather(running, queued)
+
+        asyncio.run(main())
+        metrics = executor.get_metrics()
+        assert metrics["rejected"] == 1
+        assert metrics["completed"] == 2
+        assert metrics["running"] == 0 and metrics["queued"] == 0
+
+    def test_exceptions_propagate(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run(fail))
+        assert executor.get_metrics()["failed"] == 1
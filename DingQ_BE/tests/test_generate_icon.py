@@ -0,0 +1,167 @@
+import asyncio
+import io
+import time
+
+import pytest
+from PIL import Image
+
+pytest.importorskip("google.genai")
+from google.genai import types
+
+from model.generate_icon import IconGenerator
+
+
+def png_bytes(color=0):
+    buffer = io.BytesIO()
+    Image.new("L", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def image_response(data):
+    part = types.Part.from_bytes(data=data, mime_type="image/png") if data else types.Part(text="이미지를 만들 수 없습니다")
+    return types.GenerateContentResponse(candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))])
+
+
+class FakeModels:
+    """client.aio.models 대역 (네트워크 없이 지연/실패를 재현)"""
+
+    def __init__(self, delay=0.1, failures=0, delays=None, fail=()):
+        self.delay = delay
+        self.failures = failures
+        self.delays = delays or {}  # 호출 번호 -> 지연 시간
+        self.fail = set(fail)  # 실패할 호출 번호
+        self.calls = 0
+        self.max_in_flight = 0
+        self.in_flight = 0
+
+    async def generate_content(self, model, contents, config):
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(call, self.delay))
+        finally:
+            self.in_flight -= 1
+        if call <= self.failures or call in self.fail:
+            return image_response(None)
+        return image_response(png_bytes(call))
+
+
+class FakeClient:
+    def __init__(self, models):
+        self.aio = type("Aio", (), {"models": models})()
+
+
+@pytest.fixture
+def style_path(tmp_path):
+    path = tmp_path / "style.png"
+    path.write_bytes(png_bytes(255))
+    return str(path)
+
+
+def test_requests_run_concurrently_on_one_client(style_path):
+    models = FakeModels(delay=0.2)
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    async def main():
+        started = time.perf_counter()
+        # 이벤트 루프가 막히지 않으면 생성 중에도 다른 작업이 실행됨
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        images = await asyncio.gather(*(generator.generate("집", png_bytes(), target_count=5) for _ in range(3)))
+        ticking.cancel()
+        return images, time.perf_counter() - started, ticks
+
+    images, elapsed, ticks = asyncio.run(main())
+    assert [len(batch) for batch in images] == [5, 5, 5]
+    assert Image.open(images[0][0]).size == (8, 8)
+    assert models.max_in_flight == 15
+    assert elapsed < 1.0  # 순차 실행이면 15 x 0.2초
+    assert ticks >= 10
+    assert generator.get_metrics()["calls"] == 15
+
+
+def test_failed_slots_are_retried(style_path):
+    models = FakeModels(delay=0, failures=2)
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    images = asyncio.run(generator.generate("집", Image.new("RGB", (4, 4)), target_count=3, max_retries=2, backoff=0.01))
+
+    assert len(images) == 3
+    assert models.calls == 5
+    assert generator.get_metrics()["failures"] == 2
+
+
+def test_gives_up_after_max_retries(style_path):
+    models = FakeModels(delay=0, failures=100)
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    assert asyncio.run(generator.generate("집", png_bytes(), target_count=2, max_retries=3, backoff=0.01)) == []
+    assert models.calls == 6
+
+
+def first_arrivals(generator, **options):
+    """stream()이 이미지를 내보낸 시각들 (시작 기준, 초)"""
+    async def main():
+        started = time.perf_counter()
+        return [time.perf_counter() - started async for _ in generator.stream("집", png_bytes(), **options)]
+
+    return asyncio.run(main())
+
+
+def test_failed_slot_retries_without_waiting_for_slow_slot(style_path):
+    # 1번 호출은 바로 실패, 2번 호출은 느림 -> 1번 슬롯 재시도(3번 호출)가 먼저 끝나야 함
+    models = FakeModels(delay=0.01, delays={2: 0.5}, fail={1})
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    arrivals = first_arrivals(generator, target_count=2, backoff=0.01)
+
+    assert len(arrivals) == 2
+    assert arrivals[0] < 0.3 <= arrivals[1]
+    assert generator.get_metrics()["retries"] == 1
+
+
+def test_deadline_cancels_outstanding_calls(style_path):
+    models = FakeModels(delay=5)
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    started = time.perf_counter()
+    assert first_arrivals(generator, target_count=3, deadline=0.2) == []
+    assert time.perf_counter() - started < 1.0
+    assert models.in_flight == 0
+    metrics = generator.get_metrics()
+    assert metrics["deadline_exceeded"] == 1 and metrics["cancelled"] == 3
+
+
+def test_hedged_request_replaces_slow_slot(style_path):
+    models = FakeModels(delay=0.01, delays={2: 5})
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    arrivals = first_arrivals(generator, target_count=2, hedges=1)
+
+    assert len(arrivals) == 2 and arrivals[1] < 1.0
+    assert models.calls == 3 and models.in_flight == 0
+    metrics = generator.get_metrics()
+    assert metrics["hedges"] == 1 and metrics["cancelled"] == 1
+
+
+def test_stopping_iteration_cancels_remaining_slots(style_path):
+    models = FakeModels(delay=0.01, delays={2: 5, 3: 5})
+    generator = IconGenerator(client=FakeClient(models), style_image_path=style_path)
+
+    async def main():
+        stream = generator.stream("집", png_bytes(), target_count=3)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(main()) is not None
+    assert models.in_flight == 0 and generator.get_metrics()["cancelled"] == 2
@@ -0,0 +1,99 @@
+import asyncio
+import base64
+import io
+import json
+
+import pytest
+
+pytest.importorskip("google.genai")
+pytest.importorskip("fastapi")
+
+import main  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from test_generate_icon import png_bytes  # noqa: E402
+
+
+@pytest.fixture
+def fake_generation(monkeypatch):
+    """icon_generator.stream / upload_to_gcs 대역 (생성 즉시 반환, 업로드는 파일명 기반 URL)"""
+    state = {"uploads": [], "cancelled": False, "block_after": None}
+
+    async def stream(input_text, input_image, temperature=0.5, target_count=5, **options):
+        try:
+            for i in range(target_count):
+                if state["block_after"] is not None and i >= state["block_after"]:
+                    await asyncio.Event().wait()
+                await asyncio.sleep(0.01)
+                yield io.BytesIO(png_bytes(i))
+        except (asyncio.CancelledError, GeneratorExit):
+            state["cancelled"] = True
+            raise
+
+    def upload_to_gcs(data, filename, content_type):
+        state["uploads"].append(filename)
+        return f"https://storage.googleapis.com/test/{filename}"
+
+    monkeypatch.setattr(main.icon_generator, "stream", stream)
+    monkeypatch.setattr(main, "upload_to_gcs", upload_to_gcs)
+    return state
+
+
+def collect(agen):
+    async def run():
+        return [event async for event in agen]
+
+    return asyncio.run(run())
+
+
+def test_events_are_ordered_icon_upload_done(fake_generation):
+    events = collect(main._generation_events("집", b"png", 0.5, 3))
+
+    kinds = [event["event"] for event in events]
+    assert kinds.count("icon") == 3 and kinds.count("upload") == 3 and kinds[-1] == "done"
+    # 각 이미지의 upload는 해당 icon 뒤에 옴
+    for i in (1, 2, 3):
+        icon = next(n for n, e in enumerate(events) if e["event"] == "icon" and e["id"] == i)
+        upload = next(n for n, e in enumerate(events) if e["event"] == "upload" and e["id"] == i)
+        assert icon < upload
+        assert events[upload]["filename"] == events[icon]["filename"] and events[upload]["gcs_uploaded"]
+    assert base64.b64decode(events[0]["image_base64"]).startswith(b"\x89PNG")
+    done = events[-1]
+    assert done["success"] and done["generated_count"] == 3 and done["gcs_uploaded_count"] == 3
+    assert done["time_to_first_icon"] is not None
+    assert sorted(fake_generation["uploads"]) == sorted(e["filename"] for e in events if e["event"] == "icon")
+
+
+def test_stream_endpoint_ndjson_and_sse(fake_generation):
+    client = TestClient(main.app)
+    form = {"description": "집", "target_count": "2"}
+    files = {"image": ("sketch.png", png_bytes(), "image/png")}
+
+    response = client.post("/generate/stream", data=form, files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [e["event"] for e in events][0] == "icon" and events[-1]["event"] == "done"
+    assert events[-1]["generated_count"] == 2
+
+    response = client.post("/generate/stream", data=form, files=files, headers={"Accept": "text/event-stream"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert frames[0].startswith("event: icon\ndata: ")
+    assert frames[-1].startswith("event: done\ndata: ")
+    assert json.loads(frames[-1].split("data: ", 1)[1])["generated_count"] == 2
+
+
+def test_closing_stream_cancels_producer(fake_generation):
+    fake_generation["block_after"] = 1
+
+    async def run():
+        events = main._generation_events("집", b"png", 0.5, 5)
+        first = await events.__anext__()
+        # 클라이언트 연결 종료 = 이벤트 제너레이터 종료
+        await events.aclose()
+        await asyncio.sleep(0.01)
+        # asyncio.run 종료 시의 일괄 취소가 아니라 aclose() 시점에 취소되어야 함
+        return first, fake_generation["cancelled"]
+
+    first, cancelled = asyncio.run(run())
+    assert first["event"] == "icon" and cancelled
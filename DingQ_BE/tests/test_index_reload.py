@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from conftest import write_reference_npz
+from model.index_watch import IndexWatcher, source_signature
+from model.reference_index import ReferenceIndex
+
+
+def sketch(seed):
+    rng = np.random.default_rng(seed)
+    pixels = np.full((64, 64), 255, dtype=np.uint8)
+    x, y = rng.integers(8, 40, size=2)
+    pixels[y:y + 16, x:x + 20] = 0
+    return Image.fromarray(pixels)
+
+
+@pytest.fixture
+def searcher(tiny_clip_dir, tmp_path):
+    from model.clip_search import CLIPImageSearcher
+
+    path = write_reference_npz(tmp_path / "a.npz", "a", seed=1)
+    return CLIPImageSearcher(path, model_name=tiny_clip_dir)
+
+
+def test_reload_swaps_index_without_reloading_model(searcher, tmp_path):
+    model = searcher.model
+    before = searcher.index_info()
+    new_path = str(tmp_path / "b.index")
+    ReferenceIndex.from_npz(write_reference_npz(tmp_path / "b.npz", "b", seed=2)).save(new_path)
+
+    result = searcher.reload_index(new_path)
+
+    assert searcher.model is model
+    assert result["previous_version"] == before["version"]
+    assert result["version"] == searcher.index.version != before["version"]
+    assert result["generation"] == before["generation"] + 1
+    assert result["format"] == "directory"
+    assert all(r["reference_name"].startswith("b") for r in searcher.search(sketch(0), top_k=5)["results"])
+
+
+def test_failed_reload_keeps_current_index(searcher, tmp_path):
+    version = searcher.index.version
+    with pytest.raises(FileNotFoundError):
+        searcher.reload_index(str(tmp_path / "missing.index"))
+    assert searcher.index.version == version
+    assert searcher.search(sketch(0), top_k=3)["total_results"] == 3
+
+
+def test_queries_never_mix_index_versions(searcher, tmp_path):
+    paths = [searcher.reference_data_path, write_reference_npz(tmp_path / "b.npz", "b", seed=2)]
+    searcher.enable_cache(max_size=0)
+    errors, prefixes = [], set()
+    stop = threading.Event()
+
+    def run_queries(seed):
+        while not stop.is_set():
+            try:
+                names = [r["reference_name"] for r in searcher.search(sketch(seed), top_k=6)["results"]]
+                prefixes.add(names[0][0])
+                if len({name[0] for name in names}) != 1:
+                    errors.append(names)
+            except Exception as e:  # pragma: no cover - 실패 시 내용 확인용
+                errors.append(e)
+
+    threads = [threading.Thread(target=run_queries, args=(seed,)) for seed in range(3)]
+    for thread in threads:
+        thread.start()
+    for i in range(10):
+        searcher.reload_index(paths[(i + 1) % 2])
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert prefixes <= {"a", "b"}
+
+
+class TestIndexWatcher:
+    def test_reloads_after_change_is_stable(self, tmp_path):
+        path = tmp_path / "ref.npz"
+        path.write_bytes(b"v1")
+        calls = []
+        watcher = IndexWatcher(lambda: source_signature(str(path)), lambda: calls.append(1), interval=60)
+
+        assert watcher.check() is False
+        path.write_bytes(b"version2")
+        assert watcher.check() is False  # 첫 감지는 쓰기 완료 대기
+        assert watcher.check() is True
+        assert calls == [1]
+        assert watcher.check() is False
+        assert watcher.get_metrics()["reloads"] == 1
+
+    def test_reload_failure_is_counted(self, tmp_path):
+        path = tmp_path / "ref.npz"
+        path.write_bytes(b"v1")
+
+        def fail():
+            raise ValueError("broken")
+
+        watcher = IndexWatcher(lambda: source_signature(str(path)), fail, interval=60)
+        path.write_bytes(b"broken file")
+        watcher.check()
+        watcher.check()
+        assert watcher.get_metrics()["failures"] == 1
+
+    def test_directory_replacement_is_detected(self, tmp_path):
+        path = str(tmp_path / "ref.index")
+        ReferenceIndex(np.eye(4), ["a", "b", "c", "d"]).save(path)
+        watcher = IndexWatcher(lambda: source_signature(path), lambda: None, interval=60)
+        ReferenceIndex(np.eye(4)[::-1], ["a", "b", "c", "d"]).save(path)
+        watcher.check()
+        assert watcher.check() is True
@@ -0,0 +1,218 @@
+import asyncio
+import os
+
+import pytest
+
+from executor import ExecutorSaturated
+from jobs import GenerationJobs, InMemoryJobStore, create_job_store
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+async def fake_generation(job, image_data, delay=0.02):
+    """생성 이벤트 스트림 대역 (icon -> upload ... -> done)"""
+    for i in range(1, job["target_count"] + 1):
+        await asyncio.sleep(delay)
+        yield {"event": "icon", "id": i, "image_base64": image_data, "format": "PNG", "filename": f"{i}.png", "elapsed": 0}
+        yield {"event": "upload", "id": i, "filename": f"{i}.png", "gcs_url": f"gs://b/{i}.png", "gcs_uploaded": True}
+    yield {"event": "done", "generated_count": job["target_count"], "time_to_first_icon": delay, "session_id": "s"}
+
+
+async def submit_and_watch(jobs, target_count=2):
+    job = await jobs.submit({"description": "집", "temperature": 0.5, "target_count": target_count}, "aGk=")
+    assert job["status"] == "queued"
+    return [snapshot async for snapshot in jobs.watch(job["id"], interval=0.05)]
+
+
+class TestGenerationJobs:
+    def test_job_progress_is_recorded_until_done(self):
+        async def main():
+            jobs = GenerationJobs(InMemoryJobStore(), fake_generation, workers=1)
+            jobs.start()
+            try:
+                return await submit_and_watch(jobs), jobs.get_metrics()
+            finally:
+                await jobs.stop()
+
+        snapshots, metrics = asyncio.run(main())
+        assert snapshots[-1]["status"] == "succeeded"
+        assert [r["gcs_url"] for r in snapshots[-1]["results"]] == ["gs://b/1.png", "gs://b/2.png"]
+        assert "elapsed" not in snapshots[-1]["results"][0]
+        # 이미지 본문은 작업 문서에 저장하지 않음 (GCS URL만)
+        assert all("image_base64" not in s for snapshot in snapshots for s in snapshot["results"])
+        assert snapshots[-1]["time_to_first_icon"] == 0.02
+        # 중간 진행 상태(결과 일부)도 관찰 가능해야 함
+        assert any(s["status"] == "running" and 0 < s["generated_count"] < 2 for s in snapshots)
+        assert metrics["succeeded"] == 1 and metrics["running"] == 0
+
+    def test_rejects_when_queue_is_full(self):
+        async def main():
+            release = asyncio.Event()
+
+            async def blocked(job, image_data):
+                await release.wait()
+                yield {"event": "done", "generated_count": 0}
+
+            jobs = GenerationJobs(InMemoryJobStore(), blocked, workers=1, max_queue=1, retry_after=3)
+            jobs.start()
+            params = {"description": "집", "temperature": 0.5, "target_count": 1}
+            running = await jobs.submit(params, b"")
+            await asyncio.sleep(0.01)
+            await jobs.submit(params, b"")
+            with pytest.raises(ExecutorSaturated) as info:
+                await jobs.submit(params, b"")
+            assert info.value.retry_after == 3
+            release.set()
+            await asyncio.sleep(0.05)
+            job = await jobs.get(running["id"])
+            await jobs.stop()
+            return job, jobs.get_metrics()
+
+        job, metrics = asyncio.run(main())
+        # 생성된 이미지가 없으면 실패로 기록
+        assert job["status"] == "failed" and job["error"]
+        assert metrics["rejected"] == 1
+
+    def test_failed_generation_is_recorded(self):
+        async def broken(job, image_data):
+            yield {"event": "icon", "id": 1, "image_base64": "", "format": "PNG", "filename": "1.png"}
+            raise RuntimeError("quota exceeded")
+
+        async def main():
+            jobs = GenerationJobs(InMemoryJobStore(), broken, workers=1)
+            jobs.start()
+            try:
+                return await submit_and_watch(jobs)
+            finally:
+                await jobs.stop()
+
+        job = asyncio.run(main())[-1]
+        assert job["status"] == "failed" and job["error"] == "quota exceeded"
+        assert job["generated_count"] == 1
+
+    def test_failed_upload_keeps_image(self):
+        async def partly_uploaded(job, image_data):
+            # 1번은 업로드 성공, 2번은 업로드 실패 (GCS 미설정/오류 시 gcs_url 없음)
+            for i, gcs_url in ((1, "gs://b/1.png"), (2, None)):
+                yield {"event": "icon", "id": i, "image_base64": f"img{i}", "format": "PNG", "filename": f"{i}.png"}
+                yield {"event": "upload", "id": i, "filename": f"{i}.png", "gcs_url": gcs_url, "gcs_uploaded": bool(gcs_url)}
+            yield {"event": "done", "generated_count": 2, "gcs_uploaded_count": 1}
+
+        async def main():
+            jobs = GenerationJobs(InMemoryJobStore(), partly_uploaded, workers=1)
+            jobs.start()
+            try:
+                return await submit_and_watch(jobs)
+            finally:
+                await jobs.stop()
+
+        snapshots = asyncio.run(main())
+        uploaded, failed = snapshots[-1]["results"]
+        assert snapshots[-1]["status"] == "succeeded"
+        assert uploaded["gcs_url"] == "gs://b/1.png" and "image_base64" not in uploaded
+        # 업로드에 실패한 결과만 이미지 본문을 남겨 클라이언트가 받을 수 있게 함
+        assert failed["gcs_url"] is None and failed["image_base64"] == "img2"
+
+    def test_stop_fails_queued_jobs(self):
+        async def main():
+            release = asyncio.Event()
+
+            async def blocked(job, image_data):
+                await release.wait()
+                yield {"event": "done", "generated_count": 0}
+
+            jobs = GenerationJobs(InMemoryJobStore(), blocked, workers=1)
+            jobs.start()
+            params = {"description": "집", "temperature": 0.5, "target_count": 1}
+            await jobs.submit(params, b"")
+            queued = await jobs.submit(params, b"")
+            await asyncio.sleep(0.01)
+            await jobs.stop()
+            return await jobs.get(queued["id"])
+
+        job = asyncio.run(main())
+        assert job["status"] == "failed" and job["error"] and job["finished_at"]
+
+    def test_jobs_of_dead_worker_are_marked_failed(self):
+        store = InMemoryJobStore()
+
+        async def main():
+            release = asyncio.Event()
+
+            async def blocked(job, image_data):
+                await release.wait()
+                yield {"event": "done", "generated_count": 0}
+
+            # 죽은 워커: 작업을 저장한 뒤 heartbeat를 남기지 않음
+            dead = GenerationJobs(store, blocked, workers=1, heartbeat_interval=3600)
+            dead.start()
+            job = await dead.submit({"description": "집", "temperature": 0.5, "target_count": 1}, b"")
+            await asyncio.sleep(0.01)
+            for task in dead._tasks:
+                task.cancel()
+
+            alive = GenerationJobs(store, blocked, workers=1, heartbeat_interval=0.02, stale_after=0.05)
+            alive.start()
+            running = await alive.submit({"description": "집", "temperature": 0.5, "target_count": 1}, b"")
+            await asyncio.sleep(0.2)
+            stale, healthy = await store.get(job["id"]), await store.get(running["id"])
+            release.set()
+            await alive.stop()
+            return stale, healthy
+
+        stale, healthy = asyncio.run(main())
+        assert stale["status"] == "failed" and stale["error"] and stale["finished_at"]
+        # heartbeat를 남기는 워커의 작업은 오래 걸려도 유지
+        assert healthy["status"] == "running"
+
+    def test_unknown_store(self):
+        with pytest.raises(ValueError):
+            create_job_store("redis")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL이 설정되지 않았습니다")
+def test_postgres_store_is_shared_between_workers():
+    pytest.importorskip("psycopg_pool")
+
+    async def main():
+        runner = GenerationJobs(create_job_store("postgres", dsn=TEST_DATABASE_URL), fake_generation, workers=1)
+        # 작업을 실행하지 않는 다른 워커도 같은 저장소로 상태를 조회/구독
+        reader = GenerationJobs(create_job_store("postgres", dsn=TEST_DATABASE_URL), fake_generation)
+        runner.start()
+        reader.start()
+        try:
+            job = await runner.submit({"description": "집", "temperature": 0.5, "target_count": 2}, "aGk=")
+            snapshots = [s async for s in reader.watch(job["id"], interval=0.01)]
+            await runner.store.purge(0, 3600)
+            return snapshots, await reader.get(job["id"])
+        finally:
+            await runner.stop()
+            await reader.stop()
+
+    snapshots, purged = asyncio.run(main())
+    assert snapshots[-1]["status"] == "succeeded" and snapshots[-1]["generated_count"] == 2
+    assert snapshots[-1]["worker"]
+    assert "image_base64" not in snapshots[-1]["results"][0]
+    assert purged is None
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL이 설정되지 않았습니다")
+def test_postgres_store_fails_jobs_without_heartbeat():
+    pytest.importorskip("psycopg_pool")
+
+    async def main():
+        store = create_job_store("postgres", dsn=TEST_DATABASE_URL)
+        try:
+            await store.save({"id": "stale-job", "status": "running", "updated_at": 0, "results": []})
+            await store.purge(3600, 3600)
+            kept = await store.get("stale-job")
+            await asyncio.sleep(0.05)
+            await store.purge(3600, 0.01)
+            return kept, await store.get("stale-job")
+        finally:
+            await store.purge(0, 3600)
+            await store.close()
+
+    kept, failed = asyncio.run(main())
+    assert kept["status"] == "running"
+    assert failed["status"] == "failed" and failed["error"] and failed["updated_at"] > 0
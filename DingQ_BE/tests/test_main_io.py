@@ -0,0 +1,110 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("google.genai")
+pytest.importorskip("fastapi")
+
+import main  # noqa: E402
+from executor import BoundedExecutor  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from model.query_cache import QueryCache  # noqa: E402
+
+
+class FakeBlob:
+    def __init__(self, exists):
+        self._exists = exists
+        self.content_type = "image/png"
+        self.on_event_loop = []
+
+    def _record(self):
+        try:
+            asyncio.get_running_loop()
+            self.on_event_loop.append(True)
+        except RuntimeError:
+            self.on_event_loop.append(False)
+
+    def exists(self):
+        self._record()
+        return self._exists
+
+    def download_as_bytes(self):
+        self._record()
+        return b"\x89PNG data"
+
+
+class FakeGCSClient:
+    def __init__(self, blob):
+        self._blob = blob
+
+    def bucket(self, name):
+        return self
+
+    def blob(self, filename):
+        return self._blob
+
+
+@pytest.mark.parametrize("exists, status", [(True, 200), (False, 404)])
+def test_proxy_image_downloads_off_the_event_loop(monkeypatch, exists, status):
+    blob = FakeBlob(exists)
+    monkeypatch.setattr(main, "get_gcs_client", lambda: FakeGCSClient(blob))
+
+    response = TestClient(main.app).get("/proxy/image/generated/a.png")
+
+    assert response.status_code == status
+    if exists:
+        assert response.content == b"\x89PNG data"
+        assert response.headers["access-control-allow-origin"] == "*"
+    # GCS 호출은 모두 스레드풀에서 (이벤트 루프 스레드가 아님)
+    assert blob.on_event_loop and not any(blob.on_event_loop)
+
+
+def test_shutdown_stops_executors(monkeypatch):
+    search = BoundedExecutor("search-test", max_workers=1, max_queue=0)
+    generate = BoundedExecutor("generate-test", max_workers=1, max_queue=0)
+    monkeypatch.setattr(main, "search_executor", search)
+    monkeypatch.setattr(main, "generate_executor", generate)
+
+    async def aclose():
+        pass
+
+    monkeypatch.setattr(main.icon_generator, "aclose", aclose)
+
+    async def lifecycle():
+        main.generation_jobs.start()
+        await main.shutdown_event()
+
+    asyncio.run(lifecycle())
+    for executor in (search, generate):
+        with pytest.raises(RuntimeError):
+            executor._pool.submit(int)
+
+
+SKETCH = np.zeros((8, 8), dtype=np.uint8)
+
+
+class FakeSearcher:
+    reference_data_path = "model/vectorweight.index"
+
+    def __init__(self):
+        self.query_cache = QueryCache(max_size=8)
+        self.query_cache.put(SKETCH, "v1", None, [{"reference_name": "a"}], 1)
+
+    def reload_index(self, path=None):
+        return {"previous_version": "v1", "version": "v1"}
+
+
+@pytest.mark.parametrize("endpoint", ["/admin/reload-index", "/admin/compact-index"])
+def test_admin_reload_clears_query_cache(monkeypatch, endpoint):
+    searcher = FakeSearcher()
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "token")
+    monkeypatch.setattr(main, "clip_searcher", searcher)
+    monkeypatch.setattr(main, "compact_reference_index", lambda source: {"content_hash": "v1"})
+
+    response = TestClient(main.app).post(endpoint, headers={"X-Admin-Token": "token"})
+
+    assert response.status_code == 200
+    # 재로드 후 버전이 같아도 캐시된 결과를 쓰지 않음
+    assert searcher.query_cache.get(SKETCH, "v1") is None
+    assert searcher.query_cache.get_metrics()["invalidations"] == 1
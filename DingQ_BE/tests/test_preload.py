@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import gc
+import io
+import os
+import traceback
+
+import numpy as np
+import pytest
+
+from conftest import write_reference_npz
+from model.ann_index import build_ann
+from test_reference_index import TestPartitions, make_clustered_index
+
+
+def in_child(fn):
+    """fork된 자식 프로세스에서 fn() 실행 후 결과(np.ndarray)를 부모로 전달"""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        code = 0
+        try:
+            buffer = io.BytesIO()
+            np.save(buffer, np.asarray(fn(), dtype=np.float32))
+            with os.fdopen(write_fd, "wb") as f:
+                f.write(buffer.getvalue())
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        os._exit(code)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        data = f.read()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    return np.load(io.BytesIO(data))
+
+
+class TestShareMemory:
+    def test_all_search_arrays_are_shared(self, tmp_path):
+        pytest.importorskip("torch")
+        _, index = make_clustered_index(num_groups=60, per_group=4)
+        index.attach_metadata(TestPartitions.make_metadata(index))
+        index.attach_ann(build_ann("ivf", index.matrix, version=index.base_version, nlist=8))
+        index.set_precision("int8")
+        query = index.matrix[5]
+        partition = index.partitions.select("c1")
+        expected = index.top_groups(query, top_k=10), index.top_groups(query, top_k=10, partition=partition)
+
+        index.share_memory(str(tmp_path))
+
+        shared = [
+            index.matrix, index.centroids, index.coarse.weight, index.coarse.scales,
+            index.ann.list_vectors, index.ann.row_ids, partition.matrix, partition.rows,
+        ]
+        assert all(isinstance(array, np.memmap) for array in shared)
+        # 매핑 후 파일은 바로 unlink
+        assert os.listdir(tmp_path) == []
+        for (groups, scores), (shared_groups, shared_scores) in zip(
+            expected, (index.top_groups(query, top_k=10), index.top_groups(query, top_k=10, partition=partition))
+        ):
+            assert shared_groups.tolist() == groups.tolist()
+            np.testing.assert_allclose(shared_scores, scores, rtol=1e-6)
+
+    def test_forked_worker_reads_shared_matrix(self, tmp_path):
+        _, index = make_clustered_index(num_groups=20, per_group=3)
+        expected = index.score(index.matrix[3]).copy()
+        index.share_memory(str(tmp_path))
+        np.testing.assert_allclose(in_child(lambda: index.score(index.matrix[3])), expected, rtol=1e-6)
+
+
+class TestOnnxPreload:
+    @pytest.fixture
+    def searcher_factory(self, tiny_clip_dir, tmp_path):
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+        from model.clip_search import CLIPImageSearcher
+
+        path = write_reference_npz(tmp_path / "ref.npz", "a", seed=1)
+        return functools.partial(
+            CLIPImageSearcher, path, model_name=tiny_clip_dir, engine="onnx",
+            onnx_path=str(tmp_path / "image.onnx"),
+        )
+
+    def test_lazy_engine_exports_without_session(self, searcher_factory, tmp_path):
+        searcher = searcher_factory(lazy_engine=True)
+        # 마스터(fork 전)에서는 그래프만 내보내고 세션/스레드 풀은 만들지 않음
+        assert searcher.engine.session is None
+        assert os.path.exists(tmp_path / "image.onnx")
+
+        pixels = np.full(searcher.input_size, 255, dtype=np.uint8)
+        pixels[40:180, 60:160] = 0
+        child_embedding = in_child(lambda: searcher.engine(searcher.fused_preprocessor(pixels)))
+        assert searcher.engine.session is None  # 자식에서 만든 세션은 부모에 영향 없음
+
+        expected = searcher_factory(engine="fp32").engine(searcher.fused_preprocessor(pixels))
+        np.testing.assert_allclose(child_embedding, expected, atol=1e-4)
+
+    def test_preload_then_worker_startup(self, searcher_factory, monkeypatch):
+        pytest.importorskip("google.genai")
+        import main
+
+        monkeypatch.setattr(main, "CLIPImageSearcher", lambda *args, **kwargs: searcher_factory(
+            lazy_engine=kwargs["lazy_engine"], num_threads=kwargs["num_threads"]
+        ))
+        monkeypatch.setattr(main, "clip_searcher", None)
+        monkeypatch.setattr(main, "initialize_secrets", lambda: None)
+        monkeypatch.setattr(main, "create_tables", lambda: None)
+        monkeypatch.setattr(main, "SEARCH_BATCH_MAX_SIZE", 1)
+        monkeypatch.setattr(main, "SEARCH_CACHE_SIZE", 0)
+        monkeypatch.setattr(main, "INDEX_WATCH_INTERVAL", 0)
+        monkeypatch.setenv("VECTOR_WEIGHT_PATH", searcher_factory.args[0])
+        monkeypatch.setenv("TORCH_NUM_THREADS", "1")
+
+        try:
+            main.preload_models()
+        finally:
+            gc.unfreeze()
+        preloaded = main.clip_searcher
+        assert preloaded.engine.session is None
+        assert isinstance(preloaded.index.matrix, np.memmap)
+
+        async def worker_startup():
+            await main.startup_event()
+            await main.generation_jobs.stop()
+
+        asyncio.run(worker_startup())
+        # 워커 시작 시 사전 로드된 검색기를 그대로 쓰고 onnx 세션만 워커에서 생성
+        assert main.clip_searcher is preloaded
+        assert preloaded.engine.session is not None
+        assert preloaded.engine.session.get_session_options().intra_op_num_threads == 1
@@ -0,0 +1,71 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from model.preprocess import FusedPreprocessor, augment_icon, binarize_icon
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from model.engines import ImageEncoder, TorchEngine  # noqa: E402
+
+SANDSTONE_DIR = os.path.join(os.path.dirname(__file__), "..", "app", "preprocessing", "sandstone")
+
+
+def load_sketches(limit=8):
+    paths = sorted(glob.glob(os.path.join(SANDSTONE_DIR, "*.png")))[:limit]
+    if not paths:
+        pytest.skip("sandstone 아이콘 이미지가 없습니다")
+    return [Image.open(path) for path in paths]
+
+
+def legacy_pixel_values(binaries):
+    """기존 경로: 이진화 -> PIL RGB -> CLIPImageProcessor"""
+    processor = transformers.CLIPImageProcessor()
+    images = [Image.fromarray(binary).convert("RGB") for binary in binaries]
+    return processor(images=images, return_tensors="np")["pixel_values"]
+
+
+def test_fused_pixel_values_match_processor():
+    binaries = [binarize_icon(image) for image in load_sketches()]
+    fused = FusedPreprocessor.from_processor(transformers.CLIPImageProcessor())
+
+    pixel_values = fused(binaries)
+
+    assert pixel_values.shape == (len(binaries), 3, 224, 224)
+    assert pixel_values.dtype == np.float32
+    np.testing.assert_allclose(pixel_values, legacy_pixel_values(binaries), atol=1e-5)
+    np.testing.assert_array_equal(fused(binaries[0]), pixel_values[:1])
+
+
+def test_fused_embeddings_match_processor_pipeline():
+    torch.manual_seed(0)
+    config = transformers.CLIPVisionConfig(
+        hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=2,
+        image_size=224, patch_size=32, projection_dim=16,
+    )
+    engine = TorchEngine(ImageEncoder(transformers.CLIPVisionModelWithProjection(config)))
+    binaries = [binarize_icon(image) for image in load_sketches()]
+
+    fused = engine(FusedPreprocessor()(binaries))
+    legacy = engine(legacy_pixel_values(binaries))
+
+    fused /= np.linalg.norm(fused, axis=1, keepdims=True)
+    legacy /= np.linalg.norm(legacy, axis=1, keepdims=True)
+    assert np.min(np.sum(fused * legacy, axis=1)) > 0.99999
+
+
+def test_from_processor_rejects_mismatched_crop():
+    processor = transformers.CLIPImageProcessor(size={"shortest_edge": 256}, crop_size={"height": 224, "width": 224})
+    assert FusedPreprocessor.from_processor(processor) is None
+
+
+def test_augment_icon_keeps_shape_and_is_seeded():
+    binary = binarize_icon(load_sketches(limit=1)[0], size=(224, 224))
+    first = augment_icon(binary, np.random.default_rng(0))
+    second = augment_icon(binary, np.random.default_rng(0))
+    assert first.shape == binary.shape and first.dtype == np.uint8
+    np.testing.assert_array_equal(first, second)
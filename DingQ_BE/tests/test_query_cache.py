@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+
+from model.query_cache import QueryCache
+
+
+def make_sketch(offset=0):
+    binary = np.full((224, 224), 255, dtype=np.uint8)
+    binary[60:160, 100 + offset:110 + offset] = 0
+    binary[100:110, 40:180] = 0
+    return binary
+
+
+class TestQueryCache:
+    def test_exact_hit_and_miss(self):
+        cache = QueryCache(max_size=4)
+        sketch = make_sketch()
+        assert cache.get(sketch, "v1") is None
+        cache.put(sketch, "v1", np.ones(4), [{"reference_name": "a"}], top_k=100)
+
+        entry = cache.get(sketch.copy(), "v1")
+        assert entry is not None and entry.results[0]["reference_name"] == "a"
+        metrics = cache.get_metrics()
+        assert metrics["hits"] == 1 and metrics["misses"] == 1
+        assert metrics["hit_ratio"] == 0.5
+
+    def test_lru_eviction(self):
+        cache = QueryCache(max_size=2)
+        sketches = [make_sketch(i) for i in range(3)]
+        for sketch in sketches:
+            cache.put(sketch, "v1", np.ones(4), [], top_k=1)
+        assert cache.get(sketches[0], "v1") is None
+        assert cache.get(sketches[2], "v1") is not None
+        assert cache.get_metrics()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = QueryCache(max_size=2, ttl_seconds=0.01)
+        sketch = make_sketch()
+        cache.put(sketch, "v1", np.ones(4), [], top_k=1)
+        time.sleep(0.02)
+        assert cache.get(sketch, "v1") is None
+        assert cache.get_metrics()["expirations"] == 1
+
+    def test_index_version_change_invalidates(self):
+        cache = QueryCache(max_size=2)
+        sketch = make_sketch()
+        cache.put(sketch, "v1", np.ones(4), [], top_k=1)
+        assert cache.get(sketch, "v2") is None
+        assert cache.get_metrics()["invalidations"] == 1
+
+    def test_perceptual_near_duplicate(self):
+        cache = QueryCache(max_size=4, perceptual=True, max_distance=4)
+        cache.put(make_sketch(), "v1", np.ones(4), [{"reference_name": "a"}], top_k=1)
+        nearly_same = make_sketch()
+        nearly_same[5, 5] = 0  # 잡음 한 픽셀
+        assert cache.get(nearly_same, "v1") is not None
+        assert cache.get_metrics()["near_hits"] == 1
@@ -0,0 +1,205 @@
+import asyncio
+import fcntl
+import os
+import time
+
+import pytest
+
+from model.rate_limiter import FileTokenBucket, GeminiLimiter, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take() == 0 and bucket.take() == 0
+    wait = bucket.take()
+    assert 0 < wait <= 0.1
+
+
+def test_file_token_bucket_does_not_block_on_locked_state(tmp_path):
+    bucket = FileTokenBucket(str(tmp_path / "gemini.bucket"), rate=10, burst=1, lock_retry=0.01)
+    fd = os.open(bucket.path, os.O_RDWR | os.O_CREAT)
+    try:
+        # 다른 워커가 상태 파일을 잠근 상태: 기다리지 않고 재시도 시간 반환
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        started = time.perf_counter()
+        assert bucket.take() == 0.01
+        assert time.perf_counter() - started < 0.01
+    finally:
+        os.close(fd)
+    assert bucket.take() == 0
+
+
+class TestGeminiLimiter:
+    def test_caps_in_flight_calls(self):
+        limiter = GeminiLimiter(max_in_flight=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.get_metrics()["in_flight"])
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(*(call() for _ in range(10)))
+
+        asyncio.run(main())
+        metrics = limiter.get_metrics()
+        assert peak == 2
+        assert metrics["granted"] == 10 and metrics["in_flight"] == 0 and metrics["waiting"] == 0
+        assert metrics["wait_p95_ms"] > 0
+
+    def test_rate_limits_call_starts(self):
+        limiter = GeminiLimiter(rate=50, burst=1)
+
+        async def main():
+            started = time.perf_counter()
+            for _ in range(6):
+                async with limiter.slot():
+                    pass
+            return time.perf_counter() - started
+
+        # 첫 호출은 버킷의 토큰, 나머지 5개는 20ms 간격
+        assert asyncio.run(main()) >= 0.09
+        assert limiter.get_metrics()["throttled"] >= 5
+
+    def test_requests_are_scheduled_round_robin(self):
+        limiter = GeminiLimiter(max_in_flight=1)
+        order = []
+
+        async def call(key):
+            async with limiter.slot(key):
+                order.append(key)
+                await asyncio.sleep(0.005)
+
+        async def main():
+            big = [asyncio.ensure_future(call("big")) for _ in range(6)]
+            await asyncio.sleep(0)
+            small = [asyncio.ensure_future(call("small")) for _ in range(2)]
+            await asyncio.gather(*big, *small)
+
+        asyncio.run(main())
+        # 먼저 온 큰 요청이 슬롯을 독점하지 않고 작은 요청과 번갈아 실행
+        assert order[:5] == ["big", "big", "small", "big", "small"]
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        limiter = GeminiLimiter(max_in_flight=1)
+
+        async def main():
+            release = asyncio.Event()
+
+            async def hold():
+                async with limiter.slot():
+                    await release.wait()
+
+            holder = asyncio.ensure_future(hold())
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            release.set()
+            await holder
+            # 취소된 대기 뒤에도 새 호출이 바로 허가되어야 함
+            await asyncio.wait_for(limiter.acquire(), 0.5)
+
+        asyncio.run(main())
+        assert limiter.get_metrics()["in_flight"] == 1
+
+    def test_429_is_recorded_before_slot_release(self, tmp_path):
+        pytest.importorskip("google.genai")
+        from google.genai import errors
+
+        from model.generate_icon import IconGenerator
+        from test_generate_icon import FakeClient, png_bytes
+
+        limiter = GeminiLimiter(max_in_flight=1, cooldown=0.2)
+        paused_at_release = []
+        release = limiter.release
+
+        def record_release(handle=None):
+            paused_at_release.append(limiter._paused_until > time.monotonic())
+            release(handle)
+
+        limiter.release = record_release
+
+        class QuotaModels:
+            async def generate_content(self, model, contents, config):
+                raise errors.ClientError(429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}})
+
+        style = tmp_path / "style.png"
+        style.write_bytes(png_bytes(255))
+        generator = IconGenerator(client=FakeClient(QuotaModels()), style_image_path=str(style), limiter=limiter)
+        assert asyncio.run(generator.generate_icon(1, "집", None, 0.5)) is None
+        # 슬롯이 반환되는 시점에 이미 일시 정지 상태여야 대기 중인 호출이 바로 나가지 않음
+        assert paused_at_release == [True]
+
+    def test_429_pauses_new_calls(self):
+        limiter = GeminiLimiter(cooldown=0.1)
+
+        async def main():
+            limiter.record_429()
+            started = time.perf_counter()
+            async with limiter.slot():
+                return time.perf_counter() - started
+
+        assert asyncio.run(main()) >= 0.09
+        assert limiter.get_metrics()["rate_limited_429"] == 1
+
+    def test_shared_slots_limit_across_limiters(self, tmp_path):
+        # 같은 잠금 디렉토리를 쓰는 제한기 = 다른 워커 프로세스
+        first = GeminiLimiter(max_in_flight=1, lock_dir=str(tmp_path), poll_interval=0.01)
+        second = GeminiLimiter(max_in_flight=1, lock_dir=str(tmp_path), poll_interval=0.01)
+
+        async def main():
+            handle = await first.acquire()
+            waiting = asyncio.ensure_future(second.acquire())
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+            first.release(handle)
+            second.release(await asyncio.wait_for(waiting, 0.5))
+
+        asyncio.run(main())
+        assert second.get_metrics()["throttled"] >= 1
+
+    def test_shared_token_bucket(self, tmp_path):
+        first = GeminiLimiter(rate=20, burst=1, lock_dir=str(tmp_path))
+        second = GeminiLimiter(rate=20, burst=1, lock_dir=str(tmp_path))
+
+        async def main():
+            started = time.perf_counter()
+            for limiter in (first, second, first):
+                async with limiter.slot():
+                    pass
+            return time.perf_counter() - started
+
+        assert asyncio.run(main()) >= 0.09
+
+
+def test_generator_records_429(tmp_path):
+    pytest.importorskip("google.genai")
+    from google.genai import errors
+
+    from model.generate_icon import IconGenerator
+    from test_generate_icon import FakeClient, png_bytes
+
+    class QuotaModels:
+        calls = 0
+
+        async def generate_content(self, model, contents, config):
+            self.calls += 1
+            raise errors.ClientError(429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}})
+
+    style = tmp_path / "style.png"
+    style.write_bytes(png_bytes(255))
+    models = QuotaModels()
+    limiter = GeminiLimiter(max_in_flight=4, cooldown=0.2)
+    generator = IconGenerator(client=FakeClient(models), style_image_path=str(style), limiter=limiter)
+
+    started = time.perf_counter()
+    images = asyncio.run(generator.generate("집", png_bytes(), target_count=2, max_retries=2, backoff=0.01))
+
+    assert images == []
+    # 429 이후 재시도는 cooldown 동안 보류됨
+    assert time.perf_counter() - started >= 0.2
+    assert limiter.get_metrics()["rate_limited_429"] == models.calls == 4
+    assert generator.get_metrics()["limiter"]["granted"] == 4
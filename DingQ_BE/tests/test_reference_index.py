@@ -0,0 +1,283 @@
+import os
+
+import numpy as np
+import pytest
+
+from model.icon_metadata import normalize_filter
+from model.reference_index import ReferenceIndex
+
+VECTOR_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "model", "vectorweight.npz")
+
+
+def make_index(n=50, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)) * rng.uniform(0.5, 3.0, size=(n, 1))
+    labels = [f"icon{i // 5}" if i % 5 == 0 else f"icon{i // 5}_aug{i % 5}" for i in range(n)]
+    return vectors, labels, ReferenceIndex(vectors, labels)
+
+
+class TestReferenceIndex:
+    def test_matrix_is_normalized_contiguous_float32(self):
+        _, _, index = make_index()
+        assert index.matrix.dtype == np.float32
+        assert index.matrix.flags["C_CONTIGUOUS"]
+        np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-5)
+
+    def test_score_matches_cosine_similarity(self):
+        vectors, _, index = make_index()
+        query = np.random.default_rng(1).normal(size=vectors.shape[1]).astype(np.float32)
+        query /= np.linalg.norm(query)
+        expected = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ query
+        np.testing.assert_allclose(index.score(query), expected, atol=1e-5)
+
+    def test_batch_score(self):
+        vectors, _, index = make_index()
+        queries = np.random.default_rng(2).normal(size=(3, vectors.shape[1])).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = index.score(queries)
+        assert scores.shape == (3, len(vectors))
+        np.testing.assert_allclose(scores[1], index.score(queries[1]), atol=1e-6)
+
+    def test_mismatched_labels(self):
+        with pytest.raises(ValueError):
+            ReferenceIndex(np.ones((3, 4)), ["a", "b"])
+
+    @pytest.mark.skipif(not os.path.exists(VECTOR_PATH), reason="vectorweight.npz 없음")
+    def test_from_npz(self):
+        index = ReferenceIndex.from_npz(VECTOR_PATH)
+        assert len(index) == len(index.labels)
+        assert index.dim == 512
+
+
+def legacy_top_k(vectors, labels, query, top_k):
+    """기존 argsort + 레이블 루프 방식 (비교 기준)"""
+    similarities = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ query
+    results, seen = [], set()
+    for idx in similarities.argsort()[::-1]:
+        base_name = labels[idx].split("_aug")[0] if "_aug" in labels[idx] else labels[idx]
+        if base_name not in seen:
+            seen.add(base_name)
+            results.append((base_name, float(similarities[idx])))
+        if len(results) >= top_k:
+            break
+    return results
+
+
+class TestTopGroups:
+    def test_groups_are_contiguous(self):
+        labels = ["b_aug1", "a", "b", "a_aug1", "c", "b_aug2"]
+        index = ReferenceIndex(np.eye(6), labels)
+        assert list(index.group_names) == ["b", "a", "c"]
+        assert list(index.group_offsets) == [0, 3, 5]
+        assert list(index.labels) == ["b_aug1", "b", "b_aug2", "a", "a_aug1", "c"]
+
+    @pytest.mark.parametrize("top_k", [1, 3, 10, 100])
+    def test_matches_legacy_dedup(self, top_k):
+        vectors, labels, index = make_index(n=200, dim=32)
+        rng = np.random.default_rng(3)
+        for _ in range(5):
+            query = rng.normal(size=32).astype(np.float32)
+            query /= np.linalg.norm(query)
+            groups, scores = index.top_groups(query, top_k=top_k)
+            expected = legacy_top_k(vectors, labels, query, top_k)
+            assert [index.group_names[g] for g in groups] == [name for name, _ in expected]
+            np.testing.assert_allclose(scores, [score for _, score in expected], atol=1e-5)
+
+    @pytest.mark.parametrize("path", ["full", "shortlist", "int8", "ann"])
+    def test_zero_top_k_returns_empty(self, path):
+        from model.ann_index import build_ann
+
+        _, _, index = make_index(n=200, dim=32)
+        shortlist = 10 if path == "shortlist" else None
+        if path == "int8":
+            index.set_precision("int8")
+        elif path == "ann":
+            index.attach_ann(build_ann("ivf", index.matrix, version=index.base_version, nlist=4))
+        groups, scores = index.top_groups(index.matrix[0], top_k=0, shortlist=shortlist)
+        assert len(groups) == 0 and len(scores) == 0
+        assert groups.dtype == np.intp and scores.dtype == np.float32
+
+
+def make_clustered_index(num_groups=300, per_group=7, dim=32, noise=0.3, seed=0):
+    """원본 아이콘 주변에 증강 벡터가 모여 있는 레퍼런스 세트"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_groups, dim))
+    vectors = np.repeat(centers, per_group, axis=0) + noise * rng.normal(size=(num_groups * per_group, dim))
+    labels = [
+        f"icon{g}" if a == 0 else f"icon{g}_aug{a}" for g in range(num_groups) for a in range(per_group)
+    ]
+    return centers, ReferenceIndex(vectors, labels)
+
+
+class TestShortlist:
+    def test_centroids_are_normalized_group_means(self):
+        _, _, index = make_index()
+        assert index.centroids.shape == (index.num_groups, index.dim)
+        expected = index.matrix[:5].mean(axis=0)
+        np.testing.assert_allclose(index.centroids[0], expected / np.linalg.norm(expected), atol=1e-6)
+
+    def test_full_shortlist_is_exhaustive(self):
+        _, _, index = make_index(n=200, dim=32)
+        query = index.matrix[7]
+        exact = index.top_groups(query, top_k=10)
+        for shortlist in (index.num_groups, index.num_groups * 2):
+            groups, scores = index.top_groups(query, top_k=10, shortlist=shortlist)
+            np.testing.assert_array_equal(groups, exact[0])
+            np.testing.assert_allclose(scores, exact[1])
+
+    def test_shortlist_scores_are_exact_and_recall_is_high(self):
+        centers, index = make_clustered_index()
+        rng = np.random.default_rng(4)
+        overlaps = []
+        for _ in range(20):
+            query = (centers[rng.integers(len(centers))] + 0.5 * rng.normal(size=index.dim)).astype(np.float32)
+            query /= np.linalg.norm(query)
+            exact_groups, _ = index.top_groups(query, top_k=10)
+            groups, scores = index.top_groups(query, top_k=10, shortlist=40)
+
+            assert len(groups) == 10
+            np.testing.assert_allclose(scores, index.group_scores(index.score(query))[groups], atol=1e-6)
+            assert np.all(np.diff(scores) <= 0)
+            overlaps.append(len(set(groups) & set(exact_groups)) / 10)
+        assert np.mean(overlaps) >= 0.9
+
+
+class TestIndexDirectory:
+    def test_roundtrip_is_memory_mapped_and_identical(self, tmp_path):
+        vectors, labels, index = make_index(n=200, dim=32)
+        path = str(tmp_path / "ref.index")
+        header = index.save(path, model_name="test-model")
+
+        loaded = ReferenceIndex.load(path)
+        assert isinstance(loaded.matrix, np.memmap)
+        assert loaded.version == index.version == header["content_hash"]
+        assert loaded.header["model_name"] == "test-model"
+        assert loaded.header["dim"] == 32 and loaded.header["normalized"] is True
+        assert list(loaded.labels) == list(index.labels)
+        assert list(loaded.group_names) == list(index.group_names)
+        np.testing.assert_array_equal(loaded.group_ids, index.group_ids)
+
+        query = index.matrix[3]
+        for shortlist in (None, 10):
+            expected = index.top_groups(query, top_k=10, shortlist=shortlist)
+            actual = loaded.top_groups(query, top_k=10, shortlist=shortlist)
+            np.testing.assert_array_equal(actual[0], expected[0])
+            np.testing.assert_allclose(actual[1], expected[1])
+
+    def test_no_pickled_arrays(self, tmp_path):
+        _, _, index = make_index()
+        index.save(str(tmp_path / "ref.index"))
+        for name in ("vectors", "centroids", "group_offsets", "group_names", "labels"):
+            np.load(tmp_path / "ref.index" / f"{name}.npy", allow_pickle=False)
+
+    def test_float16_storage(self, tmp_path):
+        _, _, index = make_index(n=200, dim=32)
+        header = index.save(str(tmp_path / "ref.index"), dtype="float16")
+        loaded = ReferenceIndex.load(str(tmp_path / "ref.index"))
+        assert header["dtype"] == "float16"
+        # float32로 복사하지 않고 float16 mmap 그대로 점수화
+        assert isinstance(loaded.matrix, np.memmap) and loaded.matrix.dtype == np.float16
+        np.testing.assert_allclose(loaded.matrix, index.matrix, atol=1e-3)
+
+        queries = make_index(n=3, dim=32, seed=1)[2].matrix
+        np.testing.assert_allclose(loaded.score(queries[0]), index.score(queries[0]), atol=1e-2)
+        np.testing.assert_allclose(loaded.score(queries), index.score(queries), atol=1e-2)
+        groups, scores = loaded.top_groups(queries[0], top_k=5, shortlist=10)
+        assert scores.dtype == np.float32 and len(groups) == 5
+
+    def test_save_replaces_existing_directory(self, tmp_path):
+        path = str(tmp_path / "ref.index")
+        make_index(seed=0)[2].save(path)
+        _, _, index = make_index(seed=1)
+        index.save(path)
+        assert ReferenceIndex.load(path).version == index.version
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["ref.index"]
+
+    @pytest.mark.skipif(not os.path.exists(VECTOR_PATH), reason="vectorweight.npz 없음")
+    def test_convert_vectorweight(self, tmp_path):
+        index = ReferenceIndex.from_npz(VECTOR_PATH)
+        index.save(str(tmp_path / "vectorweight.index"))
+        loaded = ReferenceIndex.load(str(tmp_path / "vectorweight.index"))
+        assert loaded.version == index.version
+        assert loaded.num_groups == index.num_groups
+
+
+class TestReducedPrecision:
+    @pytest.mark.parametrize("precision", ["float16", "int8"])
+    def test_top_k_overlap_with_float32(self, precision):
+        pytest.importorskip("torch")
+        centers, index = make_clustered_index(num_groups=500, dim=64)
+        rng = np.random.default_rng(6)
+        queries = [
+            centers[rng.integers(len(centers))] + 0.5 * rng.normal(size=index.dim) for _ in range(20)
+        ]
+        queries = [(q / np.linalg.norm(q)).astype(np.float32) for q in queries]
+        exact = [index.top_groups(query, top_k=20) for query in queries]
+
+        index.set_precision(precision, rerank_factor=2)
+        overlaps = []
+        for query, (exact_groups, _) in zip(queries, exact):
+            groups, scores = index.top_groups(query, top_k=20)
+            # 반환 점수는 float32 재점수화 결과
+            np.testing.assert_allclose(scores, index.group_scores(index.score(query))[groups], atol=1e-6)
+            overlaps.append(len(set(groups) & set(exact_groups)) / 20)
+        assert np.mean(overlaps) >= 0.98
+
+    def test_float32_disables_reduced_path(self):
+        pytest.importorskip("torch")
+        _, _, index = make_index(n=200, dim=32)
+        index.set_precision("int8")
+        index.set_precision("float32")
+        assert index.coarse is None
+
+    def test_unknown_precision(self):
+        pytest.importorskip("torch")
+        _, _, index = make_index()
+        with pytest.raises(ValueError):
+            index.set_precision("int4")
+
+
+class TestPartitions:
+    @staticmethod
+    def make_metadata(index):
+        names = [str(name) for name in index.group_names]
+        return {
+            name: {"category": f"c{i % 4}", "tags": ["even"] if i % 2 == 0 else ["odd", "prime"] if i % 3 == 0 else None}
+            for i, name in enumerate(names)
+        }
+
+    def test_filtered_search_matches_filtered_full_scan(self):
+        _, index = make_clustered_index(num_groups=120, per_group=5)
+        metadata = self.make_metadata(index)
+        index.attach_metadata(metadata)
+        query = index.matrix[17]
+        scores = index.group_scores(index.score(query))
+
+        for categories, tags in [("c1", None), (["c0", "c3"], None), (None, "even"), ("c1,c3", ["odd", "prime"])]:
+            partition = index.partitions.select(categories, tags)
+            groups, top_scores = index.top_groups(query, top_k=10, partition=partition)
+
+            wanted_categories, wanted_tags = normalize_filter(categories), normalize_filter(tags) or ()
+            allowed = [
+                g for g, name in enumerate(index.group_names)
+                if (wanted_categories is None or metadata[str(name)]["category"] in wanted_categories)
+                and set(wanted_tags) <= set(metadata[str(name)]["tags"] or ())
+            ]
+            expected = sorted(allowed, key=lambda g: -scores[g])[:10]
+            assert groups.tolist() == expected
+            np.testing.assert_allclose(top_scores, scores[expected], rtol=1e-5)
+
+    def test_category_partition_is_presplit(self):
+        _, index = make_clustered_index(num_groups=40, per_group=3)
+        index.attach_metadata(self.make_metadata(index))
+        partition = index.partitions.select("c2")
+        assert partition is index.partitions.categories["c2"]
+        assert partition.matrix.shape == (len(partition.rows), index.dim)
+        assert len(partition.groups) == 10 and len(partition) == 30
+
+    def test_unknown_filter_returns_no_results(self):
+        _, index = make_clustered_index(num_groups=20, per_group=2)
+        index.attach_metadata(self.make_metadata(index))
+        groups, _ = index.top_groups(index.matrix[0], top_k=5, partition=index.partitions.select("missing"))
+        assert len(groups) == 0
+        assert index.partitions.select(None, None) is None
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+from model.icon_metadata import read_metadata
+from model.vector_db import iter_icon_rows
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA_SQL = os.path.join(os.path.dirname(__file__), "..", "database", "schema.sql")
+
+
+def test_read_metadata(tmp_path):
+    path = tmp_path / "icons.csv"
+    path.write_text(
+        "input_file,category,tags,svg_path\n"
+        "home.png,navigation,main|house,\n"
+        "ai.png,,,gs://bucket/ai.svg\n",
+        encoding="utf-8-sig",
+    )
+    metadata = read_metadata(path)
+    assert metadata["home"] == {"category": "navigation", "tags": ["main", "house"], "svg_path": None, "description": None}
+    assert metadata["ai"]["svg_path"] == "gs://bucket/ai.svg" and metadata["ai"]["tags"] is None
+
+
+def test_iter_icon_rows_defaults_svg_path():
+    rows = list(iter_icon_rows(["home"], np.ones((1, 4)), {}, svg_base="gs://icons/"))
+    assert rows[0][:5] == ("home", "gs://icons/home.svg", None, None, None)
+    assert rows[0][5].dtype == np.float32
+
+
+@pytest.fixture
+def pg_conn():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL이 설정되지 않았습니다")
+    psycopg = pytest.importorskip("psycopg")
+    from pgvector.psycopg import register_vector
+
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute("DROP SCHEMA IF EXISTS test_vector_db CASCADE")
+        conn.execute("CREATE SCHEMA test_vector_db")
+        conn.execute("SET search_path TO test_vector_db, public")
+        conn.execute(open(SCHEMA_SQL, encoding="utf-8").read())
+        conn.autocommit = False
+        register_vector(conn)
+        yield conn
+        conn.rollback()
+        conn.autocommit = True
+        conn.execute("DROP SCHEMA test_vector_db CASCADE")
+
+
+@pytest.mark.parametrize("copy_format", ["binary", "text"])
+def test_bulk_load_upserts_by_icon_name(pg_conn, copy_format):
+    from model.vector_db import bulk_load
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(3, 512)).astype(np.float32)
+    metadata = {"new": {"category": "etc", "tags": ["a", "b"]}}
+
+    with pg_conn.transaction():
+        count = bulk_load(pg_conn, iter_icon_rows(["home", "search", "new"], vectors, metadata), copy_format)
+
+    assert count == 3
+    rows = dict(pg_conn.execute("SELECT icon_name, category FROM svg_icons").fetchall())
+    # schema.sql 샘플 3개 + 새 아이콘 1개, 기존 카테고리는 유지
+    assert rows == {"home": "navigation", "search": "action", "settings": "navigation", "new": "etc"}
+    stored = pg_conn.execute("SELECT vector_features::real[], tags FROM svg_icons WHERE icon_name = 'new'").fetchone()
+    np.testing.assert_allclose(stored[0], vectors[2], rtol=1e-6)
+    assert stored[1] == ["a", "b"]
+
+
+def test_default_lists_and_probe():
+    from model.vector_db import default_lists, default_probe
+
+    assert default_lists(500) == 1 and default_lists(100_000) == 100 and default_lists(4_000_000) == 2000
+    assert default_probe("ivfflat", lists=100) == 10
+    assert default_probe("hnsw", top_k=100) == 200
+
+
+@pytest.mark.parametrize("kind", ["ivfflat", "hnsw"])
+def test_rebuild_index_and_report(pg_conn, kind):
+    from model.vector_db import bulk_load, build_vector_index, current_index, recall_report
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 512)).astype(np.float32)
+    with pg_conn.transaction():
+        bulk_load(pg_conn, iter_icon_rows([f"icon{i}" for i in range(300)], vectors))
+        assert current_index(pg_conn) is None
+
+        result = build_vector_index(pg_conn, kind, lists=4)
+        assert current_index(pg_conn) == kind
+        assert result["rows"] == 300
+        report = recall_report(pg_conn, probes=[1, 300], num_queries=5, top_k=10)
+
+    assert [row["mode"] for row in report] == ["exact", kind, kind]
+    assert report[-1]["recall"] >= 0.9
@@ -0,0 +1,202 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import write_reference_npz
+from model.reference_index import ReferenceIndex
+from model.vector_store import InMemoryVectorStore, create_vector_store
+
+# pgvector 저장소 테스트용 DB (예: docker run -e POSTGRES_PASSWORD=pw -p 5432:5432 pgvector/pgvector:pg16)
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def unit(rng, rows, dim=16):
+    vectors = rng.normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ReferenceIndex.from_npz(write_reference_npz(tmp_path / "ref.npz", "a", seed=1))
+
+
+def test_memory_store_matches_index_top_groups(index):
+    store = InMemoryVectorStore(index)
+    query = unit(np.random.default_rng(0), 1)[0]
+
+    results = store.search(query, top_k=4)
+
+    groups, scores = index.top_groups(query, top_k=4)
+    assert [r["reference_name"] for r in results] == [str(index.group_names[g]) for g in groups]
+    assert all(isinstance(r["similarity_score"], float) for r in results)
+    assert store.version == index.version
+
+
+def test_memory_store_filters_by_category_and_tags():
+    rng = np.random.default_rng(0)
+    names = [f"icon{i}" for i in range(30)]
+    index = ReferenceIndex(unit(rng, len(names)), names)
+    store = InMemoryVectorStore(index)
+    with pytest.raises(ValueError):
+        store.search(index.matrix[0], top_k=5, categories="a")
+
+    index.attach_metadata({name: {"category": "ab"[i % 2], "tags": ["x"] if i % 3 == 0 else None} for i, name in enumerate(names)})
+    results = store.search(index.matrix[0], top_k=100, categories="b", tags="x")
+    assert sorted(r["reference_name"] for r in results) == sorted(f"icon{i}" for i in range(30) if i % 6 == 3)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_vector_store("faiss")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL이 설정되지 않았습니다")
+@pytest.mark.parametrize("index_kind", [None, "hnsw"])
+def test_pgvector_store_returns_same_results_as_memory(tmp_path, index_kind):
+    psycopg = pytest.importorskip("psycopg")
+    from model.vector_store import PgVectorStore
+
+    rng = np.random.default_rng(0)
+    names = [f"icon{i}" for i in range(20)]
+    vectors = unit(rng, len(names))
+    table = "test_vector_store_icons"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (icon_name text PRIMARY KEY, vector_features vector(16))")
+        with conn.cursor().copy(f"COPY {table} (icon_name, vector_features) FROM STDIN") as copy:
+            for name, vector in zip(names, vectors):
+                copy.write_row((name, "[" + ",".join(map(str, vector)) + "]"))
+
+    # 인덱스가 없는 테이블이므로 요청별 탐색 폭을 설정해도 전수 검색과 같아야 함
+    store = PgVectorStore(TEST_DATABASE_URL, table=table, max_size=2, index_kind=index_kind, probe=4)
+    memory = InMemoryVectorStore(ReferenceIndex(vectors, names))
+    try:
+        for query in unit(rng, 5):
+            expected = memory.search(query, top_k=5)
+            results = store.search(query, top_k=5)
+            assert [r["reference_name"] for r in results] == [r["reference_name"] for r in expected]
+            np.testing.assert_allclose(
+                [r["similarity_score"] for r in results], [r["similarity_score"] for r in expected], atol=1e-5
+            )
+        assert store.get_metrics()["queries"] == 5
+    finally:
+        store.close()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL이 설정되지 않았습니다")
+def test_pgvector_store_scores_centroids_not_max_over_augmentations():
+    psycopg = pytest.importorskip("psycopg")
+    from model.vector_db import iter_icon_rows
+    from model.vector_store import PgVectorStore
+
+    # a: 원본은 쿼리와 같지만 증강 벡터는 직교 -> 최대 1.0, centroid 0.707
+    # b: 원본/증강 모두 쿼리와 0.9 -> 최대/centroid 모두 0.9
+    basis = np.eye(16, dtype=np.float32)
+    close = 0.9 * basis[0] + np.sqrt(1 - 0.9 ** 2) * basis[2]
+    index = ReferenceIndex(
+        np.stack([basis[0], basis[1], close, close]), ["a", "a_aug1", "b", "b_aug1"]
+    )
+    query = basis[0]
+    table = "test_vector_store_centroids"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (icon_name text PRIMARY KEY, vector_features vector(16))")
+        # vector_db load와 같은 행 (아이콘별 centroid)
+        with conn.cursor().copy(f"COPY {table} (icon_name, vector_features) FROM STDIN") as copy:
+            for name, _, _, _, _, vector in iter_icon_rows(index.group_names, index.centroids):
+                copy.write_row((name, "[" + ",".join(map(str, vector)) + "]"))
+
+    store = PgVectorStore(TEST_DATABASE_URL, table=table, max_size=1)
+    try:
+        memory = InMemoryVectorStore(index).search(query, top_k=2)
+        results = store.search(query, top_k=2)
+        assert [r["reference_name"] for r in memory] == ["a", "b"]
+        assert [r["reference_name"] for r in results] == ["b", "a"]
+        np.testing.assert_allclose([r["similarity_score"] for r in memory], [1.0, 0.9], atol=1e-5)
+        np.testing.assert_allclose([r["similarity_score"] for r in results], [0.9, np.sqrt(0.5)], atol=1e-5)
+    finally:
+        store.close()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL이 설정되지 않았습니다")
+def test_pgvector_store_filters_match_memory():
+    psycopg = pytest.importorskip("psycopg")
+    from model.vector_store import PgVectorStore
+
+    rng = np.random.default_rng(1)
+    names = [f"icon{i}" for i in range(40)]
+    vectors = unit(rng, len(names))
+    metadata = {name: {"category": "abc"[i % 3], "tags": ["x", "y"] if i % 2 else ["x"]} for i, name in enumerate(names)}
+    table = "test_vector_store_filtered"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (icon_name text PRIMARY KEY, category text, tags text[], vector_features vector(16))")
+        with conn.cursor().copy(f"COPY {table} (icon_name, category, tags, vector_features) FROM STDIN") as copy:
+            for name, vector in zip(names, vectors):
+                copy.write_row((name, metadata[name]["category"], metadata[name]["tags"], "[" + ",".join(map(str, vector)) + "]"))
+
+    index = ReferenceIndex(vectors, names)
+    index.attach_metadata(metadata)
+    memory = InMemoryVectorStore(index)
+    store = PgVectorStore(TEST_DATABASE_URL, table=table, max_size=1)
+    try:
+        query = unit(rng, 1)[0]
+        for categories, tags in [("a", None), ("a,c", None), (None, "y"), (["b"], ["x", "y"])]:
+            expected = memory.search(query, top_k=5, categories=categories, tags=tags)
+            results = store.search(query, top_k=5, categories=categories, tags=tags)
+            assert [r["reference_name"] for r in results] == [r["reference_name"] for r in expected]
+    finally:
+        store.close()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL이 설정되지 않았습니다")
+def test_pgvector_store_version_follows_table_writes():
+    psycopg = pytest.importorskip("psycopg")
+    from model.vector_store import PgVectorStore
+
+    rng = np.random.default_rng(2)
+    table = "test_vector_store_version"
+
+    def literal(vector):
+        return "[" + ",".join(map(str, vector)) + "]"
+
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} (icon_name text PRIMARY KEY, vector_features vector(16))")
+        for i, vector in enumerate(unit(rng, 3)):
+            conn.execute(f"INSERT INTO {table} VALUES (%s, %s)", (f"icon{i}", literal(vector)))
+
+    store = PgVectorStore(TEST_DATABASE_URL, table=table, max_size=1, version_interval=0)
+    cached = PgVectorStore(TEST_DATABASE_URL, table=table, max_size=1, version_interval=3600)
+    try:
+        versions = [store.version]
+        stale = cached.version
+        assert store.version == versions[0]  # 내용이 그대로면 같은 버전
+
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            # vector_db load의 upsert처럼 기존 아이콘 벡터 갱신 (행 수는 그대로)
+            conn.execute(f"UPDATE {table} SET vector_features = %s WHERE icon_name = 'icon1'", (literal(unit(rng, 1)[0]),))
+            versions.append(store.version)
+            conn.execute(f"INSERT INTO {table} VALUES ('icon3', %s)", (literal(unit(rng, 1)[0]),))
+            versions.append(store.version)
+            conn.execute(f"DELETE FROM {table} WHERE icon_name = 'icon0'")
+            versions.append(store.version)
+        assert len(set(versions)) == len(versions)
+        # 조회 간격 안에서는 이전 버전을 재사용
+        assert cached.version == stale
+    finally:
+        store.close()
+        cached.close()
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")